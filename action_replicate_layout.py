@@ -19,323 +19,10 @@
 #  MA 02110-1301, USA.
 #
 #
-import wx
 import pcbnew
 import os
 import logging
 import sys
-import time
-from .replicate_layout_GUI import ReplicateLayoutGUI
-from .error_dialog_GUI import ErrorDialogGUI
-from .replicate_layout import Replicator
-from .replicate_layout import Settings
-from .conn_issue_GUI import ConnIssueGUI
-
-
-class ConnIssueDialog(ConnIssueGUI):
-    def SetSizeHints(self, sz1, sz2):
-        # DO NOTHING
-        pass
-
-    def __init__(self, parent, replicator):
-        super(ConnIssueDialog, self).__init__(parent)
-
-        self.list.InsertColumn(0, 'Footprint', width=100)
-        self.list.InsertColumn(1, 'Pad', width=100)
-
-        index = 0
-        for issue in replicator.connectivity_issues:
-            self.list.InsertItem(index, issue[0])
-            self.list.SetItem(index, 1, issue[1])
-            index = index + 1
-
-
-class ErrorDialog(ErrorDialogGUI):
-    def SetSizeHints(self, sz1, sz2):
-        # DO NOTHING
-        pass
-
-    def __init__(self, parent):
-        super(ErrorDialog, self).__init__(parent)
-
-
-class ReplicateLayoutDialog(ReplicateLayoutGUI):
-    def SetSizeHints(self, sz1, sz2):
-        # DO NOTHING
-        pass
-
-    def __init__(self, parent, replicator, fp_ref, logger):
-        super(ReplicateLayoutDialog, self).__init__(parent)
-
-        self.logger = logger
-
-        self.replicator = replicator
-        self.src_anchor_fp = self.replicator.get_fp_by_ref(fp_ref)
-        self.levels = self.src_anchor_fp.filename
-
-        # clear levels
-        self.list_levels.Clear()
-        self.list_levels.AppendItems(self.levels)
-
-        self.sheet_selection = None
-
-        self.src_footprints = []
-        self.hl_fps = []
-        self.hl_items = []
-
-        # select the bottom most level
-        nr_levels = self.list_levels.GetCount()
-        self.list_levels.SetSelection(nr_levels - 1)
-        self.level_changed(None)
-
-    def __del__(self):
-        self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
-
-    def group_layout_changed( self, event ):
-        # when enabled, they should be checked by default
-        if self.chkbox_group_layouts.GetValue():
-            self.chkbox_group_footprints.Enable(True)
-            self.chkbox_group_footprints.SetValue(True)
-            self.chkbox_group_tracks.Enable(True)
-            self.chkbox_group_tracks.SetValue(True)
-            self.chkbox_group_zones.Enable(True)
-            self.chkbox_group_zones.SetValue(True)
-            self.chkbox_group_text.Enable(True)
-            self.chkbox_group_text.SetValue(True)
-            self.chkbox_group_drawings.Enable(True)
-            self.chkbox_group_drawings.SetValue(True)
-        else:
-            self.chkbox_group_footprints.Disable()
-            self.chkbox_group_footprints.SetValue(False)
-            self.chkbox_group_tracks.Disable()
-            self.chkbox_group_tracks.SetValue(False)
-            self.chkbox_group_zones.Disable()
-            self.chkbox_group_zones.SetValue(False)
-            self.chkbox_group_text.Disable()
-            self.chkbox_group_text.SetValue(False)
-            self.chkbox_group_drawings.Disable()
-            self.chkbox_group_drawings.SetValue(False)
-        if event is not None:
-            event.Skip()
-
-    def level_changed(self, event):
-        index = self.list_levels.GetSelection()
-        list_sheets_choices = self.replicator.get_sheets_to_replicate(self.src_anchor_fp,
-                                                                      self.src_anchor_fp.sheet_id[index])
-
-        # show/hide checkbox
-        if self.chkbox_group.GetValue():
-            self.chkbox_include_group_items.Disable()
-            self.chkbox_include_group_items.SetValue(False)
-            self.chkbox_intersecting.Disable()
-        else:
-            self.chkbox_include_group_items.Enable(True)
-            self.chkbox_intersecting.Enable(True)
-            if self.chkbox_intersecting.GetValue():
-                self.chkbox_include_group_items.Enable(True)
-            else:
-                self.chkbox_include_group_items.Disable()
-                self.chkbox_include_group_items.SetValue(False)
-
-        # clear highlight on all footprints on selected level
-        self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
-        self.hl_fps = []
-        self.hl_items = []
-        pcbnew.Refresh()
-
-        # get anchor footprints
-        anchor_footprints = self.replicator.get_list_of_footprints_with_same_id(self.src_anchor_fp.fp_id)
-        # find matching anchors to matching sheets
-        ref_list = []
-        for sheet in list_sheets_choices:
-            for pf in anchor_footprints:
-                if "/".join(sheet) in "/".join(pf.sheet_id):
-                    ref_list.append(pf.ref)
-                    break
-
-        sheets_for_list = ['/'.join(x[0]) + " (" + x[1] + ")" for x in zip(list_sheets_choices, ref_list)]
-        # clear levels
-        self.sheet_selection = self.list_sheets.GetSelections()
-
-        self.list_sheets.Clear()
-        self.list_sheets.AppendItems(sheets_for_list)
-
-        # if none is selected, select all
-        if len(self.sheet_selection) == 0:
-            number_of_items = self.list_sheets.GetCount()
-            for i in range(number_of_items):
-                self.list_sheets.Select(i)
-        else:
-            for n in range(len(sheets_for_list)):
-                if n in self.sheet_selection:
-                    self.list_sheets.Select(n)
-                else:
-                    self.list_sheets.Deselect(n)
-
-        # parse the settings
-        settings = Settings(rep_tracks=self.chkbox_tracks.GetValue(), rep_zones=self.chkbox_zones.GetValue(),
-                            rep_text=self.chkbox_text.GetValue(), rep_drawings=self.chkbox_drawings.GetValue(),
-                            group_layouts=self.chkbox_group_layouts.GetValue(), group_footprints=self.chkbox_group_footprints.GetValue(),
-                            group_tracks=self.chkbox_group_tracks.GetValue(), group_zones=self.chkbox_group_zones.GetValue(),
-                            group_text=self.chkbox_group_text.GetValue(), group_drawings=self.chkbox_group_drawings.GetValue(),
-                            rep_locked_tracks=self.chkbox_locked_tracks.GetValue(), rep_locked_zones=self.chkbox_locked_zones.GetValue(),
-                            rep_locked_text=self.chkbox_locked_text.GetValue(), rep_locked_drawings=self.chkbox_locked_drawings.GetValue(),
-                            intersecting=self.chkbox_intersecting.GetValue(), group_items=self.chkbox_include_group_items.GetValue(),
-                            group_only=self.chkbox_group.GetValue(), locked_fps=self.chkbox_locked.GetValue(),
-                            remove=self.chkbox_remove.GetValue())
-
-        # highlight all footprints on selected level
-        (self.hl_fps, self.hl_items) = self.replicator.highlight_set_level(self.src_anchor_fp.sheet_id[0:self.list_levels.GetSelection() + 1],
-                                                                           settings)
-        pcbnew.Refresh()
-
-        if event is not None:
-            event.Skip()
-
-    def on_ok(self, event):
-        # clear highlight on all footprints on selected level
-        # so that duplicated tracks don't remain selected
-        self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
-        self.hl_fps = []
-        self.hl_items = []
-
-        selected_items = self.list_sheets.GetSelections()
-        selected_names = []
-        for item in selected_items:
-            selected_names.append(self.list_sheets.GetString(item))
-
-        # grab checkboxes
-        remove_existing_nets_zones = self.chkbox_remove.GetValue()
-        remove_duplicates = self.chkbox_remove_duplicates.GetValue()
-        rep_locked = self.chkbox_locked.GetValue()
-        group_only = self.chkbox_group.GetValue()
-
-        # parse the settings
-        settings = Settings(rep_tracks=self.chkbox_tracks.GetValue(), rep_zones=self.chkbox_zones.GetValue(),
-                            rep_text=self.chkbox_text.GetValue(), rep_drawings=self.chkbox_drawings.GetValue(),
-                            group_layouts=self.chkbox_group_layouts.GetValue(), group_footprints=self.chkbox_group_footprints.GetValue(),
-                            group_tracks=self.chkbox_group_tracks.GetValue(), group_zones=self.chkbox_group_zones.GetValue(),
-                            group_text=self.chkbox_group_text.GetValue(), group_drawings=self.chkbox_group_drawings.GetValue(),
-                            rep_locked_tracks=self.chkbox_locked_tracks.GetValue(), rep_locked_zones=self.chkbox_locked_zones.GetValue(),
-                            rep_locked_text=self.chkbox_locked_text.GetValue(), rep_locked_drawings=self.chkbox_locked_drawings.GetValue(),
-                            intersecting=self.chkbox_intersecting.GetValue(), group_items=self.chkbox_include_group_items.GetValue(),
-                            group_only=self.chkbox_group.GetValue(), locked_fps=self.chkbox_locked.GetValue(),
-                            remove=self.chkbox_remove.GetValue())
-
-        # failsafe sometimes on my machine wx does not generate a listbox event
-        level = self.list_levels.GetSelection()
-        selection_indices = self.list_sheets.GetSelections()
-        sheets_on_a_level = self.replicator.get_sheets_to_replicate(self.src_anchor_fp,
-                                                                    self.src_anchor_fp.sheet_id[level])
-        dst_sheets = [sheets_on_a_level[i] for i in selection_indices]
-
-        # check if all the destination anchor footprints are on the same layer as source anchor footprint
-        # first get all the anchor footprints
-        all_dst_footprints = []
-        for sheet in dst_sheets:
-            all_dst_footprints.extend(self.replicator.get_footprints_on_sheet(sheet))
-        dst_anchor_footprints = [x for x in all_dst_footprints if x.fp_id == self.src_anchor_fp.fp_id]
-
-        # replicate now
-        self.logger.info("Replicating layout")
-
-        self.start_time = time.time()
-        self.last_time = self.start_time
-        self.progress_dlg = wx.ProgressDialog("Preparing for replication", "Starting plugin", maximum=100)
-        self.progress_dlg.Show()
-        self.progress_dlg.ToggleWindowStyle(wx.STAY_ON_TOP)
-        self.Hide()
-
-        try:
-            # update progress dialog
-            self.replicator.update_progress = self.update_progress
-            self.replicator.replicate_layout(self.src_anchor_fp, self.src_anchor_fp.sheet_id[0:level + 1],
-                                             dst_sheets,
-                                             settings, remove_duplicates)
-                                             
-            self.logger.info("Replication complete")
-
-            if self.replicator.connectivity_issues:
-                self.logger.info("Letting the user know there are some issues with replicated design")
-                report_string = ""
-                for item in self.replicator.connectivity_issues:
-                    report_string = report_string + f"Footprint {item[0]}, pad {item[1]}\n"
-                self.logger.info(f"Looks like the design has an exotic connectivity that the plugin might not"
-                                 f" handle properly\n "
-                                 f"Make sure that you check the connectivity around:\n" + report_string)
-                # show dialog
-                issue_dlg = ConnIssueDialog(self, self.replicator)
-                issue_dlg.ShowModal()
-                issue_dlg.Destroy()
-
-            # clear highlight on all footprints on selected level
-            self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
-            self.hl_fps = []
-            self.hl_items = []
-            pcbnew.Refresh()
-
-            logging.shutdown()
-            self.progress_dlg.Destroy()
-            event.Skip()
-            self.EndModal(True)
-        except LookupError as exception:
-            # clear highlight on all footprints on selected level
-            self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
-            self.hl_fps = []
-            self.hl_items = []
-            pcbnew.Refresh()
-
-            caption = 'Replicate Layout'
-            message = str(exception)
-            dlg = wx.MessageDialog(self, message, caption, wx.OK | wx.ICON_ERROR)
-            dlg.ShowModal()
-            dlg.Destroy()
-            logging.shutdown()
-            self.progress_dlg.Destroy()
-            event.Skip()
-            self.EndModal(False)
-            return
-        except Exception:
-            # clear highlight on all footprints on selected level
-            self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
-            self.hl_fps = []
-            self.hl_items = []
-            pcbnew.Refresh()
-
-            self.logger.exception("Fatal error when running Replicate layout plugin")
-            e_dlg = ErrorDialog(self)
-            e_dlg.ShowModal()
-            e_dlg.Destroy()
-            logging.shutdown()
-            self.progress_dlg.Destroy()
-            event.Skip()
-            self.Destroy()
-
-    def on_cancel(self, event):
-        # clear highlight on all footprints on selected level
-        self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
-        self.hl_fps = []
-        self.hl_items = []
-        pcbnew.Refresh()
-
-        self.logger.info("User canceled the dialog")
-        logging.shutdown()
-        event.Skip()
-
-        self.Destroy()
-
-    def update_progress(self, stage, percentage, message=None):
-        current_time = time.time()
-        # update GUI only every 10 ms
-        i = int(percentage * 100)
-        if message is not None:
-            logging.info("updating GUI message: " + repr(message))
-            self.progress_dlg.Update(i, message)
-        if (current_time - self.last_time) > 0.01:
-            self.last_time = current_time
-            delta_time = self.last_time - self.start_time
-            logging.info("updating GUI with: " + repr(i))
-            self.progress_dlg.Update(i)
 
 
 class ReplicateLayout(pcbnew.ActionPlugin):
@@ -366,6 +53,12 @@ class ReplicateLayout(pcbnew.ActionPlugin):
         pass
 
     def Run(self):
+        # KiCad imports the plugin at startup, so the GUI and the replication engine are imported only when needed
+        import wx
+        from .replicate_layout import Replicator
+        from .replication_logging import start_logging, stop_logging, get_log_level, LOG_FILENAME
+        from .replication_dialogs import ReplicateLayoutDialog, ErrorDialog
+
         # grab PCB editor frame
         self.frame = wx.FindWindowByName("PcbFrame")
 
@@ -376,18 +69,9 @@ class ReplicateLayout(pcbnew.ActionPlugin):
         # go to the project folder - so that log will be in proper place
         os.chdir(os.path.dirname(os.path.abspath(board.GetFileName())))
 
-        # Remove all handlers associated with the root logger object.
-        for handler in logging.root.handlers[:]:
-            logging.root.removeHandler(handler)
-
-        file_handler = logging.FileHandler(filename='replicate_layout.log', mode='w')
-        handlers = [file_handler]
-
-        # set up logger
-        logging.basicConfig(level=logging.INFO,
-                            format='%(asctime)s %(name)s %(lineno)d:%(message)s',
-                            datefmt='%m-%d %H:%M:%S',
-                            handlers=handlers)
+        # set up logger, the file is written in a background thread
+        file_handler = logging.FileHandler(filename=LOG_FILENAME, mode='w')
+        start_logging([file_handler], get_log_level(self.debug_level))
         logger = logging.getLogger(__name__)
         logger.info("Plugin executed on: " + repr(sys.platform))
         logger.info("Plugin executed with python version: " + repr(sys.version))
@@ -414,7 +98,7 @@ class ReplicateLayout(pcbnew.ActionPlugin):
         # search for the Replicate.Layout user layer where replication rooms can be defined
 
         if 'Replicate.Layout' in [board.GetLayerName(x) for x in board.GetEnabledLayers().Users()]:
-            pass
+            logger.info("Found Replicate.Layout layer, the rooms on it are used to select the items")
 
         # prepare the replicator
         logger.info("Preparing replicator with " + src_anchor_fp_reference + " as a reference")
@@ -429,14 +113,14 @@ class ReplicateLayout(pcbnew.ActionPlugin):
             dlg = wx.MessageDialog(self.frame, message, caption, wx.OK | wx.ICON_ERROR)
             dlg.ShowModal()
             dlg.Destroy()
-            logging.shutdown()
+            stop_logging()
             return
         except Exception:
             logger.exception("Fatal error when making an instance of replicator")
             e_dlg = ErrorDialog(self.frame)
             e_dlg.ShowModal()
             e_dlg.Destroy()
-            logging.shutdown()
+            stop_logging()
             return
 
         src_anchor_fp = replicator.get_fp_by_ref(src_anchor_fp_reference)
@@ -480,7 +164,7 @@ class ReplicateLayout(pcbnew.ActionPlugin):
             dlg = wx.MessageDialog(self.frame, message, caption, wx.OK | wx.ICON_ERROR)
             dlg.ShowModal()
             dlg.Destroy()
-            logging.shutdown()
+            stop_logging()
             return
 
         # show dialog
@@ -503,5 +187,5 @@ class ReplicateLayout(pcbnew.ActionPlugin):
             e_dlg = ErrorDialog(self.frame)
             e_dlg.ShowModal()
             e_dlg.Destroy()
-            logging.shutdown()
+            stop_logging()
             return
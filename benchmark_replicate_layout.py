@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#  benchmark_replicate_layout.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+"""
+Scaling benchmark on generated boards with N sheet instances, M footprints per sheet
+and K tracks per sheet (with K/10 zones, text items and drawings), e.g.:
+python benchmark_replicate_layout.py --sheets 2 4 8 16 --footprints 20 --items 40 --output results.json
+Each of N, M and K given with several values is swept with the others kept at their first value.
+Without KiCad, the benchmark runs on the pure Python pcbnew stand-in (fake_pcbnew.py).
+With --import-time, the time KiCad spends at startup importing and registering the plugin is measured instead.
+"""
+import os
+import sys
+import math
+import json
+import time
+import uuid
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+try:
+    import pcbnew
+except ImportError:
+    import fake_pcbnew
+    pcbnew = fake_pcbnew.install()
+from replicate_layout import Replicator, Settings
+
+STAGES = ['init', 'prepare', 'remove_before', 'footprints', 'remove_after', 'tracks', 'zones', 'text',
+          'drawings', 'duplicates', 'refill']
+# scaling exponent above which a stage is reported as worse than linear
+SCALING_LIMIT = 1.5
+SHEET_FILE = "channel.kicad_sch"
+SHEET_PITCH = 100.0
+FP_PITCH = 5.0
+# at startup only the registration shim of the plugin should be imported
+SHIM_MODULE = "action_replicate_layout"
+DEFERRED_MODULES = ['wx', 'difflib']
+# run in a fresh interpreter, the same way KiCad imports the plugin folder as a package
+IMPORT_SCRIPT = """
+import os, sys, json, time, importlib
+plugin_folder = sys.argv[1]
+sys.path.insert(0, os.path.dirname(plugin_folder))
+try:
+    import pcbnew
+except ImportError:
+    sys.path.insert(0, plugin_folder)
+    import fake_pcbnew
+    fake_pcbnew.install()
+before = set(sys.modules)
+start_time = time.perf_counter()
+importlib.import_module(os.path.basename(plugin_folder))
+import_time = time.perf_counter() - start_time
+print(json.dumps({'time': import_time, 'modules': sorted(set(sys.modules) - before)}))
+"""
+
+
+def no_progress(stage, percentage, message=None):
+    pass
+
+
+def get_uuid(*names):
+    """ reproducible uuids, so that generated boards can be diffed """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "/".join(str(x) for x in names)))
+
+
+def get_ref(sheet, footprint, nr_footprints):
+    return f"R{sheet + 1}{footprint:0{len(str(nr_footprints))}d}"
+
+
+def get_net_name(sheet, net):
+    return f"/Channel{sheet + 1}/N{net}"
+
+
+def generate_board(filename, nr_sheets, nr_footprints, nr_items):
+    """
+    write a board with nr_sheets instances of the same sheet, each with nr_footprints footprints in a row
+    connected in a chain and nr_items tracks, and nr_items/10 zones, text items and drawings
+    """
+    nr_nets = nr_footprints + 1
+    nr_other = max(1, nr_items // 10)
+    lines = ['(kicad_pcb (version 20211014) (generator pcbnew)',
+             '  (general (thickness 1.6))',
+             '  (paper "A4")',
+             '  (layers',
+             '    (0 "F.Cu" signal)',
+             '    (31 "B.Cu" signal)',
+             '    (36 "B.SilkS" user "B.Silkscreen")',
+             '    (37 "F.SilkS" user "F.Silkscreen")',
+             '    (44 "Edge.Cuts" user)',
+             '    (49 "F.Fab" user)',
+             '  )',
+             '  (net 0 "")']
+    for sheet in range(nr_sheets):
+        for net in range(nr_nets):
+            lines.append(f'  (net {1 + sheet * nr_nets + net} "{get_net_name(sheet, net)}")')
+
+    for sheet in range(nr_sheets):
+        x0 = (sheet % 10) * SHEET_PITCH
+        y0 = (sheet // 10) * SHEET_PITCH
+        net_offset = 1 + sheet * nr_nets
+        for fp in range(nr_footprints):
+            x = x0 + (fp % 16) * FP_PITCH
+            y = y0 + (fp // 16) * FP_PITCH
+            ref = get_ref(sheet, fp, nr_footprints)
+            lines.extend([
+                '  (footprint "Benchmark:R" (layer "F.Cu")',
+                f'    (tstamp {get_uuid("fp", sheet, fp)})',
+                f'    (at {x} {y})',
+                f'    (property "Sheetfile" "{SHEET_FILE}")',
+                f'    (property "Sheetname" "Channel{sheet + 1}")',
+                f'    (path "/{get_uuid("sheet", sheet)}/{get_uuid("symbol", fp)}")',
+                '    (attr smd)',
+                f'    (fp_text reference "{ref}" (at 0 -1.5) (layer "F.SilkS")',
+                '      (effects (font (size 0.5 0.5) (thickness 0.1)))',
+                f'      (tstamp {get_uuid("ref", sheet, fp)})',
+                '    )',
+                '    (fp_text value "1k" (at 0 1.5) (layer "F.Fab")',
+                '      (effects (font (size 0.5 0.5) (thickness 0.1)))',
+                f'      (tstamp {get_uuid("value", sheet, fp)})',
+                '    )',
+                '    (pad "1" smd rect (at -1.5 0) (size 1 1.6) (layers "F.Cu")',
+                f'      (net {net_offset + fp} "{get_net_name(sheet, fp)}") (tstamp {get_uuid("pad1", sheet, fp)}))',
+                '    (pad "2" smd rect (at 1.5 0) (size 1 1.6) (layers "F.Cu")',
+                f'      (net {net_offset + fp + 1} "{get_net_name(sheet, fp + 1)}") (tstamp {get_uuid("pad2", sheet, fp)}))',
+                '  )'])
+
+        # tracks from the pad 2 of a footprint to the pad 1 of the next one, several parallel ones if needed
+        for item in range(nr_items if nr_footprints > 1 else 0):
+            fp = item % (nr_footprints - 1)
+            offset = 0.2 * (item // (nr_footprints - 1) % 5)
+            x = x0 + (fp % 16) * FP_PITCH + 1.5
+            y = y0 + (fp // 16) * FP_PITCH + offset
+            if (fp + 1) % 16:
+                end = f'{x + FP_PITCH - 3.0} {y}'
+            else:
+                end = f'{x0 - 1.5} {y + FP_PITCH}'
+            lines.append(f'  (segment (start {x} {y}) (end {end}) (width 0.25) (layer "F.Cu") '
+                         f'(net {net_offset + fp + 1}) (tstamp {get_uuid("track", sheet, item)}))')
+
+        for item in range(nr_other):
+            fp = item % nr_footprints
+            x = x0 + (fp % 16) * FP_PITCH
+            y = y0 + (fp // 16) * FP_PITCH
+            net = net_offset + fp
+            lines.extend([
+                f'  (zone (net {net}) (net_name "{get_net_name(sheet, fp)}") (layer "B.Cu") '
+                f'(tstamp {get_uuid("zone", sheet, item)}) (hatch edge 0.508)',
+                '    (connect_pads (clearance 0.508))',
+                '    (min_thickness 0.254)',
+                '    (fill (thermal_gap 0.508) (thermal_bridge_width 0.508))',
+                '    (polygon',
+                '      (pts',
+                f'        (xy {x - 2} {y - 2}) (xy {x + 2} {y - 2}) (xy {x + 2} {y + 2}) (xy {x - 2} {y + 2})',
+                '      )',
+                '    )',
+                '  )',
+                f'  (gr_text "T{item}" (at {x} {y + 0.5}) (layer "F.SilkS") (tstamp {get_uuid("text", sheet, item)})',
+                '    (effects (font (size 0.5 0.5) (thickness 0.1)))',
+                '  )',
+                f'  (gr_line (start {x - 1} {y - 0.5}) (end {x + 1} {y - 0.5}) (layer "F.SilkS") (width 0.12) '
+                f'(tstamp {get_uuid("drawing", sheet, item)}))'])
+    lines.append(')')
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def run_case(filename, nr_footprints, settings, memory=False):
+    """ replicate sheet 1 to all the other sheets, returns time (and peak memory) for each of the stages """
+    board = pcbnew.LoadBoard(filename)
+    anchor = get_ref(0, 0, nr_footprints)
+    if memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    replicator = Replicator(board, anchor, no_progress)
+    init_time = time.perf_counter() - start_time
+    init_memory = tracemalloc.get_traced_memory()[1] if memory else None
+    src_anchor_fp = replicator.get_fp_by_ref(anchor)
+    dst_sheets = replicator.get_sheets_on_level(src_anchor_fp, 0)
+    replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:1], dst_sheets,
+                                settings, rm_duplicates=True)
+    result = {'times': {'init': init_time},
+              'total': time.perf_counter() - start_time,
+              'sheets': replicator.report['sheets']}
+    for stage in STAGES[1:]:
+        if stage in replicator.stats.stages:
+            result['times'][stage] = replicator.stats.get_stage_time(stage)
+    if memory:
+        result['memory'] = {'init': init_memory, 'peak': tracemalloc.get_traced_memory()[1],
+                            'stages': replicator.report['memory']}
+        tracemalloc.stop()
+    return result
+
+
+def get_deferred_imports(modules, package):
+    """ modules imported at registration which should be imported only when the plugin is run """
+    deferred = []
+    for module in modules:
+        if module.split('.')[0] in DEFERRED_MODULES:
+            deferred.append(module)
+        elif module.startswith(package + '.') and module != package + '.' + SHIM_MODULE:
+            deferred.append(module)
+    return deferred
+
+
+def measure_import_time(plugin_folder=None, repeat=3):
+    """ best time of importing and registering the plugin, and the modules imported with it """
+    if plugin_folder is None:
+        plugin_folder = os.path.dirname(os.path.abspath(__file__))
+    package = os.path.basename(plugin_folder)
+    times = []
+    modules = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT, plugin_folder],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result['time'])
+        modules = result['modules']
+    return {'package': package,
+            'time': min(times),
+            'modules': modules,
+            'deferred': get_deferred_imports(modules, package)}
+
+
+def import_time_to_string(result):
+    lines = [f"Plugin registration took {result['time'] * 1000:.1f} ms "
+             f"and imported {len(result['modules'])} modules"]
+    for module in result['deferred']:
+        lines.append(f"    {module} should be imported only when the plugin is run")
+    return "\n".join(lines)
+
+
+def get_scaling(sizes, results):
+    """ scaling exponent of each stage between the smallest and the largest case, 1 is linear and 2 quadratic """
+    scaling = {}
+    if len(sizes) < 2 or sizes[0] == sizes[-1]:
+        return scaling
+    for stage in STAGES:
+        first = results[0]['times'].get(stage)
+        last = results[-1]['times'].get(stage)
+        # too short to be measured reliably
+        if not first or not last or last < 1e-3:
+            continue
+        scaling[stage] = math.log(last / first) / math.log(sizes[-1] / sizes[0])
+    return scaling
+
+
+def get_cases(args):
+    """ sweep each of the dimensions with more than one value, the rest are kept at their first value """
+    base = (args.sheets[0], args.footprints[0], args.items[0])
+    sweeps = []
+    for index, (name, values) in enumerate([('sheets', args.sheets), ('footprints', args.footprints),
+                                            ('items', args.items)]):
+        if len(values) > 1 or index == 0:
+            cases = []
+            for value in values:
+                case = list(base)
+                case[index] = value
+                cases.append(tuple(case))
+            sweeps.append((name, values, cases))
+    return sweeps
+
+
+def results_to_string(name, cases, results, scaling):
+    stages = [stage for stage in STAGES if any(stage in result['times'] for result in results)]
+    lines = [f"Sweep over {name}",
+             "    N     M     K " + "".join(f"{stage[:10]:>11}" for stage in stages) + "      total"]
+    for case, result in zip(cases, results):
+        times = "".join(f"{result['times'].get(stage, 0.0):11.4f}" for stage in stages)
+        lines.append(f"{case[0]:5d} {case[1]:5d} {case[2]:5d} " + times + f"{result['total']:11.4f}")
+        if 'memory' in result:
+            stage_memory = result['memory']['stages']
+            line = (f"{'':18}peak memory {result['memory']['peak'] / 1e6:.1f} MB "
+                    f"(init {result['memory']['init'] / 1e6:.1f} MB")
+            if stage_memory:
+                largest = max(stage_memory, key=stage_memory.get)
+                line = line + f", largest in {largest} {stage_memory[largest] / 1e6:.1f} MB"
+            lines.append(line + ")")
+    for stage, exponent in scaling.items():
+        if exponent > SCALING_LIMIT:
+            lines.append(f"    {stage} scales as {name}^{exponent:.2f}")
+    return "\n".join(lines)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Replicate layout scaling benchmark on generated boards")
+    parser.add_argument("-n", "--sheets", type=int, nargs="+", default=[2, 4, 8, 16],
+                        help="number of sheet instances")
+    parser.add_argument("-m", "--footprints", type=int, nargs="+", default=[20], help="footprints per sheet")
+    parser.add_argument("-k", "--items", type=int, nargs="+", default=[40], help="tracks per sheet")
+    parser.add_argument("--memory", action="store_true",
+                        help="also measure peak memory (in a separate run, as tracing slows everything down)")
+    parser.add_argument("--bounded-memory", action="store_true",
+                        help="replicate one destination sheet at a time (bounded memory mode)")
+    parser.add_argument("-o", "--output", help="save the results (JSON) to this file")
+    parser.add_argument("--keep", help="keep the generated boards in this folder")
+    parser.add_argument("--import-time", action="store_true",
+                        help="measure the plugin import and registration time at KiCad startup")
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    if args.import_time:
+        result = measure_import_time()
+        print(import_time_to_string(result))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=4)
+        return 1 if result['deferred'] else 0
+
+    settings = Settings(remove=True, intersecting=True, bounded_memory=args.bounded_memory)
+    folder = args.keep or tempfile.mkdtemp(prefix="replicate_layout_benchmark_")
+    os.makedirs(folder, exist_ok=True)
+
+    all_results = []
+    for name, sizes, cases in get_cases(args):
+        results = []
+        for case in cases:
+            filename = os.path.join(folder, "benchmark_%d_%d_%d.kicad_pcb" % case)
+            generate_board(filename, *case)
+            result = run_case(filename, case[1], settings)
+            if args.memory:
+                result['memory'] = run_case(filename, case[1], settings, memory=True)['memory']
+            result['case'] = {'sheets': case[0], 'footprints': case[1], 'items': case[2]}
+            results.append(result)
+            if not args.keep:
+                os.remove(filename)
+        scaling = get_scaling(sizes, results)
+        print(results_to_string(name, cases, results, scaling))
+        all_results.append({'sweep': name, 'results': results, 'scaling': scaling})
+    if not args.keep:
+        os.rmdir(folder)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(all_results, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,108 +19,274 @@
 #  MA 02110-1301, USA.
 #
 #
+import re
+import sys
+import json
+import hashlib
+from collections import Counter
 
+# board wide information which does not depend on the replication
+HEADER_KEYWORDS = ('version', 'generator', 'host', 'general', 'paper', 'page', 'layers', 'setup', 'title_block')
+# these are different every time an item is created
+IGNORED_KEYWORDS = ('tstamp', 'uuid')
 
-def getIndex(s, i): 
-    from collections import deque 
-    # If input is invalid. 
-    if s[i] != '(': 
-        return -1
-    # Create a deque to use it as a stack. 
-    d = deque() 
-    # Traverse through all elements 
-    # starting from i. 
-    for k in range(i, len(s)): 
-        # Pop a starting bracket 
-        # for every closing bracket 
-        if s[k] == ')': 
-            d.popleft() 
-        # Push all starting brackets 
-        elif s[k] == '(': 
-            d.append(s[i]) 
-        # If deque becomes empty 
-        if not d: 
-            return k 
-    return -1
-
-def remove_kicad_pcb_header(file_contents):
-    """
-       remove from file:
-        -verision info
-        -host info
-        -general info
-        -page info
-        -layers
-        -setup info
-        -title info
-    """
-    index_version_start = file_contents.find("(version")
-    index_version_stop = getIndex(file_contents, index_version_start)+1
-    trimmed_contents = file_contents[0:index_version_start] + file_contents[index_version_stop:-1]
+# keywords of the top level items grouped by the kind reported in the diff
+ITEM_KINDS = {'footprint': 'footprint', 'module': 'footprint',
+              'segment': 'track', 'arc': 'track', 'via': 'via', 'zone': 'zone',
+              'gr_text': 'text', 'gr_text_box': 'text',
+              'gr_line': 'drawing', 'gr_arc': 'drawing', 'gr_circle': 'drawing', 'gr_rect': 'drawing',
+              'gr_poly': 'drawing', 'gr_curve': 'drawing', 'dimension': 'drawing',
+              'group': 'group', 'net': 'net'}
+
+TOKEN_PATTERN = re.compile(r'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+
+
+def tokenize(f):
+    """ strings in KiCad files never span lines, so the file can be tokenized line by line """
+    for line in f:
+        yield from TOKEN_PATTERN.findall(line)
 
-    index_version_start = trimmed_contents.find("(host")
-    index_version_stop = getIndex(trimmed_contents, index_version_start)+1
-    trimmed_contents = trimmed_contents[0:index_version_start] + trimmed_contents[index_version_stop:-1]
 
-    index_version_start = trimmed_contents.find("(general")
-    index_version_stop = getIndex(trimmed_contents, index_version_start)+1
-    trimmed_contents = trimmed_contents[0:index_version_start] + trimmed_contents[index_version_stop:-1]
+def iterate_items(f):
+    """ yield top level items of the board one by one, each as a nested list of tokens """
+    stack = []
+    for token in tokenize(f):
+        if token == '(':
+            stack.append([])
+        elif token == ')':
+            node = stack.pop()
+            if len(stack) == 1:
+                yield node
+            elif stack:
+                stack[-1].append(node)
+        elif stack:
+            stack[-1].append(token)
 
-    index_version_start = trimmed_contents.find("(page")
-    index_version_stop = getIndex(trimmed_contents, index_version_start)+1
-    trimmed_contents = trimmed_contents[0:index_version_start] + trimmed_contents[index_version_stop:-1]
 
-    index_version_start = trimmed_contents.find("(layers")
-    index_version_stop = getIndex(trimmed_contents, index_version_start)+1
-    trimmed_contents = trimmed_contents[0:index_version_start] + trimmed_contents[index_version_stop:-1]
+def canonicalize(node):
+    """ text of the item without the data which is unique to each instance of the item """
+    keyword = node[0] if node else ''
+    parts = []
+    for child in node:
+        if isinstance(child, list):
+            if child and child[0] in IGNORED_KEYWORDS:
+                continue
+            if keyword == 'group' and child and child[0] == 'id':
+                continue
+            if keyword == 'group' and child and child[0] == 'members':
+                # member ids are new on every replication
+                parts.append("(members " + str(len(child) - 1) + ")")
+                continue
+            parts.append(canonicalize(child))
+        else:
+            parts.append(child)
+    return "(" + " ".join(parts) + ")"
 
-    index_version_start = trimmed_contents.find("(setup")
-    index_version_stop = getIndex(trimmed_contents, index_version_start)+1
-    trimmed_contents = trimmed_contents[0:index_version_start] + trimmed_contents[index_version_stop:-1]
 
-    index_version_start = trimmed_contents.find("(title_block")
-    index_version_stop = getIndex(trimmed_contents, index_version_start)+1
-    trimmed_contents = trimmed_contents[0:index_version_start] + trimmed_contents[index_version_stop:-1]
+def get_item_hash(record):
+    # raw digest keeps the hashes of a big board small
+    return hashlib.sha1(record.encode('utf-8')).digest()
+
+
+def hash_board(filename):
+    """ multiset of hashes of all the board items """
+    hashes = Counter()
+    with open(filename, encoding='utf-8') as f:
+        for node in iterate_items(f):
+            if not node or node[0] in HEADER_KEYWORDS:
+                continue
+            hashes[get_item_hash(canonicalize(node))] += 1
+    return hashes
 
-    return trimmed_contents
 
 def compare_boards(filename1, filename2):
-    import difflib
-    errnum = 0
-    with open(filename1) as f1:
-        with open(filename2) as f2:
-            contents_f1 = f1.read()
-            contents_f2 = f2.read()
-
-    contents_f1 = remove_kicad_pcb_header(contents_f1).split("\n")
-    contents_f2 = remove_kicad_pcb_header(contents_f2).split("\n")
-
-    # get a diff
-    diff = difflib.unified_diff(
-                contents_f1,
-                contents_f2,
-                fromfile='board1',
-                tofile='board2',
-                n=0)
-
-    # only timestamps on zones and file version information should differ
-    diffstring = []
-    for line in diff:
-        diffstring.append(line)
-    # if files are the same, finish now    
-    if not diffstring:
-        return 0
-    # get rid of diff information
-    del diffstring[0]
-    del diffstring[0]
-    # walktrough diff list and check for any significant differences
-    for line in diffstring:
-        index = diffstring.index(line)
-        if '@@' in line:
-            if (('tstamp' in diffstring[index + 1]) and ('tstamp' in diffstring[index + 2])):
-                # this is not a problem
-                pass
-            else:
-                # this is a problem
-                errnum = errnum + 1
-    return errnum
+    """ number of items which are present only in one of the boards """
+    hashes1 = hash_board(filename1)
+    hashes2 = hash_board(filename2)
+    only_in_1 = hashes1 - hashes2
+    only_in_2 = hashes2 - hashes1
+    return sum(only_in_1.values()) + sum(only_in_2.values())
+
+
+def unquote(token):
+    if len(token) > 1 and token[0] == '"' and token[-1] == '"':
+        return token[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return token
+
+
+def find_children(node, keyword):
+    return [child for child in node if isinstance(child, list) and child and child[0] == keyword]
+
+
+def find_child(node, keyword):
+    children = find_children(node, keyword)
+    return children[0] if children else None
+
+
+def get_item_kind(node):
+    return ITEM_KINDS.get(node[0], node[0])
+
+
+def get_net_code(node):
+    net = find_child(node, 'net')
+    if net is not None and len(net) > 1 and not isinstance(net[1], list):
+        return unquote(net[1])
+    return None
+
+
+def get_footprint_reference(node):
+    for child in find_children(node, 'fp_text') + find_children(node, 'property'):
+        if len(child) > 2 and unquote(child[1]) in ('reference', 'Reference'):
+            return unquote(child[2])
+    return None
+
+
+def get_footprint_sheet(node):
+    """ sheet is identified by the path of sheet uuids the footprint is placed in """
+    path = find_child(node, 'path')
+    if path is None or len(path) < 2:
+        return ()
+    return tuple(x for x in unquote(path[1]).split('/') if x)[:-1]
+
+
+class BoardScan:
+    """ item hashes and the data needed to attribute the items to sheets, but no items """
+    def __init__(self, filename):
+        self.filename = filename
+        self.hashes = Counter()
+        self.net_names = {}
+        self.net_sheets = {}
+        self.sheet_names = {}
+        self.sheet_files = {}
+        with open(filename, encoding='utf-8') as f:
+            for node in iterate_items(f):
+                if not node or node[0] in HEADER_KEYWORDS:
+                    continue
+                self.hashes[get_item_hash(canonicalize(node))] += 1
+                if node[0] == 'net' and len(node) > 2:
+                    self.net_names[unquote(node[1])] = unquote(node[2])
+                elif get_item_kind(node) == 'footprint':
+                    self.add_footprint(node)
+
+    def add_footprint(self, node):
+        sheet = get_footprint_sheet(node)
+        properties = {unquote(x[1]): unquote(x[2]) for x in find_children(node, 'property') if len(x) > 2}
+        if sheet:
+            if 'Sheetname' in properties:
+                self.sheet_names[sheet[-1]] = properties['Sheetname']
+            if 'Sheetfile' in properties:
+                self.sheet_files[sheet] = properties['Sheetfile']
+        for pad in find_children(node, 'pad'):
+            net_code = get_net_code(pad)
+            if net_code is not None:
+                self.net_sheets.setdefault(net_code, set()).add(sheet)
+
+    def get_sheet_path(self, sheet):
+        if sheet is None:
+            return None
+        return "/" + "/".join(self.sheet_names.get(x, x) for x in sheet)
+
+    def get_item_sheet(self, node):
+        """ footprints know their sheet, other items belong to the sheet all the pads on their net are on """
+        if get_item_kind(node) == 'footprint':
+            return get_footprint_sheet(node)
+        net_sheets = self.net_sheets.get(get_net_code(node), ())
+        if len(net_sheets) == 1:
+            return list(net_sheets)[0]
+        return None
+
+    def get_item_id(self, node):
+        """ items with the same kind and id are reported as modified instead of added and removed """
+        kind = get_item_kind(node)
+        if kind == 'footprint':
+            return get_footprint_reference(node)
+        if kind == 'zone':
+            layers = find_child(node, 'layers') or find_child(node, 'layer') or ['']
+            name = find_child(node, 'name')
+            return " ".join([self.net_names.get(get_net_code(node), '')]
+                            + [unquote(x) for x in layers[1:]]
+                            + ([unquote(name[1])] if name is not None else []))
+        if kind == 'text' and len(node) > 1:
+            return unquote(node[1])
+        if kind == 'net' and len(node) > 2:
+            return unquote(node[2])
+        return None
+
+    def get_differences(self, hashes):
+        """ describe the items with the given hashes, reading the board once more """
+        remaining = Counter(hashes)
+        differences = []
+        with open(self.filename, encoding='utf-8') as f:
+            for node in iterate_items(f):
+                if not node or node[0] in HEADER_KEYWORDS:
+                    continue
+                item_hash = get_item_hash(canonicalize(node))
+                if remaining[item_hash] <= 0:
+                    continue
+                remaining[item_hash] -= 1
+                sheet = self.get_item_sheet(node)
+                differences.append({'kind': get_item_kind(node),
+                                    'id': self.get_item_id(node),
+                                    'sheet': self.get_sheet_path(sheet),
+                                    'sheetfile': self.sheet_files.get(sheet)})
+        return differences
+
+
+def diff_boards(filename1, filename2):
+    """
+    semantic difference of the second board against the first one.
+    Items are classified as added, removed or modified by their kind and attributed to sheets
+    """
+    scan1 = BoardScan(filename1)
+    scan2 = BoardScan(filename2)
+    removed = scan1.get_differences(scan1.hashes - scan2.hashes)
+    added = scan2.get_differences(scan2.hashes - scan1.hashes)
+
+    # pair removed and added items with the same identity
+    added_by_id = {}
+    for item in added:
+        if item['id'] is not None:
+            added_by_id.setdefault((item['kind'], item['id']), []).append(item)
+    differences = []
+    modified = []
+    for item in removed:
+        matching = added_by_id.get((item['kind'], item['id']))
+        if item['id'] is not None and matching:
+            modified.append(matching.pop(0))
+            differences.append(dict(item, change='modified'))
+        else:
+            differences.append(dict(item, change='removed'))
+    modified_ids = set(id(x) for x in modified)
+    differences.extend(dict(x, change='added') for x in added if id(x) not in modified_ids)
+
+    summary = {}
+    for item in differences:
+        kind_summary = summary.setdefault(item['kind'], {'added': 0, 'removed': 0, 'modified': 0})
+        kind_summary[item['change']] += 1
+    return {'board1': filename1,
+            'board2': filename2,
+            'equal': not differences,
+            'summary': summary,
+            'differences': differences}
+
+
+def diff_report_to_string(report):
+    lines = [f"Differences of {report['board2']} against {report['board1']}"]
+    if report['equal']:
+        lines.append("Boards are equal")
+        return "\n".join(lines)
+    for kind, kind_summary in sorted(report['summary'].items()):
+        lines.append(f"{kind}: {kind_summary['added']} added, "
+                     f"{kind_summary['removed']} removed, {kind_summary['modified']} modified")
+    for item in report['differences']:
+        name = item['kind'] + (f" {item['id']}" if item['id'] else "")
+        sheet = item['sheet'] if item['sheet'] is not None else "unknown sheet"
+        lines.append(f"    {item['change']} {name} on {sheet}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # machine readable report, exit code tells if the boards differ
+    board_report = diff_boards(sys.argv[1], sys.argv[2])
+    print(json.dumps(board_report, indent=1))
+    sys.exit(0 if board_report['equal'] else 1)
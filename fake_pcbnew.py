@@ -0,0 +1,2384 @@
+# -*- coding: utf-8 -*-
+#  fake_pcbnew.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+"""
+Pure Python stand-in for the subset of pcbnew which the plugin uses.
+
+It is backed by plain Python data and can load and save a simplified .kicad_pcb
+(footprints with pads and text, tracks, vias, arcs, zones, text, drawings and groups).
+It is meant for tests and benchmarks on machines without a matching KiCad build:
+
+    import fake_pcbnew
+    fake_pcbnew.install()   # registers itself as pcbnew, unless real pcbnew is importable
+    import replicate_layout
+"""
+import sys
+import math
+import uuid
+import copy
+import re
+
+# internal units are nanometers as in KiCad 7
+IU_PER_MM = 1000000
+
+DEGREES_T = 1
+RADIANS_T = 2
+
+# copper layers
+F_Cu = 0
+B_Cu = 31
+
+DEFAULT_LAYER_NAMES = {0: "F.Cu", 31: "B.Cu", 32: "B.Adhes", 33: "F.Adhes", 34: "B.Paste", 35: "F.Paste",
+                       36: "B.SilkS", 37: "F.SilkS", 38: "B.Mask", 39: "F.Mask", 40: "Dwgs.User", 41: "Cmts.User",
+                       42: "Eco1.User", 43: "Eco2.User", 44: "Edge.Cuts", 45: "Margin", 46: "B.CrtYd", 47: "F.CrtYd",
+                       48: "B.Fab", 49: "F.Fab"}
+for _index in range(1, 31):
+    DEFAULT_LAYER_NAMES[_index] = "In{}.Cu".format(_index)
+for _index in range(1, 10):
+    DEFAULT_LAYER_NAMES[49 + _index] = "User.{}".format(_index)
+
+# layer pairs swapped when an item is flipped to the other side of the board
+FLIPPED_LAYERS = {0: 31, 32: 33, 34: 35, 36: 37, 38: 39, 46: 47, 48: 49}
+FLIPPED_LAYERS.update({v: k for k, v in list(FLIPPED_LAYERS.items())})
+
+# shape types
+SHAPE_T_SEGMENT = 0
+SHAPE_T_RECT = 1
+SHAPE_T_ARC = 2
+SHAPE_T_CIRCLE = 3
+SHAPE_T_POLY = 4
+SHAPE_T_BEZIER = 5
+
+SHAPE_KEYWORDS = {'line': SHAPE_T_SEGMENT, 'rect': SHAPE_T_RECT, 'arc': SHAPE_T_ARC,
+                  'circle': SHAPE_T_CIRCLE, 'poly': SHAPE_T_POLY}
+
+_current_board = None
+
+
+def install():
+    """ register this module as pcbnew, if the real one is not available """
+    if 'pcbnew' in sys.modules:
+        return sys.modules['pcbnew']
+    try:
+        import pcbnew
+        return pcbnew
+    except ImportError:
+        sys.modules['pcbnew'] = sys.modules[__name__]
+        return sys.modules[__name__]
+
+
+def IsCopperLayer(layer):
+    return 0 <= layer <= 31
+
+
+def FromMM(value):
+    return int(round(value * IU_PER_MM))
+
+
+def ToMM(value):
+    return value / IU_PER_MM
+
+
+def GetBuildVersion():
+    return "fake_pcbnew"
+
+
+def Refresh():
+    pass
+
+
+def GetBoard():
+    return _current_board
+
+
+def rotate_point(x, y, angle):
+    """ KiCad's RotatePoint, angle in degrees, counterclockwise on screen """
+    if angle == 0:
+        return x, y
+    angle_rad = math.radians(angle)
+    fcos = math.cos(angle_rad)
+    fsin = math.sin(angle_rad)
+    new_x = int(round(y * fsin + x * fcos))
+    new_y = int(round(y * fcos - x * fsin))
+    return new_x, new_y
+
+
+def normalize_angle(angle):
+    """ normalize angle to (-180, 180] """
+    while angle > 180:
+        angle = angle - 360
+    while angle <= -180:
+        angle = angle + 360
+    return angle
+
+
+class VECTOR2I:
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x=0, y=0):
+        if isinstance(x, VECTOR2I):
+            x, y = x.x, x.y
+        self.x = int(x)
+        self.y = int(y)
+
+    def __getitem__(self, index):
+        return (self.x, self.y)[index]
+
+    def __len__(self):
+        return 2
+
+    def __iter__(self):
+        return iter((self.x, self.y))
+
+    def __add__(self, other):
+        return VECTOR2I(self.x + other[0], self.y + other[1])
+
+    def __sub__(self, other):
+        return VECTOR2I(self.x - other[0], self.y - other[1])
+
+    def __neg__(self):
+        return VECTOR2I(-self.x, -self.y)
+
+    def __eq__(self, other):
+        try:
+            return self.x == other[0] and self.y == other[1]
+        except (TypeError, IndexError):
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __repr__(self):
+        return "VECTOR2I({}, {})".format(self.x, self.y)
+
+    def Get(self):
+        return self.x, self.y
+
+
+wxPoint = VECTOR2I
+VECTOR2I_MM = None
+
+
+class EDA_ANGLE:
+    __slots__ = ('degrees',)
+
+    def __init__(self, value=0.0, unit=DEGREES_T):
+        if isinstance(value, EDA_ANGLE):
+            value = value.degrees
+        elif unit == RADIANS_T:
+            value = math.degrees(value)
+        self.degrees = float(value)
+
+    def AsDegrees(self):
+        return self.degrees
+
+    def AsRadians(self):
+        return math.radians(self.degrees)
+
+    def __neg__(self):
+        return EDA_ANGLE(-self.degrees)
+
+    def __add__(self, other):
+        return EDA_ANGLE(self.degrees + EDA_ANGLE(other).degrees)
+
+    def __sub__(self, other):
+        return EDA_ANGLE(self.degrees - EDA_ANGLE(other).degrees)
+
+    def __eq__(self, other):
+        if not isinstance(other, EDA_ANGLE):
+            return False
+        return abs(self.degrees - other.degrees) < 1e-9
+
+    def __hash__(self):
+        return hash(round(self.degrees, 9))
+
+    def __repr__(self):
+        return "EDA_ANGLE({})".format(self.degrees)
+
+
+class BOX2I:
+    __slots__ = ('x', 'y', 'w', 'h')
+
+    def __init__(self, position=None, size=None):
+        position = position if position is not None else VECTOR2I(0, 0)
+        size = size if size is not None else VECTOR2I(0, 0)
+        self.x, self.y = position[0], position[1]
+        self.w, self.h = size[0], size[1]
+
+    @staticmethod
+    def from_points(points):
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        return BOX2I(VECTOR2I(min(xs), min(ys)), VECTOR2I(max(xs) - min(xs), max(ys) - min(ys)))
+
+    def GetX(self):
+        return self.x
+
+    def GetY(self):
+        return self.y
+
+    def GetWidth(self):
+        return self.w
+
+    def GetHeight(self):
+        return self.h
+
+    def GetLeft(self):
+        return min(self.x, self.x + self.w)
+
+    def GetRight(self):
+        return max(self.x, self.x + self.w)
+
+    def GetTop(self):
+        return min(self.y, self.y + self.h)
+
+    def GetBottom(self):
+        return max(self.y, self.y + self.h)
+
+    def GetOrigin(self):
+        return VECTOR2I(self.x, self.y)
+
+    def GetPosition(self):
+        return VECTOR2I(self.x, self.y)
+
+    def GetSize(self):
+        return VECTOR2I(self.w, self.h)
+
+    def GetEnd(self):
+        return VECTOR2I(self.x + self.w, self.y + self.h)
+
+    def GetCenter(self):
+        return VECTOR2I(self.x + self.w // 2, self.y + self.h // 2)
+
+    def Contains(self, other, y=None):
+        if y is not None:
+            other = VECTOR2I(other, y)
+        if isinstance(other, BOX2I):
+            return self.GetLeft() <= other.GetLeft() and other.GetRight() <= self.GetRight() and \
+                self.GetTop() <= other.GetTop() and other.GetBottom() <= self.GetBottom()
+        return self.GetLeft() <= other[0] <= self.GetRight() and self.GetTop() <= other[1] <= self.GetBottom()
+
+    def Intersects(self, other):
+        return not (other.GetRight() < self.GetLeft() or other.GetLeft() > self.GetRight() or
+                    other.GetBottom() < self.GetTop() or other.GetTop() > self.GetBottom())
+
+    def Merge(self, other):
+        left = min(self.GetLeft(), other.GetLeft())
+        top = min(self.GetTop(), other.GetTop())
+        right = max(self.GetRight(), other.GetRight())
+        bottom = max(self.GetBottom(), other.GetBottom())
+        self.x, self.y, self.w, self.h = left, top, right - left, bottom - top
+        return self
+
+    def Inflate(self, dx, dy=None):
+        dy = dx if dy is None else dy
+        self.x, self.y, self.w, self.h = self.GetLeft() - dx, self.GetTop() - dy, \
+            abs(self.w) + 2 * dx, abs(self.h) + 2 * dy
+        return self
+
+    def __eq__(self, other):
+        return isinstance(other, BOX2I) and \
+            (self.GetLeft(), self.GetTop(), self.GetRight(), self.GetBottom()) == \
+            (other.GetLeft(), other.GetTop(), other.GetRight(), other.GetBottom())
+
+    def __repr__(self):
+        return "BOX2I({}, {}, {}, {})".format(self.x, self.y, self.w, self.h)
+
+
+class KIID:
+    __slots__ = ('value',)
+
+    def __init__(self, value=None):
+        self.value = str(value) if value else str(uuid.uuid4())
+
+    def AsString(self):
+        return self.value
+
+    def __eq__(self, other):
+        return isinstance(other, KIID) and self.value == other.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __repr__(self):
+        return "KIID({})".format(self.value)
+
+
+class KIID_PATH:
+    def __init__(self, path=""):
+        self.path = path
+
+    def AsString(self):
+        return self.path
+
+
+class LSET:
+    def __init__(self, layers=()):
+        self.layers = sorted(set(layers))
+
+    def Seq(self):
+        return list(self.layers)
+
+    def CuStack(self):
+        return [x for x in self.layers if IsCopperLayer(x)]
+
+    def Users(self):
+        return [x for x in self.layers if x >= 50]
+
+    def Contains(self, layer):
+        return layer in self.layers
+
+    def AddLayer(self, layer):
+        if layer not in self.layers:
+            self.layers = sorted(self.layers + [layer])
+        return self
+
+    def __eq__(self, other):
+        return isinstance(other, LSET) and self.layers == other.layers
+
+    def __hash__(self):
+        return hash(tuple(self.layers))
+
+    def __iter__(self):
+        return iter(self.layers)
+
+
+class NETINFO_ITEM:
+    def __init__(self, board, name, code):
+        self.board = board
+        self.name = name
+        self.code = code
+
+    def GetNetname(self):
+        return self.name
+
+    def GetShortNetname(self):
+        return self.name.split("/")[-1]
+
+    def GetNetCode(self):
+        return self.code
+
+
+class NETINFO_LIST:
+    def __init__(self):
+        self.by_name = {}
+        self.by_code = {}
+
+    def add(self, net):
+        self.by_name[net.name] = net
+        self.by_code[net.code] = net
+
+    def GetNetItem(self, key):
+        if isinstance(key, int):
+            return self.by_code.get(key)
+        return self.by_name.get(key)
+
+    def GetNetCount(self):
+        return len(self.by_code)
+
+    def NetsByName(self):
+        return dict(self.by_name)
+
+    def NetsByNetcode(self):
+        return dict(self.by_code)
+
+
+class EDA_ITEM:
+    """ common functionality of all board items """
+    CLASS = "EDA_ITEM"
+
+    def __init__(self, parent=None):
+        self.m_Uuid = KIID()
+        self.parent = parent
+        self.parent_group = None
+        self.layer = F_Cu
+        self.locked = False
+        self.selected = False
+        self.brightened = False
+
+    def GetClass(self):
+        return self.CLASS
+
+    def GetTypeDesc(self):
+        return self.CLASS
+
+    def Cast(self):
+        return self
+
+    def GetParent(self):
+        return self.parent
+
+    def GetParentGroup(self):
+        return self.parent_group
+
+    def SetParentGroup(self, group):
+        self.parent_group = group
+
+    def GetLayer(self):
+        return self.layer
+
+    def SetLayer(self, layer):
+        self.layer = layer
+
+    def GetLayerSet(self):
+        return LSET([self.layer])
+
+    def GetLayerName(self):
+        board = self.GetBoard()
+        if board is not None:
+            return board.GetLayerName(self.layer)
+        return DEFAULT_LAYER_NAMES.get(self.layer, "")
+
+    def GetBoard(self):
+        parent = self.parent
+        while parent is not None and not isinstance(parent, BOARD):
+            parent = parent.parent
+        return parent
+
+    def IsOnLayer(self, layer):
+        return layer in self.GetLayerSet().Seq()
+
+    def IsLocked(self):
+        return self.locked
+
+    def SetLocked(self, locked):
+        self.locked = bool(locked)
+
+    def IsSelected(self):
+        return self.selected
+
+    def SetSelected(self):
+        self.selected = True
+
+    def ClearSelected(self):
+        self.selected = False
+
+    def IsBrightened(self):
+        return self.brightened
+
+    def SetBrightened(self):
+        self.brightened = True
+
+    def ClearBrightened(self):
+        self.brightened = False
+
+    def Duplicate(self):
+        """ same as in KiCad, duplicate gets a new KIID and is added into the same group """
+        group = self.parent_group
+        self.parent_group = None
+        try:
+            dupe = copy.deepcopy(self, {id(self.parent): self.parent})
+        finally:
+            self.parent_group = group
+        dupe.reset_uuids()
+        dupe.selected = False
+        if group is not None:
+            group.AddItem(dupe)
+        return dupe
+
+    def reset_uuids(self):
+        self.m_Uuid = KIID()
+
+    def __deepcopy__(self, memo):
+        cls = self.__class__
+        new = cls.__new__(cls)
+        memo[id(self)] = new
+        for key, value in self.__dict__.items():
+            if key in ('parent', 'board'):
+                setattr(new, key, value)
+            elif key == 'net':
+                setattr(new, key, value)
+            else:
+                setattr(new, key, copy.deepcopy(value, memo))
+        return new
+
+    # geometry, overridden in subclasses
+    def points(self):
+        return []
+
+    def set_points(self, points):
+        pass
+
+    def transform(self, function):
+        self.set_points([function(p) for p in self.points()])
+
+    def GetBoundingBox(self):
+        points = self.points()
+        if not points:
+            return BOX2I()
+        box = BOX2I.from_points(points)
+        return box
+
+    def GetPosition(self):
+        points = self.points()
+        return VECTOR2I(points[0]) if points else VECTOR2I(0, 0)
+
+    def SetPosition(self, position):
+        self.Move(VECTOR2I(position) - self.GetPosition())
+
+    def Move(self, move_vector):
+        dx, dy = move_vector[0], move_vector[1]
+        self.transform(lambda p: VECTOR2I(p[0] + dx, p[1] + dy))
+
+    def Rotate(self, center, angle):
+        angle = EDA_ANGLE(angle).degrees
+        cx, cy = center[0], center[1]
+
+        def rotate(p):
+            x, y = rotate_point(p[0] - cx, p[1] - cy, angle)
+            return VECTOR2I(x + cx, y + cy)
+        self.transform(rotate)
+        self.rotate_angles(angle)
+
+    def rotate_angles(self, angle):
+        pass
+
+    def Flip(self, center, flip_left_right=False):
+        cx, cy = center[0], center[1]
+        if flip_left_right:
+            self.transform(lambda p: VECTOR2I(2 * cx - p[0], p[1]))
+        else:
+            self.transform(lambda p: VECTOR2I(p[0], 2 * cy - p[1]))
+        self.flip_layers()
+        self.flip_angles(flip_left_right)
+
+    def flip_layers(self):
+        self.layer = FLIPPED_LAYERS.get(self.layer, self.layer)
+
+    def flip_angles(self, flip_left_right):
+        pass
+
+    def HitTest(self, position, accuracy=0):
+        box = self.GetBoundingBox().Inflate(accuracy)
+        return box.Contains(position)
+
+
+class BOARD_ITEM(EDA_ITEM):
+    CLASS = "BOARD_ITEM"
+
+
+class BOARD_CONNECTED_ITEM(BOARD_ITEM):
+    CLASS = "BOARD_CONNECTED_ITEM"
+
+    def __init__(self, parent=None):
+        super(BOARD_CONNECTED_ITEM, self).__init__(parent)
+        self.net = None
+
+    def GetNet(self):
+        return self.net
+
+    def SetNet(self, net):
+        self.net = net
+
+    def GetNetCode(self):
+        return self.net.code if self.net is not None else 0
+
+    def GetNetname(self):
+        return self.net.name if self.net is not None else ""
+
+    def SetNetCode(self, code):
+        board = self.GetBoard()
+        if board is not None:
+            self.net = board.FindNet(code)
+        elif code == 0:
+            self.net = None
+        return True
+
+
+class PCB_TRACK(BOARD_CONNECTED_ITEM):
+    CLASS = "PCB_TRACK"
+
+    def __init__(self, parent=None):
+        super(PCB_TRACK, self).__init__(parent)
+        self.start = VECTOR2I(0, 0)
+        self.end = VECTOR2I(0, 0)
+        self.width = FromMM(0.25)
+
+    def GetStart(self):
+        return VECTOR2I(self.start)
+
+    def SetStart(self, position):
+        self.start = VECTOR2I(position)
+
+    def GetEnd(self):
+        return VECTOR2I(self.end)
+
+    def SetEnd(self, position):
+        self.end = VECTOR2I(position)
+
+    def GetWidth(self):
+        return self.width
+
+    def SetWidth(self, width):
+        self.width = int(width)
+
+    def GetLength(self):
+        return math.hypot(self.end.x - self.start.x, self.end.y - self.start.y)
+
+    def points(self):
+        return [self.start, self.end]
+
+    def set_points(self, points):
+        self.start, self.end = points
+
+    def GetPosition(self):
+        return VECTOR2I(self.start)
+
+    def GetBoundingBox(self):
+        return BOX2I.from_points(self.points()).Inflate(self.width // 2)
+
+
+class PCB_ARC(PCB_TRACK):
+    CLASS = "PCB_ARC"
+
+    def __init__(self, parent=None):
+        super(PCB_ARC, self).__init__(parent)
+        self.mid = VECTOR2I(0, 0)
+
+    def GetMid(self):
+        return VECTOR2I(self.mid)
+
+    def SetMid(self, position):
+        self.mid = VECTOR2I(position)
+
+    def points(self):
+        return [self.start, self.mid, self.end]
+
+    def set_points(self, points):
+        self.start, self.mid, self.end = points
+
+
+class PCB_VIA(PCB_TRACK):
+    CLASS = "PCB_VIA"
+
+    def __init__(self, parent=None):
+        super(PCB_VIA, self).__init__(parent)
+        self.drill = FromMM(0.4)
+        self.layers = [F_Cu, B_Cu]
+
+    def GetDrillValue(self):
+        return self.drill
+
+    def SetDrill(self, drill):
+        self.drill = int(drill)
+
+    def GetLayerSet(self):
+        return LSET(range(min(self.layers), max(self.layers) + 1))
+
+    def TopLayer(self):
+        return self.layers[0]
+
+    def BottomLayer(self):
+        return self.layers[1]
+
+    def SetLayerPair(self, top, bottom):
+        self.layers = [top, bottom]
+
+    def points(self):
+        return [self.start]
+
+    def set_points(self, points):
+        self.start = points[0]
+        self.end = points[0]
+
+    def flip_layers(self):
+        self.layers = [FLIPPED_LAYERS.get(x, x) for x in self.layers]
+
+
+class SHAPE_LINE_CHAIN:
+    """ closed chain of points, the outline or a hole of a polygon """
+
+    def __init__(self, other=None):
+        self.pts = [VECTOR2I(p) for p in other] if other is not None else []
+        self.closed = True
+
+    def Append(self, x, y=None):
+        self.pts.append(VECTOR2I(x) if y is None else VECTOR2I(x, y))
+
+    def PointCount(self):
+        return len(self.pts)
+
+    def CPoint(self, index):
+        return VECTOR2I(self.pts[index])
+
+    def IsClosed(self):
+        return self.closed
+
+    def SetClosed(self, closed):
+        self.closed = closed
+
+    def __iter__(self):
+        return iter(self.pts)
+
+    def __len__(self):
+        return len(self.pts)
+
+
+class SHAPE_POLY_SET:
+    """ polygons, each of them is an outline followed by its holes """
+
+    def __init__(self, other=None):
+        if isinstance(other, SHAPE_POLY_SET):
+            self.polygons = [[SHAPE_LINE_CHAIN(chain) for chain in polygon] for polygon in other.polygons]
+        else:
+            self.polygons = []
+
+    def chains(self):
+        return [chain for polygon in self.polygons for chain in polygon]
+
+    def NewOutline(self):
+        self.polygons.append([SHAPE_LINE_CHAIN()])
+        return len(self.polygons) - 1
+
+    def NewHole(self, outline=-1):
+        self.polygons[outline].append(SHAPE_LINE_CHAIN())
+        return len(self.polygons[outline]) - 2
+
+    def Append(self, x, y, outline=-1, hole=-1):
+        # hole -1 is the outline itself
+        self.polygons[outline][hole + 1 if hole >= 0 else 0].Append(x, y)
+
+    def OutlineCount(self):
+        return len(self.polygons)
+
+    def Outline(self, index):
+        return self.polygons[index][0]
+
+    def AddOutline(self, outline):
+        self.polygons.append([SHAPE_LINE_CHAIN(outline)])
+        return len(self.polygons) - 1
+
+    def HoleCount(self, outline):
+        return len(self.polygons[outline]) - 1
+
+    def Hole(self, outline, hole):
+        return self.polygons[outline][hole + 1]
+
+    def AddHole(self, hole, outline=-1):
+        self.polygons[outline].append(SHAPE_LINE_CHAIN(hole))
+        return len(self.polygons[outline]) - 2
+
+    def TotalVertices(self):
+        return sum(len(x) for x in self.chains())
+
+    def CVertex(self, index):
+        for chain in self.chains():
+            if index < len(chain):
+                return chain.CPoint(index)
+            index = index - len(chain)
+        raise IndexError(index)
+
+    def IsEmpty(self):
+        return self.TotalVertices() == 0
+
+    def RemoveAllContours(self):
+        self.polygons = []
+
+    def points(self):
+        return [p for chain in self.chains() for p in chain]
+
+    def set_points(self, points):
+        it = iter(points)
+        for chain in self.chains():
+            chain.pts = [next(it) for _ in chain.pts]
+
+    def BBox(self):
+        return BOX2I.from_points(self.points())
+
+    def Contains(self, point):
+        return any(point_in_polygon(point, polygon[0].pts)
+                   and not any(point_in_polygon(point, hole.pts) for hole in polygon[1:])
+                   for polygon in self.polygons)
+
+    def CloneDropTriangulation(self):
+        return SHAPE_POLY_SET(self)
+
+
+def point_in_polygon(point, polygon):
+    x, y = point[0], point[1]
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        xi, yi = polygon[i][0], polygon[i][1]
+        xj, yj = polygon[j][0], polygon[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+ZONE_SETTING_ATTRIBUTES = ('priority', 'min_thickness', 'clearance', 'thermal_gap', 'thermal_bridge_width',
+                           'pad_connection', 'is_rule_area', 'keepout', 'zone_name', 'fill_mode', 'hatch',
+                           'hatch_thickness', 'hatch_gap', 'hatch_orientation', 'hatch_smoothing_level',
+                           'hatch_smoothing_value', 'hatch_hole_min_area', 'hatch_border_algorithm',
+                           'island_removal_mode', 'min_island_area', 'corner_smoothing_type', 'corner_radius')
+
+
+class ZONE(BOARD_CONNECTED_ITEM):
+    CLASS = "ZONE"
+
+    def __init__(self, parent=None):
+        super(ZONE, self).__init__(parent)
+        self.layers = [F_Cu]
+        self.outline = SHAPE_POLY_SET()
+        self.filled_polygons = {}
+        self.is_filled = False
+        self.need_refill = False
+        self.priority = 0
+        self.min_thickness = FromMM(0.254)
+        self.clearance = FromMM(0.508)
+        self.thermal_gap = FromMM(0.508)
+        self.thermal_bridge_width = FromMM(0.508)
+        self.pad_connection = "yes"
+        self.is_rule_area = False
+        self.keepout = {}
+        self.zone_name = ""
+        self.fill_mode = 0
+        self.hatch = ("edge", FromMM(0.508))
+        self.hatch_thickness = FromMM(1)
+        self.hatch_gap = FromMM(1.5)
+        self.hatch_orientation = EDA_ANGLE(0)
+        self.hatch_smoothing_level = 0
+        self.hatch_smoothing_value = 0.1
+        self.hatch_hole_min_area = 0.3
+        self.hatch_border_algorithm = 1
+        self.island_removal_mode = 0
+        self.min_island_area = FromMM(10) * FromMM(1)
+        self.corner_smoothing_type = 0
+        self.corner_radius = 0
+
+    def GetLayer(self):
+        return self.layers[0]
+
+    def SetLayer(self, layer):
+        self.layers = [layer]
+
+    def GetLayerSet(self):
+        return LSET(self.layers)
+
+    def SetLayerSet(self, layer_set):
+        self.layers = list(layer_set.Seq())
+
+    def IsOnCopperLayer(self):
+        return any(IsCopperLayer(x) for x in self.layers)
+
+    def GetIsRuleArea(self):
+        return self.is_rule_area
+
+    def SetIsRuleArea(self, is_rule_area):
+        self.is_rule_area = is_rule_area
+
+    def GetAssignedPriority(self):
+        return self.priority
+
+    def SetAssignedPriority(self, priority):
+        self.priority = priority
+
+    def GetZoneName(self):
+        return self.zone_name
+
+    def SetZoneName(self, name):
+        self.zone_name = name
+
+    def GetMinThickness(self):
+        return self.min_thickness
+
+    def SetMinThickness(self, value):
+        self.min_thickness = value
+
+    def GetLocalClearance(self):
+        return self.clearance
+
+    def SetLocalClearance(self, value):
+        self.clearance = value
+
+    def GetThermalReliefGap(self):
+        return self.thermal_gap
+
+    def SetThermalReliefGap(self, value):
+        self.thermal_gap = value
+
+    def GetThermalReliefSpokeWidth(self):
+        return self.thermal_bridge_width
+
+    def SetThermalReliefSpokeWidth(self, value):
+        self.thermal_bridge_width = value
+
+    def GetPadConnection(self):
+        return self.pad_connection
+
+    def SetPadConnection(self, value):
+        self.pad_connection = value
+
+    def GetFillMode(self):
+        return self.fill_mode
+
+    def SetFillMode(self, value):
+        self.fill_mode = value
+
+    def GetHatchStyle(self):
+        return self.hatch[0]
+
+    def SetHatchStyle(self, value):
+        self.hatch = (value, self.hatch[1])
+
+    def GetBorderHatchPitch(self):
+        return self.hatch[1]
+
+    def SetBorderHatchPitch(self, value):
+        self.hatch = (self.hatch[0], value)
+
+    def GetHatchThickness(self):
+        return self.hatch_thickness
+
+    def SetHatchThickness(self, value):
+        self.hatch_thickness = value
+
+    def GetHatchGap(self):
+        return self.hatch_gap
+
+    def SetHatchGap(self, value):
+        self.hatch_gap = value
+
+    def GetHatchOrientation(self):
+        return self.hatch_orientation
+
+    def SetHatchOrientation(self, angle):
+        self.hatch_orientation = angle
+
+    def GetHatchSmoothingLevel(self):
+        return self.hatch_smoothing_level
+
+    def SetHatchSmoothingLevel(self, value):
+        self.hatch_smoothing_level = value
+
+    def GetHatchSmoothingValue(self):
+        return self.hatch_smoothing_value
+
+    def SetHatchSmoothingValue(self, value):
+        self.hatch_smoothing_value = value
+
+    def GetHatchHoleMinArea(self):
+        return self.hatch_hole_min_area
+
+    def SetHatchHoleMinArea(self, value):
+        self.hatch_hole_min_area = value
+
+    def GetHatchBorderAlgorithm(self):
+        return self.hatch_border_algorithm
+
+    def SetHatchBorderAlgorithm(self, value):
+        self.hatch_border_algorithm = value
+
+    def GetIslandRemovalMode(self):
+        return self.island_removal_mode
+
+    def SetIslandRemovalMode(self, value):
+        self.island_removal_mode = value
+
+    def GetMinIslandArea(self):
+        return self.min_island_area
+
+    def SetMinIslandArea(self, value):
+        self.min_island_area = value
+
+    def GetCornerSmoothingType(self):
+        return self.corner_smoothing_type
+
+    def SetCornerSmoothingType(self, value):
+        self.corner_smoothing_type = value
+
+    def GetCornerRadius(self):
+        return self.corner_radius
+
+    def SetCornerRadius(self, value):
+        self.corner_radius = value
+
+    def get_keepout(self, key):
+        return self.keepout.get(key) == "not_allowed"
+
+    def set_keepout(self, key, value):
+        self.keepout[key] = "not_allowed" if value else "allowed"
+
+    def GetDoNotAllowTracks(self):
+        return self.get_keepout('tracks')
+
+    def SetDoNotAllowTracks(self, value):
+        self.set_keepout('tracks', value)
+
+    def GetDoNotAllowVias(self):
+        return self.get_keepout('vias')
+
+    def SetDoNotAllowVias(self, value):
+        self.set_keepout('vias', value)
+
+    def GetDoNotAllowPads(self):
+        return self.get_keepout('pads')
+
+    def SetDoNotAllowPads(self, value):
+        self.set_keepout('pads', value)
+
+    def GetDoNotAllowCopperPour(self):
+        return self.get_keepout('copperpour')
+
+    def SetDoNotAllowCopperPour(self, value):
+        self.set_keepout('copperpour', value)
+
+    def GetDoNotAllowFootprints(self):
+        return self.get_keepout('footprints')
+
+    def SetDoNotAllowFootprints(self, value):
+        self.set_keepout('footprints', value)
+
+    def Outline(self):
+        return self.outline
+
+    def SetOutline(self, outline):
+        self.outline = outline
+
+    def GetNumCorners(self):
+        return self.outline.TotalVertices()
+
+    def GetCornerPosition(self, index):
+        return self.outline.CVertex(index)
+
+    def AppendCorner(self, position, hole_index=-1, allow_duplicates=False):
+        if not self.outline.polygons:
+            self.outline.NewOutline()
+        self.outline.Append(position[0], position[1], -1, hole_index)
+        return True
+
+    def IsFilled(self):
+        return self.is_filled
+
+    def SetIsFilled(self, is_filled):
+        self.is_filled = is_filled
+
+    def NeedRefill(self):
+        return self.need_refill
+
+    def SetNeedRefill(self, need_refill):
+        self.need_refill = need_refill
+
+    def UnFill(self):
+        changed = bool(self.filled_polygons)
+        self.filled_polygons = {}
+        self.is_filled = False
+        return changed
+
+    def GetFilledPolysList(self, layer):
+        return self.filled_polygons.get(layer, SHAPE_POLY_SET())
+
+    def points(self):
+        points = self.outline.points()
+        for polys in self.filled_polygons.values():
+            points.extend(polys.points())
+        return points
+
+    def set_points(self, points):
+        nr_outline = self.outline.TotalVertices()
+        self.outline.set_points(points[:nr_outline])
+        index = nr_outline
+        for polys in self.filled_polygons.values():
+            nr_points = polys.TotalVertices()
+            polys.set_points(points[index:index + nr_points])
+            index = index + nr_points
+
+    def flip_layers(self):
+        self.layers = sorted(FLIPPED_LAYERS.get(x, x) for x in self.layers)
+        self.filled_polygons = {FLIPPED_LAYERS.get(k, k): v for k, v in self.filled_polygons.items()}
+
+    def GetBoundingBox(self):
+        return self.outline.BBox()
+
+    def GetPosition(self):
+        return self.outline.CVertex(0)
+
+    def HitTestInsideZone(self, position):
+        return self.outline.Contains(position)
+
+
+class ZONE_SETTINGS:
+    def __init__(self):
+        for attribute in ZONE_SETTING_ATTRIBUTES:
+            setattr(self, attribute, None)
+        self.layers = None
+        self.netcode = 0
+
+    def __lshift__(self, zone):
+        for attribute in ZONE_SETTING_ATTRIBUTES:
+            setattr(self, attribute, copy.deepcopy(getattr(zone, attribute)))
+        self.layers = list(zone.layers)
+        self.netcode = zone.GetNetCode()
+        return self
+
+    def ExportSetting(self, zone, full_export=True):
+        for attribute in ZONE_SETTING_ATTRIBUTES:
+            if attribute == 'priority' and not full_export:
+                continue
+            setattr(zone, attribute, copy.deepcopy(getattr(self, attribute)))
+        if full_export:
+            zone.layers = list(self.layers)
+            if not self.is_rule_area:
+                zone.SetNetCode(self.netcode)
+
+
+class ZONE_FILLER:
+    def __init__(self, board):
+        self.board = board
+
+    def Fill(self, zones, check=False):
+        # the fill is approximated with the outline
+        for zone in zones:
+            if zone.GetIsRuleArea():
+                continue
+            zone.filled_polygons = {layer: SHAPE_POLY_SET(zone.outline) for layer in zone.layers}
+            zone.is_filled = True
+            zone.need_refill = False
+        return True
+
+
+class EDA_TEXT:
+    """ text properties shared by board and footprint text """
+
+    def init_text(self):
+        self.text = ""
+        self.text_angle = 0.0
+        self.text_size = VECTOR2I(FromMM(1), FromMM(1))
+        self.text_thickness = FromMM(0.15)
+        self.italic = False
+        self.bold = False
+        self.mirrored = False
+        self.visible = True
+        self.multiline = True
+        self.keep_upright = True
+        self.h_justify = 0
+        self.v_justify = 0
+
+    def GetText(self):
+        return self.text
+
+    def SetText(self, text):
+        self.text = text
+
+    def GetShownText(self, *args):
+        return self.text
+
+    def GetTextAngle(self):
+        return EDA_ANGLE(self.text_angle)
+
+    def SetTextAngle(self, angle):
+        self.text_angle = EDA_ANGLE(angle).degrees
+
+    def GetTextAngleDegrees(self):
+        return self.text_angle
+
+    def SetTextAngleDegrees(self, angle):
+        self.text_angle = float(angle)
+
+    def GetTextSize(self):
+        return VECTOR2I(self.text_size)
+
+    def SetTextSize(self, size):
+        self.text_size = VECTOR2I(size)
+
+    def GetTextWidth(self):
+        return self.text_size.x
+
+    def SetTextWidth(self, width):
+        self.text_size = VECTOR2I(width, self.text_size.y)
+
+    def GetTextHeight(self):
+        return self.text_size.y
+
+    def SetTextHeight(self, height):
+        self.text_size = VECTOR2I(self.text_size.x, height)
+
+    def GetTextThickness(self):
+        return self.text_thickness
+
+    def SetTextThickness(self, thickness):
+        self.text_thickness = thickness
+
+    def IsItalic(self):
+        return self.italic
+
+    def SetItalic(self, italic):
+        self.italic = italic
+
+    def IsBold(self):
+        return self.bold
+
+    def SetBold(self, bold):
+        self.bold = bold
+
+    def IsMirrored(self):
+        return self.mirrored
+
+    def SetMirrored(self, mirrored):
+        self.mirrored = mirrored
+
+    def IsVisible(self):
+        return self.visible
+
+    def SetVisible(self, visible):
+        self.visible = visible
+
+    def IsMultilineAllowed(self):
+        return self.multiline
+
+    def SetMultilineAllowed(self, allowed):
+        self.multiline = allowed
+
+    def IsKeepUpright(self):
+        return self.keep_upright
+
+    def SetKeepUpright(self, keep_upright):
+        self.keep_upright = keep_upright
+
+    def GetHorizJustify(self):
+        return self.h_justify
+
+    def SetHorizJustify(self, justify):
+        self.h_justify = justify
+
+    def GetVertJustify(self):
+        return self.v_justify
+
+    def SetVertJustify(self, justify):
+        self.v_justify = justify
+
+    def text_bounding_box(self, position):
+        # rough estimate, good enough for selection by bounding box
+        width = max(1, len(self.text)) * self.text_size.x
+        height = self.text_size.y
+        if abs(normalize_angle(self.text_angle)) in (90.0,):
+            width, height = height, width
+        return BOX2I(VECTOR2I(position.x - width // 2, position.y - height // 2), VECTOR2I(width, height))
+
+
+class PCB_TEXT(BOARD_ITEM, EDA_TEXT):
+    CLASS = "PCB_TEXT"
+
+    def __init__(self, parent=None):
+        super(PCB_TEXT, self).__init__(parent)
+        self.init_text()
+        self.position = VECTOR2I(0, 0)
+        self.layer = 37
+
+    def GetTextPos(self):
+        return VECTOR2I(self.position)
+
+    def SetTextPos(self, position):
+        self.position = VECTOR2I(position)
+
+    def points(self):
+        return [self.position]
+
+    def set_points(self, points):
+        self.position = points[0]
+
+    def rotate_angles(self, angle):
+        self.text_angle = normalize_angle(self.text_angle + angle)
+
+    def flip_angles(self, flip_left_right):
+        self.mirrored = not self.mirrored
+        self.text_angle = normalize_angle(-self.text_angle)
+
+    def GetBoundingBox(self):
+        return self.text_bounding_box(self.position)
+
+
+class FP_TEXT(PCB_TEXT):
+    CLASS = "FP_TEXT"
+
+    TEXT_is_REFERENCE = 0
+    TEXT_is_VALUE = 1
+    TEXT_is_DIVERS = 2
+
+    def __init__(self, parent=None, text_type=2):
+        super(FP_TEXT, self).__init__(parent)
+        self.text_type = text_type
+
+    def GetType(self):
+        return self.text_type
+
+
+class PCB_SHAPE(BOARD_ITEM):
+    CLASS = "PCB_SHAPE"
+
+    def __init__(self, parent=None, shape=SHAPE_T_SEGMENT):
+        super(PCB_SHAPE, self).__init__(parent)
+        self.shape = shape
+        self.start = VECTOR2I(0, 0)
+        self.end = VECTOR2I(0, 0)
+        self.mid = VECTOR2I(0, 0)
+        self.poly = []
+        self.width = FromMM(0.15)
+        self.filled = False
+        self.layer = 40
+
+    def GetShape(self):
+        return self.shape
+
+    def SetShape(self, shape):
+        self.shape = shape
+
+    def ShowShape(self):
+        return [k for k, v in SHAPE_KEYWORDS.items() if v == self.shape][0]
+
+    def GetStart(self):
+        return VECTOR2I(self.start)
+
+    def SetStart(self, position):
+        self.start = VECTOR2I(position)
+
+    def GetEnd(self):
+        return VECTOR2I(self.end)
+
+    def SetEnd(self, position):
+        self.end = VECTOR2I(position)
+
+    def GetArcMid(self):
+        return VECTOR2I(self.mid)
+
+    def GetCenter(self):
+        return VECTOR2I(self.start)
+
+    def GetWidth(self):
+        return self.width
+
+    def SetWidth(self, width):
+        self.width = width
+
+    def GetLength(self):
+        return math.hypot(self.end.x - self.start.x, self.end.y - self.start.y)
+
+    def GetType(self):
+        return self.CLASS
+
+    def GetAngle(self):
+        return 0
+
+    def IsFilled(self):
+        return self.filled
+
+    def SetFilled(self, filled):
+        self.filled = filled
+
+    def SetArcGeometry(self, start, mid, end):
+        self.start = VECTOR2I(start)
+        self.mid = VECTOR2I(mid)
+        self.end = VECTOR2I(end)
+
+    def GetPolyPoints(self):
+        return [VECTOR2I(p) for p in self.poly]
+
+    def SetPolyPoints(self, points):
+        self.poly = [VECTOR2I(p) for p in points]
+
+    def GetPolyShape(self):
+        poly_set = SHAPE_POLY_SET()
+        poly_set.NewOutline()
+        for p in self.poly:
+            poly_set.Append(p[0], p[1])
+        return poly_set
+
+    def points(self):
+        if self.shape == SHAPE_T_POLY:
+            return list(self.poly)
+        if self.shape == SHAPE_T_ARC:
+            return [self.start, self.mid, self.end]
+        return [self.start, self.end]
+
+    def set_points(self, points):
+        if self.shape == SHAPE_T_POLY:
+            self.poly = list(points)
+        elif self.shape == SHAPE_T_ARC:
+            self.start, self.mid, self.end = points
+        else:
+            self.start, self.end = points
+
+    def GetBoundingBox(self):
+        if self.shape == SHAPE_T_CIRCLE:
+            radius = int(math.hypot(self.end.x - self.start.x, self.end.y - self.start.y))
+            return BOX2I(VECTOR2I(self.start.x - radius, self.start.y - radius),
+                         VECTOR2I(2 * radius, 2 * radius)).Inflate(self.width // 2)
+        return BOX2I.from_points(self.points()).Inflate(self.width // 2)
+
+
+class FP_SHAPE(PCB_SHAPE):
+    CLASS = "FP_SHAPE"
+
+
+class PCB_DIMENSION_BASE(PCB_SHAPE):
+    CLASS = "PCB_DIMENSION"
+
+
+class DRAWINGS(list):
+    pass
+
+
+class PAD(BOARD_CONNECTED_ITEM):
+    CLASS = "PAD"
+
+    def __init__(self, parent=None):
+        super(PAD, self).__init__(parent)
+        self.name = ""
+        self.position = VECTOR2I(0, 0)
+        self.size = VECTOR2I(FromMM(1), FromMM(1))
+        self.orientation = 0.0
+        self.pad_type = "smd"
+        self.pad_shape = "rect"
+        self.layer_names = ["F.Cu"]
+
+    def GetName(self):
+        return self.name
+
+    def SetName(self, name):
+        self.name = name
+
+    def GetNumber(self):
+        return self.name
+
+    def GetSize(self):
+        return VECTOR2I(self.size)
+
+    def GetOrientationDegrees(self):
+        return self.orientation
+
+    def points(self):
+        return [self.position]
+
+    def set_points(self, points):
+        self.position = points[0]
+
+    def rotate_angles(self, angle):
+        self.orientation = normalize_angle(self.orientation + angle)
+
+    def flip_angles(self, flip_left_right):
+        self.orientation = normalize_angle(-self.orientation)
+
+    def flip_layers(self):
+        flipped = {v: k for k, v in DEFAULT_LAYER_NAMES.items()}
+        self.layer_names = [DEFAULT_LAYER_NAMES.get(FLIPPED_LAYERS.get(flipped.get(x), flipped.get(x)), x)
+                            if x in flipped else x for x in self.layer_names]
+
+    def GetBoundingBox(self):
+        w, h = self.size.x, self.size.y
+        if abs(normalize_angle(self.orientation)) == 90.0:
+            w, h = h, w
+        return BOX2I(VECTOR2I(self.position.x - w // 2, self.position.y - h // 2), VECTOR2I(w, h))
+
+
+class FOOTPRINT(BOARD_ITEM):
+    CLASS = "FOOTPRINT"
+
+    def __init__(self, parent=None):
+        super(FOOTPRINT, self).__init__(parent)
+        self.fpid = ""
+        self.path = KIID_PATH("")
+        self.properties = {}
+        self.position = VECTOR2I(0, 0)
+        self.orientation = 0.0
+        self.pads = []
+        self.graphical_items = []
+        self.reference = FP_TEXT(self, FP_TEXT.TEXT_is_REFERENCE)
+        self.value = FP_TEXT(self, FP_TEXT.TEXT_is_VALUE)
+        self.attributes = ""
+        self.local_clearance = 0
+        self.solder_mask_margin = 0
+        self.solder_paste_margin = 0
+        self.solder_paste_margin_ratio = 0.0
+        self.zone_connection = 0
+
+    def children(self):
+        return [self.reference, self.value] + self.pads + self.graphical_items
+
+    def reset_uuids(self):
+        self.m_Uuid = KIID()
+        for child in self.children():
+            child.reset_uuids()
+
+    def GetFPIDAsString(self):
+        return self.fpid
+
+    def GetPath(self):
+        return self.path
+
+    def SetPath(self, path):
+        self.path = path if isinstance(path, KIID_PATH) else KIID_PATH(path)
+
+    def GetProperty(self, name):
+        return self.properties[name]
+
+    def SetProperty(self, name, value):
+        self.properties[name] = value
+
+    def HasProperty(self, name):
+        return name in self.properties
+
+    def GetProperties(self):
+        return dict(self.properties)
+
+    def GetReference(self):
+        return self.reference.text
+
+    def SetReference(self, reference):
+        self.reference.text = reference
+
+    def GetValue(self):
+        return self.value.text
+
+    def Reference(self):
+        return self.reference
+
+    def Value(self):
+        return self.value
+
+    def Pads(self):
+        return list(self.pads)
+
+    def GraphicalItems(self):
+        return list(self.graphical_items)
+
+    def FindPadByNumber(self, name):
+        for pad in self.pads:
+            if pad.name == name:
+                return pad
+        return None
+
+    def GetPosition(self):
+        return VECTOR2I(self.position)
+
+    def SetPosition(self, position):
+        self.Move(VECTOR2I(position) - self.position)
+
+    def Move(self, move_vector):
+        self.position = self.position + move_vector
+        for child in self.children():
+            child.Move(move_vector)
+
+    def GetOrientation(self):
+        return EDA_ANGLE(self.orientation)
+
+    def GetOrientationDegrees(self):
+        return self.orientation
+
+    def SetOrientation(self, angle):
+        self.SetOrientationDegrees(EDA_ANGLE(angle).degrees)
+
+    def SetOrientationDegrees(self, angle):
+        delta = normalize_angle(angle) - self.orientation
+        self.orientation = normalize_angle(angle)
+        for child in self.children():
+            child.Rotate(self.position, EDA_ANGLE(delta))
+
+    def Rotate(self, center, angle):
+        angle = EDA_ANGLE(angle).degrees
+        x, y = rotate_point(self.position.x - center[0], self.position.y - center[1], angle)
+        self.position = VECTOR2I(x + center[0], y + center[1])
+        self.orientation = normalize_angle(self.orientation + angle)
+        for child in self.children():
+            child.Rotate(center, EDA_ANGLE(angle))
+
+    def IsFlipped(self):
+        return self.layer == B_Cu
+
+    def Flip(self, center, flip_left_right=False):
+        if flip_left_right:
+            self.position = VECTOR2I(2 * center[0] - self.position.x, self.position.y)
+            self.orientation = normalize_angle(180 - self.orientation)
+        else:
+            self.position = VECTOR2I(self.position.x, 2 * center[1] - self.position.y)
+            self.orientation = normalize_angle(-self.orientation)
+        self.layer = FLIPPED_LAYERS.get(self.layer, self.layer)
+        for child in self.children():
+            child.Flip(center, flip_left_right)
+
+    def GetBoundingBox(self, include_text=True, include_invisible_text=True):
+        items = self.pads + [x for x in self.graphical_items if not isinstance(x, FP_TEXT)]
+        if include_text:
+            items = items + [x for x in [self.reference, self.value] if x.visible or include_invisible_text]
+        if not items:
+            return BOX2I(self.position, VECTOR2I(0, 0))
+        box = items[0].GetBoundingBox()
+        for item in items[1:]:
+            box.Merge(item.GetBoundingBox())
+        return box
+
+    def GetLocalClearance(self):
+        return self.local_clearance
+
+    def SetLocalClearance(self, value):
+        self.local_clearance = value
+
+    def GetLocalSolderMaskMargin(self):
+        return self.solder_mask_margin
+
+    def SetLocalSolderMaskMargin(self, value):
+        self.solder_mask_margin = value
+
+    def GetLocalSolderPasteMargin(self):
+        return self.solder_paste_margin
+
+    def SetLocalSolderPasteMargin(self, value):
+        self.solder_paste_margin = value
+
+    def GetLocalSolderPasteMarginRatio(self):
+        return self.solder_paste_margin_ratio
+
+    def SetLocalSolderPasteMarginRatio(self, value):
+        self.solder_paste_margin_ratio = value
+
+    def GetZoneConnection(self):
+        return self.zone_connection
+
+    def SetZoneConnection(self, value):
+        self.zone_connection = value
+
+
+class PCB_GROUP(BOARD_ITEM):
+    CLASS = "PCB_GROUP"
+
+    def __init__(self, parent=None):
+        super(PCB_GROUP, self).__init__(parent)
+        self.name = ""
+        self.items = []
+
+    def GetName(self):
+        return self.name
+
+    def SetName(self, name):
+        self.name = name
+
+    def GetItems(self):
+        return list(self.items)
+
+    def AddItem(self, item):
+        if item.parent_group is not None and item.parent_group is not self:
+            item.parent_group.RemoveItem(item)
+        if item.parent_group is not self:
+            self.items.append(item)
+            item.parent_group = self
+        return True
+
+    def RemoveItem(self, item):
+        if item.parent_group is self:
+            self.items.remove(item)
+            item.parent_group = None
+            return True
+        return False
+
+    def RemoveAll(self):
+        for item in self.items:
+            item.parent_group = None
+        self.items = []
+
+    def GetBoundingBox(self):
+        if not self.items:
+            return BOX2I()
+        box = self.items[0].GetBoundingBox()
+        for item in self.items[1:]:
+            box.Merge(item.GetBoundingBox())
+        return box
+
+
+class BOARD:
+    def __init__(self):
+        self.filename = ""
+        self.footprints = []
+        self.tracks = []
+        self.zones = []
+        self.drawings = []
+        self.groups = []
+        self.netinfo = NETINFO_LIST()
+        self.netinfo.add(NETINFO_ITEM(self, "", 0))
+        self.layer_names = dict(DEFAULT_LAYER_NAMES)
+        self.user_layer_names = {}
+        self.enabled_layers = sorted(DEFAULT_LAYER_NAMES.keys())
+        self.version = "20221018"
+        self.parent = None
+
+    def GetFileName(self):
+        return self.filename
+
+    def SetFileName(self, filename):
+        self.filename = filename
+
+    def GetFootprints(self):
+        return list(self.footprints)
+
+    def GetTracks(self):
+        return list(self.tracks)
+
+    def Zones(self):
+        return list(self.zones)
+
+    def GetAreaCount(self):
+        return len(self.zones)
+
+    def GetArea(self, index):
+        return self.zones[index]
+
+    def GetDrawings(self):
+        return list(self.drawings)
+
+    def Groups(self):
+        return list(self.groups)
+
+    def GetNetInfo(self):
+        return self.netinfo
+
+    def GetNetCount(self):
+        return self.netinfo.GetNetCount()
+
+    def FindNet(self, key):
+        return self.netinfo.GetNetItem(key)
+
+    def add_net(self, name, code=None):
+        net = self.netinfo.GetNetItem(name)
+        if net is None:
+            code = code if code is not None else max(self.netinfo.by_code) + 1
+            net = NETINFO_ITEM(self, name, code)
+            self.netinfo.add(net)
+        return net
+
+    def GetLayerName(self, layer):
+        return self.user_layer_names.get(layer, self.layer_names.get(layer, ""))
+
+    def GetStandardLayerName(self, layer):
+        return self.layer_names.get(layer, "")
+
+    def GetLayerID(self, name):
+        for layer, layer_name in self.user_layer_names.items():
+            if layer_name == name:
+                return layer
+        for layer, layer_name in self.layer_names.items():
+            if layer_name == name:
+                return layer
+        return -1
+
+    def GetEnabledLayers(self):
+        return LSET(self.enabled_layers)
+
+    def container(self, item):
+        if isinstance(item, FOOTPRINT):
+            return self.footprints
+        if isinstance(item, PCB_TRACK):
+            return self.tracks
+        if isinstance(item, ZONE):
+            return self.zones
+        if isinstance(item, PCB_GROUP):
+            return self.groups
+        return self.drawings
+
+    def Add(self, item, mode=None):
+        item.parent = self
+        self.container(item).append(item)
+
+    def Remove(self, item, mode=None):
+        container = self.container(item)
+        for index in range(len(container)):
+            if container[index] is item:
+                del container[index]
+                break
+        if item.parent_group is not None:
+            item.parent_group.RemoveItem(item)
+
+    def RemoveNative(self, item, mode=None):
+        self.Remove(item, mode)
+
+    def Delete(self, item):
+        self.Remove(item)
+
+    def GetItem(self, kiid):
+        for item in self.all_items():
+            if item.m_Uuid == kiid:
+                return item
+        return None
+
+    def all_items(self):
+        return self.footprints + self.tracks + self.zones + self.drawings + self.groups
+
+    def GetBoardEdgesBoundingBox(self):
+        edges = [x for x in self.drawings if x.layer == 44]
+        items = edges if edges else self.footprints
+        if not items:
+            return BOX2I()
+        box = items[0].GetBoundingBox()
+        for item in items[1:]:
+            box.Merge(item.GetBoundingBox())
+        return box
+
+    def BuildConnectivity(self):
+        pass
+
+
+class PLUGIN:
+    pass
+
+
+class ActionPlugin:
+    def __init__(self):
+        self.name = ""
+        self.category = ""
+        self.description = ""
+
+    def register(self):
+        pass
+
+
+# s-expression reading
+TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))')
+
+
+def parse_sexpr(text):
+    """ parse s-expression into nested lists, quoted strings are kept as str, atoms as Atom """
+    stack = [[]]
+    pos = 0
+    length = len(text)
+    match = TOKEN_RE.match
+    while pos < length:
+        m = match(text, pos)
+        if m is None:
+            break
+        pos = m.end()
+        if m.group(1):
+            stack.append([])
+        elif m.group(2):
+            node = stack.pop()
+            stack[-1].append(node)
+        elif m.group(3) is not None:
+            stack[-1].append(String(m.group(3).replace('\\"', '"').replace('\\\\', '\\')))
+        elif m.group(4) is not None:
+            stack[-1].append(m.group(4))
+    return stack[0][0]
+
+
+class String(str):
+    """ marks quoted strings """
+    pass
+
+
+def find(node, key):
+    for child in node:
+        if isinstance(child, list) and child and child[0] == key:
+            return child
+    return None
+
+
+def find_all(node, key):
+    return [child for child in node if isinstance(child, list) and child and child[0] == key]
+
+
+def mm(value):
+    return FromMM(float(value))
+
+
+def xy(node):
+    return VECTOR2I(mm(node[1]), mm(node[2]))
+
+
+def layer_id(board, name):
+    layer = board.GetLayerID(name)
+    if layer < 0:
+        raise ValueError("Unknown layer " + name)
+    return layer
+
+
+def layer_ids(board, name):
+    """ layer names can also be wildcards """
+    if name == 'F&B.Cu':
+        return [F_Cu, B_Cu]
+    if name == '*.Cu':
+        return [x for x in board.enabled_layers if IsCopperLayer(x)]
+    return [layer_id(board, name)]
+
+
+def set_uuid(item, node):
+    uuid_node = find(node, 'tstamp') or find(node, 'uuid')
+    if uuid_node is not None:
+        item.m_Uuid = KIID(uuid_node[1])
+
+
+def is_locked(node):
+    locked = find(node, 'locked')
+    return 'locked' in node[1:3] or (locked is not None and locked[1] == 'yes')
+
+
+def load_effects(text, node):
+    effects = find(node, 'effects')
+    if effects is None:
+        return
+    font = find(effects, 'font')
+    if font is not None:
+        size = find(font, 'size')
+        if size is not None:
+            text.text_size = VECTOR2I(mm(size[2]), mm(size[1]))
+        thickness = find(font, 'thickness')
+        if thickness is not None:
+            text.text_thickness = mm(thickness[1])
+        text.italic = 'italic' in font
+        text.bold = 'bold' in font
+    justify = find(effects, 'justify')
+    if justify is not None:
+        text.mirrored = 'mirror' in justify
+        text.h_justify = -1 if 'left' in justify else (1 if 'right' in justify else 0)
+        text.v_justify = -1 if 'top' in justify else (1 if 'bottom' in justify else 0)
+    if 'hide' in effects:
+        text.visible = False
+
+
+def load_text(board, text, node, position_offset=None):
+    text.text = node[2] if isinstance(text, FP_TEXT) else node[1]
+    at = find(node, 'at')
+    text.position = xy(at)
+    if position_offset is not None:
+        text.position = position_offset(text.position)
+    text.text_angle = float(at[3]) if len(at) > 3 and at[3] != 'unlocked' else 0.0
+    text.layer = layer_id(board, find(node, 'layer')[1])
+    if 'hide' in node:
+        text.visible = False
+    load_effects(text, node)
+    set_uuid(text, node)
+
+
+def load_shape(board, shape, node, position_offset=None):
+    keyword = node[0].split('_', 1)[1]
+    shape.shape = SHAPE_KEYWORDS[keyword]
+    if shape.shape == SHAPE_T_POLY:
+        shape.poly = [xy(p) for p in find_all(find(node, 'pts'), 'xy')]
+    elif shape.shape == SHAPE_T_CIRCLE:
+        shape.start = xy(find(node, 'center'))
+        shape.end = xy(find(node, 'end'))
+    else:
+        shape.start = xy(find(node, 'start'))
+        shape.end = xy(find(node, 'end'))
+        if shape.shape == SHAPE_T_ARC:
+            mid = find(node, 'mid')
+            shape.mid = xy(mid) if mid is not None else VECTOR2I(shape.start)
+    if position_offset is not None:
+        shape.set_points([position_offset(p) for p in shape.points()])
+    width = find(node, 'width') or find(find(node, 'stroke') or [], 'width')
+    if width is not None:
+        shape.width = mm(width[1])
+    fill = find(node, 'fill')
+    shape.filled = fill is not None and fill[1] in ('solid', 'yes')
+    shape.layer = layer_id(board, find(node, 'layer')[1])
+    shape.locked = is_locked(node)
+    set_uuid(shape, node)
+
+
+def load_footprint(board, node):
+    fp = FOOTPRINT(board)
+    fp.fpid = node[1]
+    fp.layer = layer_id(board, find(node, 'layer')[1])
+    fp.locked = is_locked(node)
+    at = find(node, 'at')
+    fp.position = xy(at)
+    fp.orientation = float(at[3]) if len(at) > 3 else 0.0
+    set_uuid(fp, node)
+    for prop in find_all(node, 'property'):
+        fp.properties[prop[1]] = prop[2]
+    path = find(node, 'path')
+    if path is not None:
+        fp.path = KIID_PATH(path[1])
+    attr = find(node, 'attr')
+    if attr is not None:
+        fp.attributes = " ".join(attr[1:])
+
+    # children are stored in footprint coordinates
+    def to_board(local):
+        x, y = rotate_point(local[0], local[1], fp.orientation)
+        return VECTOR2I(fp.position.x + x, fp.position.y + y)
+
+    for text_node in find_all(node, 'fp_text'):
+        text_type = {'reference': FP_TEXT.TEXT_is_REFERENCE,
+                     'value': FP_TEXT.TEXT_is_VALUE}.get(text_node[1], FP_TEXT.TEXT_is_DIVERS)
+        text = FP_TEXT(fp, text_type)
+        load_text(board, text, text_node, to_board)
+        if text_type == FP_TEXT.TEXT_is_REFERENCE:
+            fp.reference = text
+        elif text_type == FP_TEXT.TEXT_is_VALUE:
+            fp.value = text
+        else:
+            fp.graphical_items.append(text)
+    for child in node:
+        if isinstance(child, list) and child and child[0] in ('fp_line', 'fp_rect', 'fp_circle', 'fp_arc', 'fp_poly'):
+            shape = FP_SHAPE(fp)
+            load_shape(board, shape, child, to_board)
+            fp.graphical_items.append(shape)
+    for pad_node in find_all(node, 'pad'):
+        pad = PAD(fp)
+        pad.name = pad_node[1]
+        pad.pad_type = pad_node[2]
+        pad.pad_shape = pad_node[3]
+        pad_at = find(pad_node, 'at')
+        pad.position = to_board(xy(pad_at))
+        pad.orientation = float(pad_at[3]) if len(pad_at) > 3 else 0.0
+        size = find(pad_node, 'size')
+        pad.size = VECTOR2I(mm(size[1]), mm(size[2]))
+        layers = find(pad_node, 'layers')
+        if layers is not None:
+            pad.layer_names = list(layers[1:])
+        net = find(pad_node, 'net')
+        if net is not None:
+            pad.net = board.add_net(net[2], int(net[1]))
+        set_uuid(pad, pad_node)
+        fp.pads.append(pad)
+    return fp
+
+
+def load_track(board, node):
+    if node[0] == 'via':
+        track = PCB_VIA(board)
+        track.start = xy(find(node, 'at'))
+        track.end = VECTOR2I(track.start)
+        track.width = mm(find(node, 'size')[1])
+        drill = find(node, 'drill')
+        if drill is not None:
+            track.drill = mm(drill[1])
+        layers = find(node, 'layers')
+        track.layers = [layer_id(board, x) for x in layers[1:3]]
+        track.layer = track.layers[0]
+    else:
+        track = PCB_ARC(board) if node[0] == 'arc' else PCB_TRACK(board)
+        track.start = xy(find(node, 'start'))
+        track.end = xy(find(node, 'end'))
+        if node[0] == 'arc':
+            track.mid = xy(find(node, 'mid'))
+        track.width = mm(find(node, 'width')[1])
+        track.layer = layer_id(board, find(node, 'layer')[1])
+    net = find(node, 'net')
+    if net is not None:
+        track.net = board.FindNet(int(net[1]))
+    track.locked = is_locked(node)
+    set_uuid(track, node)
+    return track
+
+
+def load_zone(board, node):
+    zone = ZONE(board)
+    net = find(node, 'net')
+    if net is not None:
+        zone.net = board.FindNet(int(net[1]))
+        if zone.net is not None and zone.net.code == 0:
+            zone.net = None
+    layer = find(node, 'layer')
+    layers = find(node, 'layers')
+    if layer is not None:
+        zone.layers = [layer_id(board, layer[1])]
+    elif layers is not None:
+        zone.layers = sorted(set(x for name in layers[1:] for x in layer_ids(board, name)))
+    name = find(node, 'name')
+    if name is not None:
+        zone.zone_name = name[1]
+    set_uuid(zone, node)
+    zone.locked = is_locked(node)
+    hatch = find(node, 'hatch')
+    if hatch is not None:
+        zone.hatch = (hatch[1], mm(hatch[2]))
+    priority = find(node, 'priority')
+    if priority is not None:
+        zone.priority = int(priority[1])
+    connect_pads = find(node, 'connect_pads')
+    if connect_pads is not None:
+        zone.pad_connection = connect_pads[1] if len(connect_pads) > 1 and isinstance(connect_pads[1], str) \
+            and not isinstance(connect_pads[1], list) else "yes"
+        clearance = find(connect_pads, 'clearance')
+        if clearance is not None:
+            zone.clearance = mm(clearance[1])
+    min_thickness = find(node, 'min_thickness')
+    if min_thickness is not None:
+        zone.min_thickness = mm(min_thickness[1])
+    keepout = find(node, 'keepout')
+    if keepout is not None:
+        zone.is_rule_area = True
+        zone.keepout = {x[0]: x[1] for x in keepout[1:] if isinstance(x, list)}
+    fill = find(node, 'fill')
+    if fill is not None:
+        thermal_gap = find(fill, 'thermal_gap')
+        if thermal_gap is not None:
+            zone.thermal_gap = mm(thermal_gap[1])
+        thermal_bridge_width = find(fill, 'thermal_bridge_width')
+        if thermal_bridge_width is not None:
+            zone.thermal_bridge_width = mm(thermal_bridge_width[1])
+    # same as in KiCad, the first polygon is the outline and the others are its holes
+    for index, polygon in enumerate(find_all(node, 'polygon')):
+        if index == 0:
+            zone.outline.NewOutline()
+            hole = -1
+        else:
+            hole = zone.outline.NewHole()
+        for point in find_all(find(polygon, 'pts'), 'xy'):
+            zone.outline.Append(mm(point[1]), mm(point[2]), -1, hole)
+    for polygon in find_all(node, 'filled_polygon'):
+        layer = layer_id(board, find(polygon, 'layer')[1])
+        polys = zone.filled_polygons.setdefault(layer, SHAPE_POLY_SET())
+        polys.NewOutline()
+        for point in find_all(find(polygon, 'pts'), 'xy'):
+            polys.Append(mm(point[1]), mm(point[2]))
+    zone.is_filled = bool(zone.filled_polygons)
+    return zone
+
+
+def LoadBoard(filename):
+    global _current_board
+    with open(filename, encoding='utf-8') as f:
+        tree = parse_sexpr(f.read())
+    board = BOARD()
+    board.filename = filename
+    version = find(tree, 'version')
+    if version is not None:
+        board.version = version[1]
+    layers = find(tree, 'layers')
+    if layers is not None:
+        board.enabled_layers = []
+        for layer in layers[1:]:
+            board.layer_names[int(layer[0])] = layer[1]
+            board.enabled_layers.append(int(layer[0]))
+            if len(layer) > 3:
+                board.user_layer_names[int(layer[0])] = layer[3]
+    for net in find_all(tree, 'net'):
+        board.add_net(net[2], int(net[1]))
+    groups = []
+    for node in tree[1:]:
+        if not isinstance(node, list) or not node:
+            continue
+        keyword = node[0]
+        if keyword == 'footprint' or keyword == 'module':
+            board.Add(load_footprint(board, node))
+        elif keyword in ('segment', 'via', 'arc'):
+            board.Add(load_track(board, node))
+        elif keyword == 'zone':
+            board.Add(load_zone(board, node))
+        elif keyword == 'gr_text':
+            text = PCB_TEXT(board)
+            load_text(board, text, node)
+            text.locked = is_locked(node)
+            board.Add(text)
+        elif keyword in ('gr_line', 'gr_rect', 'gr_circle', 'gr_arc', 'gr_poly'):
+            shape = PCB_SHAPE(board)
+            load_shape(board, shape, node)
+            board.Add(shape)
+        elif keyword == 'group':
+            groups.append(node)
+    # groups are resolved after all the items are loaded
+    items = {x.m_Uuid.AsString(): x for x in board.all_items()}
+    for node in groups:
+        group = PCB_GROUP(board)
+        group.name = node[1]
+        group_id = find(node, 'id')
+        if group_id is not None:
+            group.m_Uuid = KIID(group_id[1])
+        group.locked = is_locked(node)
+        board.Add(group)
+        items[group.m_Uuid.AsString()] = group
+    for node, group in zip(groups, board.groups):
+        members = find(node, 'members')
+        for member in (members[1:] if members is not None else []):
+            if member in items:
+                group.AddItem(items[member])
+    _current_board = board
+    return board
+
+
+# s-expression writing
+def fmt(value):
+    text = "{:.6f}".format(value / IU_PER_MM).rstrip('0').rstrip('.')
+    return text if text not in ('-0', '') else '0'
+
+
+def fmt_angle(value):
+    text = "{:.6f}".format(value).rstrip('0').rstrip('.')
+    return text if text not in ('-0', '') else '0'
+
+
+def quote(text):
+    return '"' + str(text).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def pt(keyword, point):
+    return "({} {} {})".format(keyword, fmt(point[0]), fmt(point[1]))
+
+
+def save_effects(text):
+    effects = "(effects (font (size {} {}) (thickness {}){}{})".format(
+        fmt(text.text_size.y), fmt(text.text_size.x), fmt(text.text_thickness),
+        " italic" if text.italic else "", " bold" if text.bold else "")
+    justify = []
+    if text.h_justify:
+        justify.append('left' if text.h_justify < 0 else 'right')
+    if text.v_justify:
+        justify.append('top' if text.v_justify < 0 else 'bottom')
+    if text.mirrored:
+        justify.append('mirror')
+    if justify:
+        effects = effects + " (justify {})".format(" ".join(justify))
+    return effects + ")"
+
+
+def save_text(board, text, keyword, position=None):
+    position = text.position if position is None else position
+    if isinstance(text, FP_TEXT):
+        kind = {FP_TEXT.TEXT_is_REFERENCE: 'reference', FP_TEXT.TEXT_is_VALUE: 'value'}.get(text.text_type, 'user')
+        head = "({} {} {}".format(keyword, kind, quote(text.text))
+    else:
+        head = "({}{} {}".format(keyword, " locked" if text.locked else "", quote(text.text))
+    return "{} (at {} {} {}) (layer {}){}\n    {} (tstamp {}))".format(
+        head, fmt(position[0]), fmt(position[1]), fmt_angle(text.text_angle), quote(board.GetStandardLayerName(text.layer)),
+        "" if text.visible else " hide", save_effects(text), text.m_Uuid.AsString())
+
+
+def save_shape(board, shape, keyword, points=None):
+    points = shape.points() if points is None else points
+    if shape.shape == SHAPE_T_POLY:
+        geometry = "(pts {})".format(" ".join(pt('xy', p) for p in points))
+    elif shape.shape == SHAPE_T_CIRCLE:
+        geometry = "{} {}".format(pt('center', points[0]), pt('end', points[1]))
+    elif shape.shape == SHAPE_T_ARC:
+        geometry = "{} {} {}".format(pt('start', points[0]), pt('mid', points[1]), pt('end', points[2]))
+    else:
+        geometry = "{} {}".format(pt('start', points[0]), pt('end', points[1]))
+    return "({}_{}{} {} (layer {}) (width {}){} (tstamp {}))".format(
+        keyword, shape.ShowShape(), " locked" if shape.locked and keyword == 'gr' else "", geometry,
+        quote(board.GetStandardLayerName(shape.layer)), fmt(shape.width), " (fill solid)" if shape.filled else "",
+        shape.m_Uuid.AsString())
+
+
+def save_footprint(board, fp):
+    # children are stored in footprint coordinates
+    def to_local(position):
+        x, y = rotate_point(position[0] - fp.position.x, position[1] - fp.position.y, -fp.orientation)
+        return VECTOR2I(x, y)
+
+    lines = ["  (footprint {}{} (layer {})".format(quote(fp.fpid), " locked" if fp.locked else "",
+                                                  quote(board.GetStandardLayerName(fp.layer))),
+             "    (tstamp {})".format(fp.m_Uuid.AsString()),
+             "    (at {} {}{})".format(fmt(fp.position.x), fmt(fp.position.y),
+                                       " " + fmt_angle(fp.orientation) if fp.orientation else "")]
+    for key, value in fp.properties.items():
+        lines.append("    (property {} {})".format(quote(key), quote(value)))
+    if fp.path.AsString():
+        lines.append("    (path {})".format(quote(fp.path.AsString())))
+    if fp.attributes:
+        lines.append("    (attr {})".format(fp.attributes))
+    for text in [fp.reference, fp.value] + [x for x in fp.graphical_items if isinstance(x, FP_TEXT)]:
+        lines.append("    " + save_text(board, text, 'fp_text', to_local(text.position)))
+    for shape in fp.graphical_items:
+        if not isinstance(shape, FP_TEXT):
+            lines.append("    " + save_shape(board, shape, 'fp', [to_local(p) for p in shape.points()]))
+    for pad in fp.pads:
+        local = to_local(pad.position)
+        net = " (net {} {})".format(pad.net.code, quote(pad.net.name)) if pad.net is not None and pad.net.code else ""
+        lines.append("    (pad {} {} {} (at {} {}{}) (size {} {}) (layers {}){} (tstamp {}))".format(
+            quote(pad.name), pad.pad_type, pad.pad_shape, fmt(local.x), fmt(local.y),
+            " " + fmt_angle(pad.orientation) if pad.orientation else "", fmt(pad.size.x), fmt(pad.size.y),
+            " ".join(quote(x) for x in pad.layer_names), net, pad.m_Uuid.AsString()))
+    lines.append("  )")
+    return "\n".join(lines)
+
+
+def save_track(board, track):
+    locked = " locked" if track.locked else ""
+    if isinstance(track, PCB_VIA):
+        return "  (via{} (at {} {}) (size {}) (drill {}) (layers {} {}) (net {}) (tstamp {}))".format(
+            locked, fmt(track.start.x), fmt(track.start.y), fmt(track.width), fmt(track.drill),
+            quote(board.GetStandardLayerName(track.layers[0])), quote(board.GetStandardLayerName(track.layers[1])),
+            track.GetNetCode(), track.m_Uuid.AsString())
+    keyword = 'arc' if isinstance(track, PCB_ARC) else 'segment'
+    mid = " " + pt('mid', track.mid) if isinstance(track, PCB_ARC) else ""
+    return "  ({}{} {}{} {} (width {}) (layer {}) (net {}) (tstamp {}))".format(
+        keyword, locked, pt('start', track.start), mid, pt('end', track.end), fmt(track.width),
+        quote(board.GetStandardLayerName(track.layer)), track.GetNetCode(), track.m_Uuid.AsString())
+
+
+def save_zone(board, zone):
+    if len(zone.layers) == 1:
+        layers = "(layer {})".format(quote(board.GetStandardLayerName(zone.layers[0])))
+    else:
+        layers = "(layers {})".format(" ".join(quote(board.GetStandardLayerName(x)) for x in zone.layers))
+    lines = ["  (zone{} (net {}) (net_name {}) {}{} (tstamp {}) (hatch {} {})".format(
+        " locked" if zone.locked else "", zone.GetNetCode(), quote(zone.GetNetname()), layers,
+        " (name {})".format(quote(zone.zone_name)) if zone.zone_name else "", zone.m_Uuid.AsString(),
+        zone.hatch[0], fmt(zone.hatch[1]))]
+    if zone.priority:
+        lines.append("    (priority {})".format(zone.priority))
+    lines.append("    (connect_pads {}(clearance {}))".format(
+        "" if zone.pad_connection == "yes" else zone.pad_connection + " ", fmt(zone.clearance)))
+    lines.append("    (min_thickness {})".format(fmt(zone.min_thickness)))
+    if zone.is_rule_area:
+        lines.append("    (keepout {})".format(" ".join("({} {})".format(k, v) for k, v in zone.keepout.items())))
+    lines.append("    (fill{} (thermal_gap {}) (thermal_bridge_width {}))".format(
+        " yes" if zone.is_filled else "", fmt(zone.thermal_gap), fmt(zone.thermal_bridge_width)))
+    for chain in zone.outline.chains():
+        lines.append("    (polygon (pts {}))".format(" ".join(pt('xy', p) for p in chain)))
+    for layer, polys in zone.filled_polygons.items():
+        for polygon in polys.polygons:
+            lines.append("    (filled_polygon (layer {}) (pts {}))".format(
+                quote(board.GetStandardLayerName(layer)), " ".join(pt('xy', p) for p in polygon[0])))
+    lines.append("  )")
+    return "\n".join(lines)
+
+
+def SaveBoard(filename, board):
+    lines = ["(kicad_pcb (version {}) (generator fake_pcbnew)".format(board.version), "", "  (layers"]
+    for layer in board.enabled_layers:
+        user_name = board.user_layer_names.get(layer)
+        kind = "signal" if IsCopperLayer(layer) else "user"
+        lines.append("    ({} {} {}{})".format(layer, quote(board.layer_names[layer]), kind,
+                                              " " + quote(user_name) if user_name else ""))
+    lines.append("  )")
+    lines.append("")
+    for code in sorted(board.netinfo.by_code):
+        lines.append("  (net {} {})".format(code, quote(board.netinfo.by_code[code].name)))
+    lines.append("")
+    for fp in board.footprints:
+        lines.append(save_footprint(board, fp))
+    for drawing in board.drawings:
+        if isinstance(drawing, PCB_TEXT):
+            lines.append("  " + save_text(board, drawing, 'gr_text'))
+        else:
+            lines.append("  " + save_shape(board, drawing, 'gr'))
+    for track in board.tracks:
+        lines.append(save_track(board, track))
+    for zone in board.zones:
+        lines.append(save_zone(board, zone))
+    for group in board.groups:
+        lines.append("  (group {}{} (id {})\n    (members {})\n  )".format(
+            quote(group.name), " locked" if group.locked else "", group.m_Uuid.AsString(),
+            " ".join(x.m_Uuid.AsString() for x in group.items)))
+    lines.append(")")
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    board.filename = filename
+    return True
+
+
+def NewBoard(filename):
+    global _current_board
+    board = BOARD()
+    board.filename = filename
+    _current_board = board
+    return board
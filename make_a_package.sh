@@ -8,6 +8,7 @@ inkscape replicate_layout_light.svg -w 64 -h 64 -o replicate_layout.png
 # refresh the GUI design
 wxformbuilder -g replicate_layout_GUI.fbp
 wxformbuilder -g error_dialog_GUI.fbp
+wxformbuilder -g conn_issue_dialog_GUI.fbp
 
 # grab version and parse it into metadata.json
 cp metadata_source.json metadata_package.json
@@ -28,8 +29,21 @@ cp replicate_layout_dark.png plugins
 cp replicate_layout_light.png plugins
 cp __init__.py plugins
 cp action_replicate_layout.py plugins
+cp replication_dialogs.py plugins
 cp replicate_layout.py plugins
 cp remove_duplicates.py plugins
+cp replication_manifest.py plugins
+cp replication_stats.py plugins
+cp replication_progress.py plugins
+cp replication_logging.py plugins
+cp replicate_layout_cli.py plugins
+cp replication_jobs.py plugins
+cp replication_batch.py plugins
+cp replication_profiling.py plugins
+cp replication_lists.py plugins
+cp replication_hierarchy.py plugins
+cp replication_rooms.py plugins
+cp replication_templates.py plugins
 cp replicate_layout_GUI.py plugins
 cp error_dialog_GUI.py plugins
 cp conn_issue_GUI.py plugins
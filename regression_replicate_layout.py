@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#  regression_replicate_layout.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+"""
+Golden board regression run. A scenario is a job file (see replication_jobs.py)
+with the reference board the replication has to result in, e.g.:
+{
+    "board": "replicate_layout_test_project.kicad_pcb",
+    "reference": "replicate_layout_test_project_ref_inner.kicad_pcb",
+    "settings": {"intersecting": true, "group_items": true},
+    "jobs": [{"anchor": "Q301", "level": 1, "sheets": [1, 3]}]
+}
+All *_scenario.json files found in the given folders are run in parallel, each in its own
+worker process and temporary folder, and the results are compared structurally, e.g.:
+python regression_replicate_layout.py my_projects --workers 4 --output results.json
+The reference boards depend on the pcbnew version which saved them, so they have to be made
+with the same KiCad version the regression is run with. With --update the reference board of
+each scenario is (re)written from the current replication result:
+python regression_replicate_layout.py my_projects --update
+"""
+import os
+import sys
+import glob
+import shutil
+import json
+import time
+import argparse
+import tempfile
+import traceback
+import multiprocessing
+import concurrent.futures
+try:
+    import pcbnew
+except ImportError:
+    import fake_pcbnew
+    pcbnew = fake_pcbnew.install()
+from replication_jobs import parse_jobs
+from replication_batch import replicate_file, get_nr_workers
+from compare_boards import diff_boards, diff_report_to_string
+
+SCENARIO_SUFFIX = "_scenario.json"
+
+
+def find_scenarios(folders):
+    scenarios = []
+    for folder in folders:
+        scenarios.extend(glob.glob(os.path.join(folder, "**", "*" + SCENARIO_SUFFIX), recursive=True))
+    return sorted(os.path.abspath(x) for x in scenarios)
+
+
+def load_scenario(filename):
+    """ returns board and reference filename and the list of jobs """
+    with open(filename) as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as error:
+            raise LookupError(f"Scenario {filename} is not valid JSON: {error}")
+    if not isinstance(data, dict) or 'reference' not in data or 'board' not in data:
+        raise LookupError(f"Scenario {filename} has to define the board and the reference board")
+    base_dir = os.path.dirname(os.path.abspath(filename))
+    reference = os.path.join(base_dir, data.pop('reference'))
+    board, _, jobs = parse_jobs(data, base_dir)
+    return board, reference, jobs
+
+
+def get_scenario_name(filename):
+    return os.path.basename(filename)[:-len(SCENARIO_SUFFIX)]
+
+
+def run_scenario(filename, update=False):
+    """ replicate and compare in a temporary folder. Returns a picklable result """
+    result = {'scenario': get_scenario_name(filename),
+              'filename': filename,
+              'ok': False,
+              'error': None,
+              'time': 0.0,
+              'replication_time': 0.0,
+              'differences': None}
+    start_time = time.perf_counter()
+    cwd = os.getcwd()
+    try:
+        board, reference, jobs = load_scenario(filename)
+        with tempfile.TemporaryDirectory(prefix="replicate_layout_regression_") as temp_dir:
+            # anything written next to the output stays in the temporary folder
+            os.chdir(temp_dir)
+            try:
+                output = os.path.join(temp_dir, os.path.basename(board))
+                replication = replicate_file(board, output, jobs)
+                result['replication_time'] = replication['time']
+                if replication['error']:
+                    result['error'] = replication['error']
+                elif update:
+                    shutil.copyfile(output, reference)
+                    result['ok'] = replication['ok']
+                else:
+                    report = diff_boards(reference, output)
+                    result['differences'] = report['summary']
+                    if not report['equal']:
+                        result['error'] = diff_report_to_string(report)
+                    result['ok'] = replication['ok'] and report['equal']
+            finally:
+                os.chdir(cwd)
+    except LookupError as exception:
+        result['error'] = str(exception)
+    except Exception:
+        result['error'] = traceback.format_exc()
+    result['time'] = time.perf_counter() - start_time
+    return result
+
+
+def run_regression(scenarios, max_workers=None, done_func=None, update=False):
+    """ run the scenarios in parallel, results are returned in the same order """
+    if not scenarios:
+        return []
+    nr_workers = get_nr_workers(len(scenarios), max_workers)
+    results = [None] * len(scenarios)
+    # pcbnew does not survive a fork, every worker starts with a fresh interpreter
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=nr_workers, mp_context=context) as executor:
+        futures = {executor.submit(run_scenario, scenario, update): index for index, scenario in enumerate(scenarios)}
+        for future in concurrent.futures.as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception:
+                # worker process died
+                results[index] = {'scenario': get_scenario_name(scenarios[index]), 'filename': scenarios[index],
+                                  'ok': False, 'error': traceback.format_exc(), 'time': 0.0,
+                                  'replication_time': 0.0, 'differences': None}
+            if done_func is not None:
+                done_func(results[index])
+    return results
+
+
+def regression_report_to_string(results, wall_time=None):
+    """ pass/fail with the time of each scenario, so slow scenarios show up with the broken ones """
+    lines = ["Regression report"]
+    for result in results:
+        status = "PASS" if result['ok'] else "FAIL"
+        lines.append(f"{status} {result['scenario']}: {result['time']:.2f} s "
+                     f"(replication {result['replication_time']:.2f} s)")
+    for result in results:
+        if result['error']:
+            lines.append(f"{result['scenario']}:")
+            lines.extend("    " + line for line in result['error'].strip().splitlines())
+    nr_failed = len([result for result in results if not result['ok']])
+    lines.append(f"{len(results) - nr_failed} of {len(results)} scenarios passed, {nr_failed} failed")
+    if wall_time is not None:
+        lines.append(f"Wall time: {wall_time:.2f} s")
+    return "\n".join(lines)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Replicate layout golden board regression run")
+    parser.add_argument("folders", nargs="*", default=[os.path.dirname(os.path.abspath(__file__))],
+                        help="folders searched for *" + SCENARIO_SUFFIX + " files")
+    parser.add_argument("--workers", type=int, help="number of parallel worker processes")
+    parser.add_argument("-o", "--output", help="save the results (JSON) to this file")
+    parser.add_argument("--update", action="store_true",
+                        help="write the replication results as the reference boards instead of comparing")
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    scenarios = find_scenarios(args.folders)
+    if not scenarios:
+        print("No scenarios found")
+        return 1
+    start_time = time.perf_counter()
+    results = run_regression(scenarios, args.workers, update=args.update)
+    print(regression_report_to_string(results, time.perf_counter() - start_time))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+    return 0 if all(result['ok'] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,8 +28,22 @@ import math
 from difflib import SequenceMatcher
 try:
     from .remove_duplicates import remove_duplicates
+    from .replication_manifest import (ReplicationManifest, get_item_content, get_item_fingerprint,
+                                       get_item_geometry_key, point, ZONE_PROPERTIES)
+    from .replication_stats import ReplicationStats, memory_traced
+    from .replication_progress import ProgressReporter, ReplicationCancelled
+    from .replication_profiling import profiled
+    from .replication_hierarchy import SheetHierarchy
+    from .replication_rooms import Room, ROOM_LAYER_NAME, get_smallest_room
 except:
     from remove_duplicates import remove_duplicates
+    from replication_manifest import (ReplicationManifest, get_item_content, get_item_fingerprint,
+                                      get_item_geometry_key, point, ZONE_PROPERTIES)
+    from replication_stats import ReplicationStats, memory_traced
+    from replication_progress import ProgressReporter, ReplicationCancelled
+    from replication_profiling import profiled
+    from replication_hierarchy import SheetHierarchy
+    from replication_rooms import Room, ROOM_LAYER_NAME, get_smallest_room
 
 Footprint = namedtuple('Footprint', ['ref', 'fp', 'fp_id', 'sheet_id', 'filename'])
 logger = logging.getLogger(__name__)
@@ -37,11 +51,33 @@ logger = logging.getLogger(__name__)
 Settings = namedtuple('Settings', ['rep_tracks', 'rep_zones', 'rep_text', 'rep_drawings',
                                    'group_layouts', 'group_footprints', 'group_tracks', 'group_zones', 'group_text', 'group_drawings',
                                    'rep_locked_tracks', 'rep_locked_zones', 'rep_locked_text', 'rep_locked_drawings',
-                                   'intersecting', 'group_items', 'group_only', 'locked_fps', 'remove'],
+                                   'intersecting', 'group_items', 'group_only', 'locked_fps', 'remove',
+                                   'incremental', 'update', 'bounded_memory'],
                          defaults=[True, True, True, True,
                                    False, False, False, False, False, False,
                                    True, True, True, True,
-                                   False, False, False, False, False])
+                                   False, False, False, False, False,
+                                   False, False, False])
+
+# what is counted for each destination sheet in the replication report
+REPORT_COUNTERS = ['footprints', 'tracks', 'vias', 'zones', 'text', 'drawings', 'removed', 'connectivity_issues']
+
+# relative cost of one item (or one sheet for removal) in each stage, used to weight the overall progress
+STAGE_ITEM_COST = {'footprints': 4, 'zones': 2, 'removal': 20, 'duplicates': 1, 'refill': 50}
+
+# stages which are run for each destination sheet separately in bounded memory mode
+SHEET_STAGES = ['remove_before', 'footprints', 'match_existing', 'remove_after', 'tracks', 'zones', 'text',
+                'drawings', 'orphans']
+# data indexed by destination sheet
+SHEET_DATA = ['dst_sheets', 'dst_groups', 'manifest_entries', 'manifest_seen']
+
+# settings which affect which items are selected for replication
+HIGHLIGHT_SETTINGS = ['rep_tracks', 'rep_zones', 'rep_text', 'rep_drawings',
+                      'rep_locked_tracks', 'rep_locked_zones', 'rep_locked_text', 'rep_locked_drawings',
+                      'intersecting', 'group_items', 'group_only', 'locked_fps']
+
+# group members which are not board drawings (text is handled separately from drawings)
+NON_DRAWING_TYPES = (pcbnew.FOOTPRINT, pcbnew.PCB_TRACK, pcbnew.ZONE, pcbnew.PCB_GROUP, pcbnew.PCB_TEXT)
 
 
 def rotate_around_center(coordinates, angle):
@@ -77,6 +113,27 @@ def update_progress(stage, percentage, message=None):
     print(percentage)
 
 
+def report_to_string(report):
+    """ format replication report into human readable text """
+    if report['dry_run']:
+        lines = ["Dry run - the board was not modified",
+                 "The number of removed items is an estimate based on the current footprint placement"]
+    else:
+        lines = ["Replication report"]
+    if report['cancelled']:
+        lines.append("Canceled by the user, the remaining items were not replicated")
+    for sheet, counters in report['sheets'].items():
+        lines.append(f"Sheet {sheet}:")
+        lines.append("    " + ", ".join(f"{key}={counters[key]}" for key in REPORT_COUNTERS))
+    lines.append("Stage timings:")
+    for stage, duration in report['stages'].items():
+        if stage in report.get('memory', {}):
+            lines.append(f"    {stage}: {duration:.3f} s, peak memory {report['memory'][stage] / 1e6:.1f} MB")
+        else:
+            lines.append(f"    {stage}: {duration:.3f} s")
+    return "\n".join(lines)
+
+
 def flipped_angle(angle):
     if angle > 0:
         return 180 - angle
@@ -85,11 +142,12 @@ def flipped_angle(angle):
 
 
 class Replicator:
+    @profiled
     def __init__(self, board, src_anchor_fp_ref, update_func=update_progress):
         self.board = board
         self.stage = 1
-        self.max_stages = 0
         self.update_progress = update_func
+        self.progress = ProgressReporter(update_func)
 
         self.level = None
         self.settings = Settings
@@ -101,16 +159,55 @@ class Replicator:
         self.dst_groups = []
         self.src_footprints = []
         self.other_footprints = []
-        self.src_bounding_box = None
+        self.src_region = None
         self.src_tracks = []
         self.src_zones = []
         self.src_text = []
         self.src_drawings = []
 
         self.connectivity_issues = set()
+        self.report = None
+        self.stats = ReplicationStats()
+
+        # per sheet data which is needed in every stage. Footprints are only moved by replication,
+        # so these are valid for the lifetime of the replicator and can be shared across several jobs
+        self.hierarchy = None
+        self.anchor_fp_cache = {}
+        self.net_pairs_cache = {}
+
+        # group KIID -> member items, groups change with replication so this is rebuilt for every selection
+        self.group_items = None
+        self.group_kiids = None
+
+        # replication rooms and the points of the items tested against them, by KIID
+        self.rooms = None
+        self.room_kiids = set()
+        self.item_points_cache = {}
+
+        # highlight preview data, footprints and items by KIID
+        self.highlight_cache = {}
+        self.highlighted = ({}, {})
+
+        # incremental replication data
+        self.manifest = None
+        self.manifest_entries = None
+        self.manifest_seen = None
+        self.board_items_by_kiid = None
+        # source item contents by KIID, so that each item is read once and not for every destination sheet
+        self.src_item_contents = None
+
+        # in-place update data
+        self.update_candidates = None
+        self.reusable_items = None
+        self.pending_items = None
+        self.existing_items = None
+        self.candidate_kiids = None
+        self.matched_kiids = None
+        self.added_kiids = None
 
         self.pcb_filename = os.path.abspath(board.GetFileName())
         self.sch_filename = self.pcb_filename.replace(".kicad_pcb", ".kicad_sch")
+        self.manifest_filename = self.pcb_filename.replace(".kicad_pcb", "_replicate_layout_manifest.json")
         self.project_folder = os.path.dirname(self.pcb_filename)
 
         # construct a list of footprints with all pertinent data
@@ -133,22 +230,21 @@ class Replicator:
                 sheet_file = fp.GetProperty('Sheetfile')
                 sheet_name = fp.GetProperty('Sheetname')
             except KeyError:
-                logger.info("Footprint " + fp.GetReference() +
-                            " does not have Sheetfile property, it will not be replicated."
-                            " Most likely it is only in layout")
+                logger.info("Footprint %s does not have Sheetfile property, it will not be replicated."
+                            " Most likely it is only in layout", fp.GetReference())
                 continue
             # footprint is in the schematics and has Sheetfile property
             if sheet_file and sheet_id:
                 self.dict_of_sheets[sheet_id] = [sheet_name, sheet_file]
             # footprint is in the schematics but has empty Sheetfile properties
             elif sheet_id:
-                logger.info("Footprint " + fp.GetReference() + " has empty Sheetfile property")
+                logger.info("Footprint %s has empty Sheetfile property", fp.GetReference())
                 raise LookupError("Footprint " + str(
                     fp.GetReference()) + " has empty Sheetfile and Sheetname properties. "
                                          "You need to update the layout from schematics")
             # footprint is on root level
             else:
-                logger.debug("Footprint " + fp.GetReference() + " on root level")
+                logger.debug("Footprint %s on root level", fp.GetReference())
                 continue
         # catch corner cases with nested hierarchy, where some hierarchical pages don't have any footprints
         unique_sheet_ids.remove("")
@@ -173,19 +269,28 @@ class Replicator:
                 self.footprints.append(fp_tuple)
             except KeyError:
                 pass
+        self.hierarchy = SheetHierarchy(self.footprints)
 
         # find anchor footprint and it's group
+        self.set_anchor(src_anchor_fp_ref)
+
+        # get net-dict
+        # you get the netcode by self.netdict.GetNetItem("netname")
+        self.netdict = self.board.GetNetInfo()
+
+    def set_anchor(self, src_anchor_fp_ref):
+        """ select source anchor footprint, the footprint, sheet and net data of the board are kept """
         self.src_anchor_fp = self.get_fp_by_ref(src_anchor_fp_ref)
+        if self.src_anchor_fp is None:
+            raise LookupError("Footprint " + str(src_anchor_fp_ref) + " is not on the board or it is not in "
+                              "the schematics. You need to update the layout from schematics")
+        # groups are identified by KIID, groups made in KiCad are unnamed by default
         if self.src_anchor_fp.fp.GetParentGroup():
-            self.src_anchor_fp_group = self.src_anchor_fp.fp.GetParentGroup().GetName()
+            self.src_anchor_fp_group = self.src_anchor_fp.fp.GetParentGroup().m_Uuid.AsString()
         else:
             self.src_anchor_fp_group = None
         # TODO check if there is any other footprint with same ID as anchor footprint
 
-        # get net-dict
-        # you get the netcode by self.netdict.GetNetItem("netname")
-        self.netdict = self.board.GetNetInfo()
-
     def parse_schematic_files(self, filename, dict_of_sheets):
         with open(filename, encoding='utf-8') as f:
             contents = f.read().split("\n")
@@ -235,14 +340,15 @@ class Replicator:
                 self.parse_schematic_files(sheetfilepath, dict_of_sheets)
         return
 
+    @profiled
+    @memory_traced
     def replicate_layout(self, src_anchor_fp, level, dst_sheets,
-                         settings, rm_duplicates):
-        logger.info("Starting replication of sheets: " + repr(dst_sheets)
-                    + "\non level: " + repr(level)
-                    + "\nwith tracks=" + repr(settings.rep_tracks) + ", zone=" + repr(settings.rep_zones)
-                    + ", text=" + repr(settings.rep_text) + ", text=" + repr(settings.rep_drawings)
-                    + ", intersecting=" + repr(settings.intersecting) + ", remove=" + repr(settings.remove)
-                    + ", locked footprints=" + repr(settings.locked_fps) + ", group_only=" + repr(settings.group_only))
+                         settings, rm_duplicates, dry_run=False, refill=True):
+        logger.info("Starting replication of sheets: %r\non level: %r\nwith %r, dry_run=%r",
+                    dst_sheets, level, settings, dry_run)
+        if dry_run and (settings.incremental or settings.update):
+            # footprints are not moved in a dry run, so it can not tell which existing items would be kept
+            raise LookupError("Dry run can not be combined with incremental replication or in-place update")
 
         self.level = level
         self.src_anchor_fp = src_anchor_fp
@@ -250,95 +356,646 @@ class Replicator:
         self.replicate_locked_footprints = settings.locked_fps
 
         self.src_sheet = level
-
-        if settings.remove:
-            self.max_stages = 2
-        else:
-            self.max_stages = 0
-        if settings.rep_tracks:
-            self.max_stages = self.max_stages + 1
-        if settings.rep_zones:
-            self.max_stages = self.max_stages + 1
-        if settings.rep_text:
-            self.max_stages = self.max_stages + 1
-        if settings.rep_drawings:
-            self.max_stages = self.max_stages + 1
-        if rm_duplicates:
-            self.max_stages = self.max_stages + 1
-
-        self.update_progress(self.stage, 0.0, "Preparing for replication")
-        self.prepare_for_replication(level, settings)
-        if settings.remove:
+        self.stage = 1
+        self.dst_groups = []
+        self.connectivity_issues = set()
+        self.stats = ReplicationStats()
+
+        self.report = {'dry_run': dry_run,
+                       'cancelled': False,
+                       'stages': {},
+                       'memory': {},
+                       'sheets': {"/".join(sheet): dict.fromkeys(REPORT_COUNTERS, 0) for sheet in dst_sheets}}
+
+        self.progress = ProgressReporter(self.update_progress)
+        try:
+            self.report_progress(0.0, "Preparing for replication")
+            if settings.incremental:
+                self.load_manifest(level)
+            else:
+                self.manifest = None
+                self.manifest_entries = None
+            if settings.update:
+                self.init_update_data()
+                self.matched_kiids = set()
+            else:
+                self.update_candidates = None
+                self.reusable_items = None
+            self.run_stage('prepare', self.prepare_for_replication, level, settings, dry_run)
+            weights = self.get_stage_weights(settings, rm_duplicates, dry_run, refill)
+            if dry_run:
+                self.progress.plan(weights)
+                self.plan_replication(settings)
+                self.stats.finish()
+                logger.info("Dry run report:\n%s", report_to_string(self.report))
+                return self.report
+            if settings.bounded_memory:
+                # stages are run once for each destination sheet, each time with a share of the work
+                repeats = dict.fromkeys(SHEET_STAGES, len(dst_sheets))
+                self.progress.plan({stage: weight / repeats.get(stage, 1) for stage, weight in weights.items()},
+                                   repeats)
+                self.replicate_items_by_sheet(settings, rm_duplicates)
+            else:
+                self.progress.plan(weights)
+                self.replicate_items(settings, rm_duplicates)
+        except ReplicationCancelled:
+            # items are added one at a time, so the board is consistent, only not completely replicated
+            logger.info("Replication canceled, keeping what was already replicated")
+            self.report['cancelled'] = True
+            self.stats.end_stage()
+            if self.update_candidates is not None:
+                self.finish_cancelled_update()
+            if dry_run:
+                self.stats.finish()
+                return self.report
+        if self.manifest is not None:
+            self.manifest.save()
+            self.src_item_contents = None
+        # finally at the end refill the zones
+        if refill:
+            self.stage = 10
+            self.report_progress(0.0, "Refilling zones")
+            self.run_stage('refill', self.refill_zones)
+        self.stats.finish()
+        # what was actually done on each of the sheets
+        for sheet, counters in self.report['sheets'].items():
+            for counter in REPORT_COUNTERS:
+                counters[counter] = self.stats.sheet_counters[sheet][counter]
+        return self.report
+
+    def replicate_items(self, settings, rm_duplicates):
+        self.replicate_sheet_items(settings)
+        self.replicate_board_items(settings, rm_duplicates)
+
+    def replicate_items_by_sheet(self, settings, rm_duplicates):
+        """
+        bounded memory mode, all the stages are run for one destination sheet at a time
+        and the data of each sheet is released before the next one
+        """
+        sheet_data = {name: getattr(self, name) for name in SHEET_DATA}
+        # items of the sheets which are already replicated must not be removed when replicating the next ones
+        self.added_kiids = set()
+        try:
+            for index in range(len(sheet_data['dst_sheets'])):
+                for name, data in sheet_data.items():
+                    if data is not None:
+                        setattr(self, name, data[index:index + 1])
+                logger.info("Replicating sheet %r (%d of %d)", self.dst_sheets[0], index + 1,
+                            len(sheet_data['dst_sheets']))
+                if self.update_candidates is not None:
+                    self.init_update_data()
+                try:
+                    self.replicate_sheet_items(settings)
+                except ReplicationCancelled:
+                    # finish the update of current sheet, the update data of the others is already released
+                    if self.update_candidates is not None:
+                        self.finish_cancelled_update()
+                        self.update_candidates = None
+                    raise
+                self.release_sheet_data(self.dst_sheets[0])
+        finally:
+            for name, data in sheet_data.items():
+                setattr(self, name, data)
+            self.added_kiids = None
+        self.replicate_board_items(settings, rm_duplicates)
+
+    def init_update_data(self):
+        self.update_candidates = [[] for _ in self.dst_sheets]
+        self.reusable_items = [{} for _ in self.dst_sheets]
+        self.pending_items = [[] for _ in self.dst_sheets]
+        self.existing_items = defaultdict(list)
+        self.candidate_kiids = [set() for _ in self.dst_sheets]
+
+    def release_sheet_data(self, sheet):
+        """ drop the cached data of the sheet which was already replicated """
+        key = tuple(sheet)
+        node = self.hierarchy.get_node(sheet)
+        if node is not None:
+            node.release()
+        self.anchor_fp_cache.pop((self.src_anchor_fp.ref, key), None)
+        self.net_pairs_cache.pop((tuple(fp.ref for fp in self.src_footprints), key), None)
+        if self.update_candidates is not None:
+            self.init_update_data()
+
+    def replicate_sheet_items(self, settings):
+        if settings.remove and not settings.update:
             logger.info("Removing tracks and zones, before footprint placement")
             self.stage = 2
-            self.update_progress(self.stage, 0.0, "Removing zones and tracks")
-            self.remove_zones_tracks(settings.intersecting)
+            self.report_progress(0.0, "Removing zones and tracks")
+            self.run_stage('remove_before', self.remove_zones_tracks, settings.intersecting)
         self.stage = 3
-        self.update_progress(self.stage, 0.0, "Replicating footprints")
-        self.replicate_footprints(settings)
-        if settings.remove:
+        self.report_progress(0.0, "Replicating footprints")
+        self.run_stage('footprints', self.replicate_footprints, settings)
+        if settings.update:
+            logger.info("Collecting existing tracks and zones for update, after footprint placement")
+            self.stage = 4
+            self.report_progress(0.0, "Matching existing zones and tracks")
+            self.run_stage('match_existing', self.collect_update_candidates, settings.intersecting)
+        elif settings.remove:
             logger.info("Removing tracks and zones, after footprint placement")
             self.stage = 4
-            self.update_progress(self.stage, 0.0, "Removing zones and tracks")
-            self.remove_zones_tracks(settings.intersecting)
+            self.report_progress(0.0, "Removing zones and tracks")
+            self.run_stage('remove_after', self.remove_zones_tracks, settings.intersecting)
         if settings.rep_tracks:
             self.stage = 5
-            self.update_progress(self.stage, 0.0, "Replicating tracks")
-            self.replicate_tracks(settings)
+            self.report_progress(0.0, "Replicating tracks")
+            self.run_stage('tracks', self.replicate_tracks, settings)
         if settings.rep_zones:
             self.stage = 6
-            self.update_progress(self.stage, 0.0, "Replicating zones")
-            self.replicate_zones(settings)
+            self.report_progress(0.0, "Replicating zones")
+            self.run_stage('zones', self.replicate_zones, settings)
         if settings.rep_text:
             self.stage = 7
-            self.update_progress(self.stage, 0.0, "Replicating text")
-            self.replicate_text(settings)
+            self.report_progress(0.0, "Replicating text")
+            self.run_stage('text', self.replicate_text, settings)
         if settings.rep_drawings:
             self.stage = 8
-            self.update_progress(self.stage, 0.0, "Replicating drawings")
-            self.replicate_drawings(settings)
+            self.report_progress(0.0, "Replicating drawings")
+            self.run_stage('drawings', self.replicate_drawings, settings)
+        if settings.update:
+            self.run_stage('orphans', self.remove_orphans)
+
+    def replicate_board_items(self, settings, rm_duplicates):
         if rm_duplicates:
             self.stage = 9
-            self.update_progress(self.stage, 0.0, "Removing duplicates")
-            self.removing_duplicates()
-        # finally at the end refill the zones
+            self.report_progress(0.0, "Removing duplicates")
+            self.run_stage('duplicates', self.removing_duplicates)
+        if self.manifest is not None:
+            self.run_stage('stale', self.remove_stale_items, settings)
+
+    def get_stage_weights(self, settings, rm_duplicates, dry_run, refill):
+        """ planned work of each stage, so that the overall progress is proportional to the time spent """
+        nr_sheets = len(self.dst_sheets)
+        weights = {'footprints': nr_sheets * len(self.src_footprints) * STAGE_ITEM_COST['footprints']}
+        if settings.update:
+            weights['match_existing'] = nr_sheets * STAGE_ITEM_COST['removal']
+        elif settings.remove:
+            weights['remove_before'] = nr_sheets * STAGE_ITEM_COST['removal']
+            weights['remove_after'] = nr_sheets * STAGE_ITEM_COST['removal']
+        for stage, enabled, src_items in [('tracks', settings.rep_tracks, self.src_tracks),
+                                          ('zones', settings.rep_zones, self.src_zones),
+                                          ('text', settings.rep_text, self.src_text),
+                                          ('drawings', settings.rep_drawings, self.src_drawings)]:
+            if enabled:
+                weights[stage] = nr_sheets * len(src_items) * STAGE_ITEM_COST.get(stage, 1)
+        if dry_run:
+            return weights
+        if rm_duplicates:
+            weights['duplicates'] = len(self.board.GetTracks()) * STAGE_ITEM_COST['duplicates']
+        if refill:
+            weights['refill'] = nr_sheets * len(self.src_zones) * STAGE_ITEM_COST['refill']
+        return weights
+
+    def report_progress(self, fraction, message=None):
+        """ report progress within current stage """
+        self.progress.update(self.stage, fraction, message)
+
+    def load_manifest(self, level):
+        """ load what was replicated on previous runs, so that only changed items are replicated again """
+        logger.info("Loading replication manifest %s", self.manifest_filename)
+        self.manifest = ReplicationManifest(self.manifest_filename)
+        self.manifest_entries = []
+        self.manifest_seen = []
+        self.src_item_contents = {}
+        for sheet in self.dst_sheets:
+            transform = self.get_sheet_transform_signature(sheet)
+            self.manifest_entries.append(self.manifest.get_sheet_entry(level, sheet, transform))
+            self.manifest_seen.append(set())
+        self.board_items_by_kiid = {}
+        for item in itertools.chain(self.board.GetTracks(), self.board.Zones(), self.board.GetDrawings()):
+            self.board_items_by_kiid[item.m_Uuid.AsString()] = item
+
+    def get_sheet_transform_signature(self, sheet):
+        """ placement of source and destination anchor, which defines where the items are replicated to """
+        dst_anchor_fp = self.get_sheet_anchor_footprint(sheet)
+        signature = []
+        for fp in [self.src_anchor_fp.fp, dst_anchor_fp.fp]:
+            position = fp.GetPosition()
+            signature.extend([position.x, position.y, fp.GetOrientationDegrees(), fp.IsFlipped()])
+        return signature
+
+    def filter_replicated_items(self, items):
+        replicated_kiids = self.manifest.get_replicated_kiids()
+        return [item for item in items if item.m_Uuid.AsString() not in replicated_kiids]
+
+    def is_sheet_replicated(self, st_index):
+        """ in incremental mode, sheets which were replicated before are updated through the manifest """
+        return self.manifest_entries is not None and bool(self.manifest_entries[st_index]['items'])
+
+    def skip_unchanged(self, st_index, kind, src_item, *extra):
+        """
+        in incremental mode check whether the destination items of source item are up to date.
+        If they are not, they are removed so that the item can be replicated again
+        """
+        if self.manifest_entries is None:
+            return False
+        src_kiid = src_item.m_Uuid.AsString()
+        content = self.src_item_contents.get(src_kiid)
+        if content is None:
+            content = self.src_item_contents[src_kiid] = get_item_content(src_item)
+        fingerprint = get_item_fingerprint(content, *extra)
+        items = self.manifest_entries[st_index]['items']
+        self.manifest_seen[st_index].add(src_kiid)
+        record = items.get(src_kiid)
+        if record is not None:
+            dst_items = [self.board_items_by_kiid.get(kiid) for kiid in record['dst']]
+            if record['fingerprint'] == fingerprint and all(dst_items):
+                self.stats.count('unchanged')
+                return True
+            # in update mode outdated items are modified in place instead
+            if self.reusable_items is not None:
+                self.reusable_items[st_index][src_kiid] = [item for item in dst_items if item is not None]
+            else:
+                self.remove_items_by_kiid(record['dst'])
+        items[src_kiid] = {'kind': kind, 'fingerprint': fingerprint, 'dst': []}
+        return False
+
+    def record_replicated(self, st_index, src_item, new_item):
+        if self.manifest_entries is None:
+            return
+        record = self.manifest_entries[st_index]['items'][src_item.m_Uuid.AsString()]
+        record['dst'].append(new_item.m_Uuid.AsString())
+
+    def collect_update_candidates(self, intersecting):
+        """ in update mode the existing destination items are not removed, but matched to the replicated ones """
+        if self.manifest is not None:
+            excluded = set(self.manifest.get_replicated_kiids())
+        else:
+            excluded = set()
+        excluded.update(item.m_Uuid.AsString()
+                        for item in itertools.chain(self.src_tracks, self.src_zones, self.src_text, self.src_drawings))
+        if self.added_kiids is not None:
+            excluded.update(self.added_kiids)
+        # items which are already in place are matched anywhere on the board
+        for item in itertools.chain(self.board.GetTracks(), self.board.Zones(), self.board.GetDrawings()):
+            if item.m_Uuid.AsString() not in excluded:
+                self.existing_items[get_item_geometry_key(item)].append(item)
+        # but only items within destination sheet are updated or removed as orphans
+        for index in range(len(self.dst_sheets)):
+            sheet = self.dst_sheets[index]
+            self.report_progress(index / len(self.dst_sheets), None)
+            self.stats.start_sheet(sheet)
+            if self.is_sheet_replicated(index):
+                logger.info("Sheet %r was already replicated, updating it incrementally", sheet)
+                continue
+            for item in self.get_items_for_removal(sheet, intersecting):
+                # overlapping sheets can share items
+                kiid = item.m_Uuid.AsString()
+                if kiid not in excluded:
+                    excluded.add(kiid)
+                    self.update_candidates[index].append(item)
+                    self.candidate_kiids[index].add(kiid)
+
+    def place_item(self, st_index, src_item, new_item, add_to_group):
+        """ add replicated item to the board. In update mode a matching existing item is updated instead """
+        self.stats.swig_call('Duplicate')
+        self.stats.count(self.get_item_kind(new_item))
+        if self.update_candidates is None:
+            self.add_item(new_item)
+            self.finish_placement(st_index, src_item, new_item, add_to_group)
+            return
+        dst_item = self.find_matching_item(st_index, src_item, new_item)
+        if dst_item is None:
+            # partially changed items are matched after all the unchanged ones are
+            self.pending_items[st_index].append((src_item, new_item, add_to_group))
+        else:
+            self.update_item(dst_item, new_item)
+            self.discard_item(new_item)
+            self.stats.count('updated')
+            self.finish_placement(st_index, src_item, dst_item, add_to_group)
+
+    def add_item(self, item):
+        self.stats.swig_call('BOARD.Add')
+        self.stats.count('added')
+        self.board.Add(item)
+        if self.added_kiids is not None:
+            self.added_kiids.add(item.m_Uuid.AsString())
+
+    @staticmethod
+    def discard_item(item):
+        """ duplicated item which is not added to the board, because an existing item was updated instead """
+        if item.GetParentGroup() is not None:
+            item.GetParentGroup().RemoveItem(item)
+        # it is not owned by the board, so python has to free it
+        item.thisown = True
+
+    def remove_item(self, item):
+        self.stats.swig_call('BOARD.RemoveNative')
+        self.stats.count('removed')
+        self.board.RemoveNative(item)
+
+    @staticmethod
+    def get_item_kind(item):
+        if isinstance(item, pcbnew.PCB_VIA):
+            return 'vias'
+        if isinstance(item, pcbnew.PCB_TRACK):
+            return 'tracks'
+        if isinstance(item, pcbnew.ZONE):
+            return 'zones'
+        if isinstance(item, pcbnew.PCB_TEXT):
+            return 'text'
+        return 'drawings'
+
+    def finish_placement(self, st_index, src_item, dst_item, add_to_group):
+        if self.update_candidates is not None:
+            self.matched_kiids.add(dst_item.m_Uuid.AsString())
+        self.record_replicated(st_index, src_item, dst_item)
+        # add items to corresponding layout groups if selected
+        if add_to_group:
+            self.dst_groups[st_index].AddItem(dst_item)
+
+    def find_matching_item(self, st_index, src_item, new_item):
+        """ find existing destination item which was replicated from the same source item or is already in place """
+        key = get_item_geometry_key(new_item)
+        # items replicated from the same source item on a previous run
+        for item in self.reusable_items[st_index].get(src_item.m_Uuid.AsString(), []):
+            if item.m_Uuid.AsString() in self.matched_kiids or item.GetClass() != new_item.GetClass():
+                continue
+            if self.can_update(item, new_item) or get_item_geometry_key(item) == key:
+                return item
+        for item in self.existing_items.get(key, []):
+            kiid = item.m_Uuid.AsString()
+            if kiid in self.matched_kiids:
+                continue
+            # items outside of the destination sheet are reused only if they are on the same net too
+            if (kiid in self.candidate_kiids[st_index] or not isinstance(new_item, pcbnew.BOARD_CONNECTED_ITEM)
+                    or item.GetNetCode() == new_item.GetNetCode()):
+                return item
+        return None
+
+    def place_pending_items(self):
+        """ match the remaining items to partially changed existing items, or add them to the board """
+        for st_index in range(len(self.dst_sheets)):
+            for src_item, new_item, add_to_group in self.pending_items[st_index]:
+                dst_item = None
+                if self.can_update_in_place(new_item):
+                    for item in self.update_candidates[st_index]:
+                        if item.m_Uuid.AsString() not in self.matched_kiids and self.is_modified_item(item, new_item):
+                            dst_item = item
+                            break
+                if dst_item is None:
+                    self.add_item(new_item)
+                    dst_item = new_item
+                else:
+                    self.update_item(dst_item, new_item)
+                    self.discard_item(new_item)
+                    self.stats.count('updated')
+                self.finish_placement(st_index, src_item, dst_item, add_to_group)
+            self.pending_items[st_index] = []
+
+    @staticmethod
+    def can_update_in_place(item):
+        return isinstance(item, (pcbnew.PCB_TRACK, pcbnew.PCB_TEXT, pcbnew.ZONE))
+
+    def can_update(self, item, new_item):
+        """ whether update_item can turn the existing item into the new one """
+        if isinstance(new_item, pcbnew.ZONE):
+            # only the zone settings are updated, not the outline
+            return self.is_modified_item(item, new_item)
+        return self.can_update_in_place(new_item)
+
+    @staticmethod
+    def is_modified_item(item, new_item):
+        """ tracks with one end still in place, vias in place, text with the same contents and zones in place """
+        if item.GetClass() != new_item.GetClass():
+            return False
+        if isinstance(new_item, pcbnew.PCB_VIA):
+            return point(item.GetPosition()) == point(new_item.GetPosition())
+        if isinstance(new_item, pcbnew.PCB_TRACK):
+            item_ends = {point(item.GetStart()), point(item.GetEnd())}
+            new_item_ends = {point(new_item.GetStart()), point(new_item.GetEnd())}
+            return (item.GetLayer() == new_item.GetLayer() and item.GetNetCode() == new_item.GetNetCode()
+                    and bool(item_ends & new_item_ends))
+        if isinstance(new_item, pcbnew.PCB_TEXT):
+            return item.GetLayer() == new_item.GetLayer() and item.GetText() == new_item.GetText()
+        if isinstance(new_item, pcbnew.ZONE):
+            return (list(item.GetLayerSet().Seq()) == list(new_item.GetLayerSet().Seq())
+                    and [point(item.GetCornerPosition(i)) for i in range(item.GetNumCorners())]
+                    == [point(new_item.GetCornerPosition(i)) for i in range(new_item.GetNumCorners())])
+        return False
+
+    @staticmethod
+    def update_item(dst_item, new_item):
+        """ modify existing destination item so that it matches the new item """
+        if get_item_geometry_key(dst_item) != get_item_geometry_key(new_item):
+            if isinstance(new_item, pcbnew.PCB_VIA):
+                dst_item.SetPosition(new_item.GetPosition())
+                dst_item.SetWidth(new_item.GetWidth())
+                dst_item.SetDrill(new_item.GetDrillValue())
+                dst_item.SetLayerPair(new_item.TopLayer(), new_item.BottomLayer())
+            elif isinstance(new_item, pcbnew.PCB_TRACK):
+                dst_item.SetLayer(new_item.GetLayer())
+                dst_item.SetStart(new_item.GetStart())
+                dst_item.SetEnd(new_item.GetEnd())
+                if isinstance(new_item, pcbnew.PCB_ARC):
+                    dst_item.SetMid(new_item.GetMid())
+                dst_item.SetWidth(new_item.GetWidth())
+            elif isinstance(new_item, pcbnew.PCB_TEXT):
+                dst_item.SetLayer(new_item.GetLayer())
+                dst_item.SetText(new_item.GetText())
+                dst_item.SetTextPos(new_item.GetTextPos())
+                dst_item.SetTextAngle(new_item.GetTextAngle())
+                dst_item.SetTextWidth(new_item.GetTextWidth())
+                dst_item.SetTextHeight(new_item.GetTextHeight())
+                dst_item.SetTextThickness(new_item.GetTextThickness())
+                dst_item.SetItalic(new_item.IsItalic())
+                dst_item.SetBold(new_item.IsBold())
+                dst_item.SetMirrored(new_item.IsMirrored())
+                dst_item.SetVisible(new_item.IsVisible())
+                dst_item.SetHorizJustify(new_item.GetHorizJustify())
+                dst_item.SetVertJustify(new_item.GetVertJustify())
+            elif isinstance(new_item, pcbnew.ZONE):
+                for name in ZONE_PROPERTIES:
+                    getattr(dst_item, 'Set' + name)(getattr(new_item, 'Get' + name)())
+                dst_item.SetHatchOrientation(new_item.GetHatchOrientation())
+        if isinstance(new_item, pcbnew.BOARD_CONNECTED_ITEM) and dst_item.GetNetCode() != new_item.GetNetCode():
+            dst_item.SetNetCode(new_item.GetNetCode())
+        if dst_item.IsLocked() != new_item.IsLocked():
+            dst_item.SetLocked(new_item.IsLocked())
+
+    def remove_orphans(self):
+        """ in update mode remove existing destination items which did not match any replicated item """
+        self.place_pending_items()
+        for st_index in range(len(self.dst_sheets)):
+            orphans = list(itertools.chain(self.update_candidates[st_index],
+                                           *self.reusable_items[st_index].values()))
+            orphans = [item for item in orphans if item.m_Uuid.AsString() not in self.matched_kiids]
+            if orphans:
+                logger.info("Removing %d orphaned items on sheet %r", len(orphans), self.dst_sheets[st_index])
+            for item in orphans:
+                # the same item can be orphaned on several sheets
+                self.matched_kiids.add(item.m_Uuid.AsString())
+                if self.board_items_by_kiid is not None:
+                    self.board_items_by_kiid.pop(item.m_Uuid.AsString(), None)
+                self.remove_item(item)
+
+    def finish_cancelled_update(self):
+        """ finish the items which were already replicated, other existing items are left as they are """
+        self.place_pending_items()
+        for st_index in range(len(self.dst_sheets)):
+            for item in itertools.chain(*self.reusable_items[st_index].values()):
+                if item.m_Uuid.AsString() not in self.matched_kiids:
+                    self.matched_kiids.add(item.m_Uuid.AsString())
+                    self.remove_item(item)
+
+    def remove_items_by_kiid(self, kiids):
+        for kiid in kiids:
+            item = self.board_items_by_kiid.pop(kiid, None)
+            if item is not None:
+                self.remove_item(item)
+
+    def remove_stale_items(self, settings):
+        """ remove destination items of source items which were deleted or are no longer selected """
+        replicated_kinds = [kind for kind, enabled in [('tracks', settings.rep_tracks), ('zones', settings.rep_zones),
+                                                       ('text', settings.rep_text), ('drawings', settings.rep_drawings)]
+                            if enabled]
+        for st_index in range(len(self.dst_sheets)):
+            items = self.manifest_entries[st_index]['items']
+            seen = self.manifest_seen[st_index]
+            for src_kiid in list(items.keys()):
+                if items[src_kiid]['kind'] in replicated_kinds and src_kiid not in seen:
+                    logger.debug("Removing items replicated from %s, as source item no longer exists", src_kiid)
+                    self.remove_items_by_kiid(items[src_kiid]['dst'])
+                    del items[src_kiid]
+
+    def run_stage(self, name, function, *args):
+        """ run one replication stage and record how long it took """
+        self.stats.start_stage(name)
+        self.progress.start_stage(name)
+        result = function(*args)
+        self.progress.end_stage()
+        self.stats.end_stage()
+        self.report['stages'][name] = self.stats.get_stage_time(name)
+        if self.stats.get_stage_memory(name) is not None:
+            self.report['memory'][name] = self.stats.get_stage_memory(name)
+        return result
+
+    def refill_zones(self):
         filler = pcbnew.ZONE_FILLER(self.board)
+        self.stats.swig_call('ZONE_FILLER.Fill')
         filler.Fill(self.board.Zones())
 
-    def prepare_for_replication(self, level, settings):
+    def plan_replication(self, settings):
+        """ count what replication would do on each destination sheet, without touching the board """
+        logger.info("Planning replication (dry run)")
+        if settings.remove:
+            self.stage = 2
+            self.report_progress(0.0, "Planning removal")
+            self.run_stage('remove_before', self.plan_removal, settings.intersecting)
+        self.stage = 3
+        self.report_progress(0.0, "Planning footprints")
+        self.run_stage('footprints', self.plan_footprints)
+        if settings.rep_tracks:
+            self.stage = 5
+            self.report_progress(0.0, "Planning tracks")
+            self.run_stage('tracks', self.plan_tracks)
+        if settings.rep_zones:
+            self.stage = 6
+            self.report_progress(0.0, "Planning zones")
+            self.run_stage('zones', self.plan_items, 'zones', self.src_zones)
+        if settings.rep_text:
+            self.stage = 7
+            self.report_progress(0.0, "Planning text")
+            self.run_stage('text', self.plan_items, 'text', self.src_text)
+        if settings.rep_drawings:
+            self.stage = 8
+            self.report_progress(0.0, "Planning drawings")
+            self.run_stage('drawings', self.plan_items, 'drawings', self.src_drawings)
+
+    def plan_removal(self, intersecting):
+        nr_sheets = len(self.dst_sheets)
+        for st_index in range(nr_sheets):
+            sheet = self.dst_sheets[st_index]
+            self.report_progress(st_index / nr_sheets, None)
+            # footprints are not moved in a dry run, so this is an estimate based on current placement,
+            # the items which would only be removed after the footprints are placed are not counted
+            items_for_removal = self.get_items_for_removal(sheet, intersecting)
+            self.report['sheets']["/".join(sheet)]['removed'] = len(items_for_removal)
+
+    def plan_footprints(self):
+        nr_sheets = len(self.dst_sheets)
+        for st_index in range(nr_sheets):
+            sheet = self.dst_sheets[st_index]
+            self.report_progress(st_index / nr_sheets, None)
+            dst_footprints = self.get_footprints_on_sheet(sheet)
+            nr_moved = 0
+            for src_fp in self.src_footprints:
+                dst_fp = self.get_dst_footprint(src_fp, dst_footprints)
+                # locked footprints are skipped
+                if dst_fp.fp.IsLocked() is True and self.replicate_locked_footprints is False:
+                    continue
+                nr_moved = nr_moved + 1
+            self.report['sheets']["/".join(sheet)]['footprints'] = nr_moved
+
+    def plan_tracks(self):
+        nr_sheets = len(self.dst_sheets)
+        for st_index in range(nr_sheets):
+            sheet = self.dst_sheets[st_index]
+            self.report_progress(st_index / nr_sheets, None)
+            nr_issues = len(self.connectivity_issues)
+            net_pairs = self.get_net_pairs(sheet)
+            src_nets = set(pair[0] for pair in net_pairs)
+            sheet_report = self.report['sheets']["/".join(sheet)]
+            sheet_report['connectivity_issues'] = len(self.connectivity_issues) - nr_issues
+            # only the tracks on the nets which exist on destination sheet get cloned
+            for track in self.src_tracks:
+                if track.GetNetname() in src_nets:
+                    if isinstance(track, pcbnew.PCB_VIA):
+                        sheet_report['vias'] = sheet_report['vias'] + 1
+                    else:
+                        sheet_report['tracks'] = sheet_report['tracks'] + 1
+
+    def plan_items(self, kind, src_items):
+        # zones, text and drawings are cloned to every destination sheet
+        for sheet in self.dst_sheets:
+            self.report['sheets']["/".join(sheet)][kind] = len(src_items)
+
+    def prepare_for_replication(self, level, settings, dry_run=False):
         # get a list of source footprints for replication
         logger.info("Getting the list of source footprints")
-        self.update_progress(self.stage, 0 / 8, None)
+        self.report_progress(0 / 8, None)
+        self.index_groups()
+        # replication changes the board, so the highlight selection is not valid after it
+        self.highlight_cache = {}
+        self.rooms = None
+        self.item_points_cache = {}
 
         # if needed filter them by group
         anchor_sheet_footprints = self.get_footprints_on_sheet(level)
-        self.src_bounding_box = self.get_footprints_bounding_box(anchor_sheet_footprints)
-        self.src_footprints = self.get_footprints_for_replication(level, self.src_bounding_box, settings)
+        self.src_region = self.get_sheet_region(level)
+        self.src_footprints = self.get_footprints_for_replication(level, self.src_region, settings)
         excluded_footprints = [fp for fp in anchor_sheet_footprints if fp not in self.src_footprints]
 
         # get the rest of the footprints
         logger.info("Getting the list of all the remaining footprints")
-        self.update_progress(self.stage, 1 / 6, None)
+        self.report_progress(1 / 6, None)
         self.other_footprints = self.get_footprints_not_on_sheet(level)
         self.other_footprints.extend(excluded_footprints)
         # TODO we might need to recalculate bounding box - if so, this has to be ported to highlighting code
 
         # get source tracks
         logger.info("Getting source tracks")
-        self.update_progress(self.stage, 2 / 6, None)
-        self.src_tracks = self.get_tracks_for_replication(level, self.src_bounding_box, settings)
+        self.report_progress(2 / 6, None)
+        self.src_tracks = self.get_tracks_for_replication(level, self.src_region, settings)
         # get source zones
         logger.info("Getting source zones")
-        self.update_progress(self.stage, 3 / 6, None)
-        self.src_zones = self.get_zones_for_replication(level, self.src_bounding_box, settings)
+        self.report_progress(3 / 6, None)
+        self.src_zones = self.get_zones_for_replication(level, self.src_region, settings)
         # get source text items
         logger.info("Getting source text items")
-        self.update_progress(self.stage, 4 / 6, None)
-        self.src_text = self.get_text_for_replication(self.src_bounding_box, settings)
+        self.report_progress(4 / 6, None)
+        self.src_text = self.get_text_for_replication(self.src_region, settings)
         # get source drawings
         logger.info("Getting source drawing items")
-        self.update_progress(self.stage, 5 / 6, None)
-        self.src_drawings = self.get_drawings_for_replication(self.src_bounding_box, settings)
+        self.report_progress(5 / 6, None)
+        self.src_drawings = self.get_drawings_for_replication(self.src_region, settings)
+
+        # items which were generated by previous replication are not part of the source layout
+        if self.manifest is not None:
+            self.src_tracks = self.filter_replicated_items(self.src_tracks)
+            self.src_zones = self.filter_replicated_items(self.src_zones)
+            self.src_text = self.filter_replicated_items(self.src_text)
+            self.src_drawings = self.filter_replicated_items(self.src_drawings)
 
         # get all the existing groups
         groups = self.board.Groups()
@@ -354,6 +1011,9 @@ class Replicator:
                 # TODO this should no be an issue as existing group can/should be used for deletion of items
                 if dst_group_name in g_names:
                     raise LookupError(f"Destination group {dst_group_name} already exists")
+                # dry run does not touch the board
+                if dry_run:
+                    continue
                 dst_group = pcbnew.PCB_GROUP(None)
                 dst_group.SetName(dst_group_name)
                 self.board.Add(dst_group)
@@ -410,19 +1070,14 @@ class Replicator:
         return None
 
     def get_list_of_footprints_with_same_id(self, fp_id):
-        footprints_with_same_id = []
-        for fp in self.footprints:
-            if fp.fp_id == fp_id:
-                footprints_with_same_id.append(fp)
-        return footprints_with_same_id
+        return list(self.hierarchy.footprints_by_id.get(fp_id, []))
 
     def get_sheets_to_replicate(self, reference_footprint, level):
         sheet_id = reference_footprint.sheet_id
         sheet_file = reference_footprint.filename
         # find level_id
         level_file = sheet_file[sheet_id.index(level)]
-        logger.info('constructing a list of sheets suitable for replication on level:'
-                    + repr(level) + ", file:" + repr(level_file))
+        logger.info('constructing a list of sheets suitable for replication on level:%r, file:%r', level, level_file)
 
         # construct complete hierarchy path up to the level of reference footprint
         sheet_id_up_to_level = []
@@ -431,26 +1086,9 @@ class Replicator:
             if sheet_id[i] == level:
                 break
 
-        # get all footprints with same ID
-        footprints_with_same_id = self.get_list_of_footprints_with_same_id(reference_footprint.fp_id)
-
-        # if hierarchy is deeper, match only the sheets with same hierarchy from root to -1
-        sheets_on_same_level = []
-        # go through all the footprints
-        for fp in footprints_with_same_id:
-            # if the footprint is on selected level, it's sheet is added to the list of sheets on this level
-            if level_file in fp.filename:
-                sheet_id_list = []
-                # create a hierarchy path only up to the level
-                for i in range(len(fp.filename)):
-                    sheet_id_list.append(fp.sheet_id[i])
-                    if fp.filename[i] == level_file:
-                        break
-                sheets_on_same_level.append(sheet_id_list)
-
-        # remove duplicates
-        sheets_on_same_level.sort()
-        sheets_on_same_level = list(k for k, _ in itertools.groupby(sheets_on_same_level))
+        # all the instances of the level sheet file, which contain a footprint with the same ID
+        sheets_on_same_level = sorted(node.path for node in
+                                      self.hierarchy.get_instances(level_file, reference_footprint.fp_id))
 
         # remove the sheet path for reference footprint
         for sheet in sheets_on_same_level:
@@ -458,25 +1096,209 @@ class Replicator:
                 index = sheets_on_same_level.index(sheet)
                 del sheets_on_same_level[index]
                 break
-        logger.info("suitable sheets are:" + repr(sheets_on_same_level))
+        logger.info("suitable sheets are:%r", sheets_on_same_level)
         return sheets_on_same_level
 
-    def get_footprints_on_sheet(self, level):
-        footprints_on_sheet = []
-        level_depth = len(level)
-        for fp in self.footprints:
-            if level == fp.sheet_id[0:level_depth]:
-                footprints_on_sheet.append(fp)
-        return footprints_on_sheet
+    def get_sheet_choices(self, reference_footprint, level):
+        """ sheets suitable for replication and their names with the anchor footprint reference on each of them """
+        sheets = self.get_sheets_to_replicate(reference_footprint, level)
+        # get anchor footprints
+        anchor_footprints = self.get_list_of_footprints_with_same_id(reference_footprint.fp_id)
+        # find matching anchors to matching sheets
+        ref_list = []
+        for sheet in sheets:
+            for fp in anchor_footprints:
+                if "/".join(sheet) in "/".join(fp.sheet_id):
+                    ref_list.append(fp.ref)
+                    break
+        names = ['/'.join(x[0]) + " (" + x[1] + ")" for x in zip(sheets, ref_list)]
+        return sheets, names
+
+    def get_sheets_on_level(self, src_anchor_fp, level):
+        """ sheets which can be replicated from the anchor footprint on given level (index into hierarchy) """
+        if not src_anchor_fp.filename:
+            raise LookupError("Footprint " + src_anchor_fp.ref + " is on the root level, there is nothing to replicate")
+        if level >= len(src_anchor_fp.sheet_id):
+            raise LookupError(f"Level {level} does not exist, anchor footprint {src_anchor_fp.ref} is only "
+                              f"{len(src_anchor_fp.sheet_id)} levels deep")
+        return self.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[level])
 
     @staticmethod
-    def filter_items_by_group(items, group):
-        items_in_group = []
+    def select_sheets(sheet_list, sheets):
+        """ select sheets by their index in the list or by their path (e.g. "Full Bridge1/Leg+"), all if none given """
+        if not sheets:
+            return sheet_list
+        sheet_paths = ["/".join(sheet) for sheet in sheet_list]
+        dst_sheets = []
+        for sheet in sheets:
+            if str(sheet).isdigit() and int(sheet) < len(sheet_list):
+                dst_sheets.append(sheet_list[int(sheet)])
+            elif sheet in sheet_paths:
+                dst_sheets.append(sheet_list[sheet_paths.index(sheet)])
+            else:
+                raise LookupError(f"Sheet {sheet} can not be replicated, available sheets are: {sheet_paths}")
+        return dst_sheets
+
+    @profiled
+    def replicate_jobs(self, jobs):
+        """
+        replicate several anchors/levels on the loaded board, one after another. The footprint, sheet
+        and net data are shared among the jobs and the zones are refilled only once, after the last job
+        """
+        # validate all the jobs before the board is modified
+        planned_jobs = []
+        for job in jobs:
+            self.set_anchor(job.anchor)
+            sheet_list = self.get_sheets_on_level(self.src_anchor_fp, job.level)
+            planned_jobs.append((job, self.select_sheets(sheet_list, job.sheets)))
+
+        last_job = None
+        for index, (job, dst_sheets) in enumerate(planned_jobs):
+            if not job.dry_run:
+                last_job = index
+        reports = []
+        self.job_stats = []
+        connectivity_issues = set()
+        for index, (job, dst_sheets) in enumerate(planned_jobs):
+            logger.info("Running job %d of %d: anchor %s, level %d", index + 1, len(planned_jobs), job.anchor, job.level)
+            self.set_anchor(job.anchor)
+            report = self.replicate_layout(self.src_anchor_fp, self.src_anchor_fp.sheet_id[0:job.level + 1],
+                                           dst_sheets, job.settings, job.rm_duplicates, job.dry_run,
+                                           refill=(index == last_job))
+            reports.append(report)
+            self.job_stats.append(self.stats)
+            connectivity_issues.update(self.connectivity_issues)
+            if report['cancelled']:
+                # zones of already replicated jobs still need to be refilled
+                if last_job is not None and index != last_job:
+                    self.refill_zones()
+                break
+        self.connectivity_issues = connectivity_issues
+        return reports
+
+    def get_footprints_on_sheet(self, level):
+        node = self.hierarchy.get_node(level)
+        if node is None:
+            return []
+        if node.subtree_footprints is not None:
+            self.stats.cache_hit('sheet_footprints')
+        else:
+            self.stats.cache_miss('sheet_footprints')
+        # callers are free to modify the list
+        return node.get_footprints()
+
+    def get_sheet_nets(self, level):
+        """ nets on the sheet and the nets which are connected only to the footprints on the sheet """
+        node = self.hierarchy.get_node(level)
+        if node is None:
+            return set(), set()
+        return set(node.get_net_counts()), self.hierarchy.get_exclusive_nets(node)
+
+    def get_sheet_bounding_box(self, level):
+        node = self.hierarchy.get_node(level)
+        if node is None or node.get_bounding_box() is None:
+            raise LookupError(f"There are no footprints on sheet {'/'.join(level)}")
+        left, top, right, bottom = node.get_bounding_box()
+        return pcbnew.BOX2I(pcbnew.VECTOR2I(left, top), pcbnew.VECTOR2I(right - left, bottom - top))
+
+    def get_rooms(self):
+        """ closed polygons and rectangles drawn on the Replicate.Layout user layer """
+        if self.rooms is None:
+            self.rooms = []
+            self.room_kiids = set()
+            layers = [x for x in self.board.GetEnabledLayers().Users() if self.board.GetLayerName(x) == ROOM_LAYER_NAME]
+            for drawing in self.board.GetDrawings():
+                if not layers or drawing.GetLayer() not in layers or not isinstance(drawing, pcbnew.PCB_SHAPE):
+                    continue
+                if drawing.GetShape() == pcbnew.SHAPE_T_POLY:
+                    outline = [(p.x, p.y) for p in drawing.GetPolyPoints()]
+                elif drawing.GetShape() == pcbnew.SHAPE_T_RECT:
+                    start = drawing.GetStart()
+                    end = drawing.GetEnd()
+                    outline = [(start.x, start.y), (end.x, start.y), (end.x, end.y), (start.x, end.y)]
+                else:
+                    continue
+                if len(outline) >= 3:
+                    self.rooms.append(Room(outline, drawing.m_Uuid.AsString()))
+                    self.room_kiids.add(drawing.m_Uuid.AsString())
+            logger.info("Found %d replication rooms", len(self.rooms))
+        return self.rooms
+
+    def is_room(self, item):
+        self.get_rooms()
+        return item.m_Uuid.AsString() in self.room_kiids
+
+    def get_sheet_region(self, level):
+        """ the smallest room containing all the footprints of the sheet, otherwise the footprints bounding box """
+        rooms = self.get_rooms()
+        if rooms:
+            positions = [(fp.fp.GetPosition().x, fp.fp.GetPosition().y) for fp in self.get_footprints_on_sheet(level)]
+            room = get_smallest_room(rooms, positions)
+            if room is not None:
+                logger.info("Using replication room %s for sheet %r", room.name, level)
+                return room
+        return self.get_sheet_bounding_box(level)
+
+    def get_item_points(self, item):
+        """ points of the item which are tested against the room, cached as SWIG calls are slow """
+        kiid = item.m_Uuid.AsString()
+        if kiid not in self.item_points_cache:
+            if isinstance(item, pcbnew.PCB_TRACK):
+                points = [item.GetStart(), item.GetEnd()]
+                if isinstance(item, pcbnew.PCB_ARC):
+                    points.append(item.GetMid())
+            elif isinstance(item, pcbnew.ZONE):
+                outline = item.Outline()
+                points = [outline.CVertex(i) for i in range(outline.TotalVertices())]
+            else:
+                bounding_box = item.GetBoundingBox()
+                self.item_points_cache[kiid] = [(x, y) for x in (bounding_box.GetLeft(), bounding_box.GetRight())
+                                                for y in (bounding_box.GetTop(), bounding_box.GetBottom())]
+                return self.item_points_cache[kiid]
+            self.item_points_cache[kiid] = [(p.x, p.y) for p in points]
+        return self.item_points_cache[kiid]
+
+    def get_items_in_region(self, items, region, containing):
+        """ for each item, if it is inside (or intersects) the region, which is a room or a bounding box """
+        if isinstance(region, Room):
+            return region.select([self.get_item_points(item) for item in items], containing)
+        inside = []
         for item in items:
-            item_group = item.GetParentGroup()
-            if item_group and group == item_group.GetName():
-                items_in_group.append(item)
-        return items_in_group
+            item_bb = item.GetBoundingBox()
+            inside.append(region.Contains(item_bb) if containing else region.Intersects(item_bb))
+        return inside
+
+    def index_groups(self):
+        """ index group members once, so that group based selection does not have to scan the whole board """
+        self.group_items = {}
+        self.group_kiids = {}
+        for group in self.board.Groups():
+            members = self.group_items.setdefault(group.m_Uuid.AsString(), [])
+            members.extend(item.Cast() for item in group.GetItems())
+
+    def get_group_items(self, group):
+        if self.group_items is None:
+            self.index_groups()
+        return self.group_items.get(group, [])
+
+    def get_group_kiids(self, group):
+        if self.group_items is None:
+            self.index_groups()
+        if group not in self.group_kiids:
+            self.group_kiids[group] = set(item.m_Uuid.AsString() for item in self.get_group_items(group))
+        return self.group_kiids[group]
+
+    def is_in_anchor_group(self, item):
+        return item.m_Uuid.AsString() in self.get_group_kiids(self.src_anchor_fp_group)
+
+    def get_anchor_group_items(self, item_types, excluded_types=()):
+        """ members of the anchor footprint group of the given types """
+        return [item for item in self.get_group_items(self.src_anchor_fp_group)
+                if isinstance(item, item_types) and not isinstance(item, excluded_types)]
+
+    def filter_items_by_group(self, items, group):
+        group_kiids = self.get_group_kiids(group)
+        return [item for item in items if item.m_Uuid.AsString() in group_kiids]
 
     @staticmethod
     def filter_footprints_by_group(footprints, group):
@@ -489,12 +1311,8 @@ class Replicator:
         return items_in_group
 
     def get_footprints_not_on_sheet(self, level):
-        footprints_not_on_sheet = []
-        level_depth = len(level)
-        for fp in self.footprints:
-            if level != fp.sheet_id[0:level_depth]:
-                footprints_not_on_sheet.append(fp)
-        return footprints_not_on_sheet
+        on_sheet = set(id(fp) for fp in self.get_footprints_on_sheet(level))
+        return [fp for fp in self.footprints if id(fp) not in on_sheet]
 
     @staticmethod
     def get_nets_from_footprints(footprints):
@@ -548,18 +1366,16 @@ class Replicator:
         bounding_box = pcbnew.BOX2I(position, size)
         return bounding_box
 
-    def get_tracks(self, bounding_box, containing, exclusive_nets=None):
+    def get_tracks(self, region, containing, exclusive_nets=None):
         # get_all tracks
         if exclusive_nets is None:
             exclusive_nets = []
-        all_tracks = self.board.GetTracks()
+        all_tracks = list(self.board.GetTracks())
         tracks = []
         # keep only tracks that are within our bounding box
-        for track in all_tracks:
-            track_bb = track.GetBoundingBox()
+        for track, inside in zip(all_tracks, self.get_items_in_region(all_tracks, region, containing)):
             # if track is contained or intersecting the bounding box
-            if (containing and bounding_box.Contains(track_bb)) or \
-                    (not containing and bounding_box.Intersects(track_bb)):
+            if inside:
                 tracks.append(track)
             # even if track is not within the bounding box, but is on the completely local net
             else:
@@ -569,7 +1385,7 @@ class Replicator:
                     tracks.append(track)
         return tracks
 
-    def get_zones(self, bounding_box, containing, exclusive_nets=None):
+    def get_zones(self, region, containing, exclusive_nets=None):
         if exclusive_nets is None:
             exclusive_nets = []
         # get all zones
@@ -578,10 +1394,8 @@ class Replicator:
             all_zones.append(self.board.GetArea(zone_id))
         # find all zones which are within the bounding box
         zones = []
-        for zone in all_zones:
-            zone_bb = zone.GetBoundingBox()
-            if (containing and bounding_box.Contains(zone_bb)) or \
-                    (not containing and bounding_box.Intersects(zone_bb)):
+        for zone, inside in zip(all_zones, self.get_items_in_region(all_zones, region, containing)):
+            if inside:
                 zones.append(zone)
             # even if track is not within the bounding box, but is on the completely local net
             else:
@@ -590,46 +1404,23 @@ class Replicator:
                     zones.append(zone)
         return zones
 
-    def get_text_items(self, bounding_box, containing, outside=False):
+    def get_text_items(self, region, containing, outside=False):
         # get all text objects in bounding box
-        all_text = []
-        for drawing in self.board.GetDrawings():
-            if not isinstance(drawing, pcbnew.PCB_TEXT):
-                continue
-            if not outside:
-                text_bb = drawing.GetBoundingBox()
-                if containing:
-                    if bounding_box.Contains(text_bb):
-                        all_text.append(drawing)
-                else:
-                    if bounding_box.Intersects(text_bb):
-                        all_text.append(drawing)
-            else:
-                text_bb = drawing.GetBoundingBox()
-                if not bounding_box.Contains(text_bb):
-                    all_text.append(drawing)
-        return all_text
-
-    def get_drawings(self, bounding_box, containing, outside=False):
-        # get all drawings in source bounding box
-        all_drawings = []
-        for drawing in self.board.GetDrawings():
-            if isinstance(drawing, pcbnew.PCB_TEXT):
-                # text items are handled separately
-                continue
-            if not outside:
-                dwg_bb = drawing.GetBoundingBox()
-                if containing:
-                    if bounding_box.Contains(dwg_bb):
-                        all_drawings.append(drawing)
-                else:
-                    if bounding_box.Intersects(dwg_bb):
-                        all_drawings.append(drawing)
-            else:
-                dwg_bb = drawing.GetBoundingBox()
-                if not bounding_box.Contains(dwg_bb):
-                    all_drawings.append(drawing)
-        return all_drawings
+        text_items = [x for x in self.board.GetDrawings() if isinstance(x, pcbnew.PCB_TEXT)]
+        if outside:
+            return [x for x, inside in zip(text_items, self.get_items_in_region(text_items, region, True))
+                    if not inside]
+        return [x for x, inside in zip(text_items, self.get_items_in_region(text_items, region, containing))
+                if inside]
+
+    def get_drawings(self, region, containing, outside=False):
+        # get all drawings in source bounding box, text items are handled separately and rooms are kept
+        drawings = [x for x in self.board.GetDrawings() if not isinstance(x, pcbnew.PCB_TEXT) and not self.is_room(x)]
+        if outside:
+            return [x for x, inside in zip(drawings, self.get_items_in_region(drawings, region, True))
+                    if not inside]
+        return [x for x, inside in zip(drawings, self.get_items_in_region(drawings, region, containing))
+                if inside]
 
     @staticmethod
     def get_footprint_text_items(footprint):
@@ -643,6 +1434,16 @@ class Replicator:
         return list_of_items
 
     def get_sheet_anchor_footprint(self, sheet):
+        """ cached, as it is needed for every destination sheet in each stage """
+        key = (self.src_anchor_fp.ref, tuple(sheet))
+        if key in self.anchor_fp_cache:
+            self.stats.cache_hit('anchor_footprints')
+        else:
+            self.stats.cache_miss('anchor_footprints')
+            self.anchor_fp_cache[key] = self.find_sheet_anchor_footprint(sheet)
+        return self.anchor_fp_cache[key]
+
+    def find_sheet_anchor_footprint(self, sheet):
         # get all footprints on this sheet
         sheet_footprints = self.get_footprints_on_sheet(sheet)
         # get anchor footprint
@@ -671,6 +1472,20 @@ class Replicator:
         return sheet_anchor_fp
 
     def get_net_pairs(self, sheet):
+        """ cached, as both tracks and zones need them for every destination sheet, also across the jobs """
+        key = (tuple(fp.ref for fp in self.src_footprints), tuple(sheet))
+        if key in self.net_pairs_cache:
+            self.stats.cache_hit('net_pairs')
+        else:
+            self.stats.cache_miss('net_pairs')
+            self.net_pairs_cache[key] = self.find_net_pairs(sheet)
+        net_pairs, connectivity_issues = self.net_pairs_cache[key]
+        new_issues = set(connectivity_issues) - self.connectivity_issues
+        self.connectivity_issues.update(new_issues)
+        self.stats.count('connectivity_issues', len(new_issues))
+        return net_pairs
+
+    def find_net_pairs(self, sheet):
         """ find all net pairs between source sheet and current sheet"""
         # find all footprints, pads and nets on this sheet
         sheet_footprints = self.get_footprints_on_sheet(sheet)
@@ -747,9 +1562,11 @@ class Replicator:
 
                 # if I didn't find proper pair, append it anyway but addit to the list for reporting a warnning
                 net_pairs.append(net_pair)
-                logger.warning(f"Significant difference between src net: {src_net_path} and dst net: {dst_net_path}, "
-                               f"with src_net_depth={src_net_depth}, dst_net_depth={dst_net_depth}, "
-                               f"src_fp_depth={src_fp_depth}, dst_fp_depth={dst_fp_depth}, match level {match_level:.2f}")
+                logger.warning("Significant difference between src net: %s and dst net: %s, "
+                               "with src_net_depth=%d, dst_net_depth=%d, "
+                               "src_fp_depth=%d, dst_fp_depth=%d, match level %.2f",
+                               src_net_path, dst_net_path, src_net_depth, dst_net_depth,
+                               src_fp_depth, dst_fp_depth, match_level)
                 connectivity_issues.append((fp_pair[1].ref, pad_nr))
         if connectivity_issues:
             """
@@ -759,13 +1576,13 @@ class Replicator:
             logger.info(f"Looks like the design has an exotic connectivity that is not supported by the plugin\n"
                         f"Make sure that you check the connectivity around:\n" + report_string)
             """
-            self.connectivity_issues.update(connectivity_issues)
 
         # remove duplicates
         net_pairs_clean = list(set(net_pairs))
-        logger.info("Net pairs for sheet " + repr(sheet) + " :" + repr(net_pairs_clean))
+        logger.info("Found %d net pairs for sheet %r", len(net_pairs_clean), sheet)
+        logger.debug("Net pairs for sheet %r :%r", sheet, net_pairs_clean)
 
-        return net_pairs_clean
+        return net_pairs_clean, connectivity_issues
 
     @staticmethod
     def find_match_level(netname_a, netname_b):
@@ -802,6 +1619,35 @@ class Replicator:
                         good_match_count = good_match_count + match_ratio
                 return good_match_count / len_nets_2
 
+    @staticmethod
+    def get_dst_footprint(src_fp, dst_footprints):
+        """ find the footprint on destination sheet which corresponds to source footprint """
+        list_of_possible_dst_footprints = []
+        for d_fp in dst_footprints:
+            if d_fp.fp_id == src_fp.fp_id:
+                list_of_possible_dst_footprints.append(d_fp)
+
+        # if there is more than one possible anchor, select the correct one
+        if len(list_of_possible_dst_footprints) == 1:
+            dst_fp = list_of_possible_dst_footprints[0]
+        else:
+            list_of_matches = []
+            for fp in list_of_possible_dst_footprints:
+                index = list_of_possible_dst_footprints.index(fp)
+                matches = 0
+                for item in src_fp.sheet_id:
+                    if item in fp.sheet_id:
+                        matches = matches + 1
+                list_of_matches.append((index, matches))
+            # check if list is empty, if it is, then it is highly likely that schematics and pcb are not in sync
+            if not list_of_matches:
+                raise LookupError("Can not find destination footprint for source footprint: " + repr(src_fp.ref)
+                                  + "\n" + "Most likely, schematics and PCB are not in sync")
+            # select the one with most matches
+            index, _ = max(list_of_matches, key=lambda item: item[1])
+            dst_fp = list_of_possible_dst_footprints[index]
+        return dst_fp
+
     def replicate_footprints(self, settings):
         logger.info("Replicating footprints")
         nr_sheets = len(self.dst_sheets)
@@ -809,8 +1655,9 @@ class Replicator:
             sheet = self.dst_sheets[st_index]
 
             progress = st_index / nr_sheets
-            self.update_progress(self.stage, progress, None)
-            logger.info("Replicating footprints on sheet " + repr(sheet))
+            self.report_progress(progress, None)
+            logger.info("Replicating footprints on sheet %r", sheet)
+            self.stats.start_sheet(sheet)
             # get anchor footprint
             dst_anchor_fp = self.get_sheet_anchor_footprint(sheet)
             dst_anchor_fp_angle = dst_anchor_fp.fp.GetOrientationDegrees()
@@ -823,43 +1670,23 @@ class Replicator:
             # go through all footprints
             src_footprints = self.src_footprints
             dst_footprints = self.get_footprints_on_sheet(sheet)
+            # the footprints are moved, so the cached bounding boxes of the sheet are not valid anymore
+            self.hierarchy.get_node(sheet).invalidate_bounding_box()
 
             nr_footprints = len(src_footprints)
             for fp_index in range(nr_footprints):
                 src_fp = src_footprints[fp_index]
 
                 progress = progress + (1 / nr_sheets) * (1 / nr_footprints)
-                self.update_progress(self.stage, progress, None)
+                self.report_progress(progress, None)
 
                 # find proper match in source footprints
-                list_of_possible_dst_footprints = []
-                for d_fp in dst_footprints:
-                    if d_fp.fp_id == src_fp.fp_id:
-                        list_of_possible_dst_footprints.append(d_fp)
-
-                # if there is more than one possible anchor, select the correct one
-                if len(list_of_possible_dst_footprints) == 1:
-                    dst_fp = list_of_possible_dst_footprints[0]
-                else:
-                    list_of_matches = []
-                    for fp in list_of_possible_dst_footprints:
-                        index = list_of_possible_dst_footprints.index(fp)
-                        matches = 0
-                        for item in src_fp.sheet_id:
-                            if item in fp.sheet_id:
-                                matches = matches + 1
-                        list_of_matches.append((index, matches))
-                    # check if list is empty, if it is, then it is highly likely that schematics and pcb are not in sync
-                    if not list_of_matches:
-                        raise LookupError("Can not find destination footprint for source footprint: " + repr(src_fp.ref)
-                                          + "\n" + "Most likely, schematics and PCB are not in sync")
-                    # select the one with most matches
-                    index, _ = max(list_of_matches, key=lambda item: item[1])
-                    dst_fp = list_of_possible_dst_footprints[index]
+                dst_fp = self.get_dst_footprint(src_fp, dst_footprints)
 
                 # skip locked footprints
                 if dst_fp.fp.IsLocked() is True and self.replicate_locked_footprints is False:
                     continue
+                self.stats.count('footprints')
 
                 # get footprint to clone position
                 src_fp_orientation = src_fp.fp.GetOrientationDegrees()
@@ -979,8 +1806,9 @@ class Replicator:
         for st_index in range(nr_sheets):
             sheet = self.dst_sheets[st_index]
             progress = st_index / nr_sheets
-            self.update_progress(self.stage, progress, None)
-            logger.info("Replicating tracks on sheet " + repr(sheet))
+            self.report_progress(progress, None)
+            logger.info("Replicating tracks on sheet %r", sheet)
+            self.stats.start_sheet(sheet)
 
             # get anchor footprint
             dst_anchor_fp = self.get_sheet_anchor_footprint(sheet)
@@ -1005,7 +1833,7 @@ class Replicator:
                 track = self.src_tracks[track_index]
 
                 progress = progress + (1 / nr_sheets) * (1 / nr_tracks)
-                self.update_progress(self.stage, progress, None)
+                self.report_progress(progress, None)
 
                 # get from which net we are cloning
                 from_net_name = track.GetNetname()
@@ -1016,6 +1844,9 @@ class Replicator:
                     pass
                 else:
                     to_net_name = tup[0][1]
+                    # skip tracks which did not change since last replication
+                    if self.skip_unchanged(st_index, 'tracks', track, to_net_name):
+                        continue
                     to_net_code = self.netdict.GetNetItem(to_net_name).GetNetCode()
                     #to_net_item = self.netdict.GetNetItem(to_net_name)
 
@@ -1036,11 +1867,7 @@ class Replicator:
                     if source_group is not None:
                         source_group.RemoveItem(new_track)                    
 
-                    # add tracks to corresponding layout groups if selected
-                    if settings.group_tracks:
-                        self.dst_groups[st_index].AddItem(new_track)
-
-                    self.board.Add(new_track)
+                    self.place_item(st_index, track, new_track, settings.group_tracks)
 
     def replicate_zones(self, settings):
         """ method which replicates zones"""
@@ -1050,17 +1877,15 @@ class Replicator:
         for st_index in range(nr_sheets):
             sheet = self.dst_sheets[st_index]
             progress = st_index / nr_sheets
-            self.update_progress(self.stage, progress, None)
-            logger.info("Replicating zones on sheet " + repr(sheet))
+            self.report_progress(progress, None)
+            logger.info("Replicating zones on sheet %r", sheet)
+            self.stats.start_sheet(sheet)
 
             # get anchor footprint
             dst_anchor_fp = self.get_sheet_anchor_footprint(sheet)
             dst_anchor_fp_angle = dst_anchor_fp.fp.GetOrientation().AsDegrees()
             dst_anchor_fp_position = dst_anchor_fp.fp.GetPosition()
 
-            # get source group from source footprint
-            source_group = self.src_anchor_fp.fp.GetParentGroup()
-
             src_anchor_fp_angle = self.src_anchor_fp.fp.GetOrientation().AsDegrees()
             src_anchor_fp_position = self.src_anchor_fp.fp.GetPosition()
 
@@ -1074,7 +1899,7 @@ class Replicator:
                 zone = self.src_zones[zone_index]
 
                 progress = progress + (1 / nr_sheets) * (1 / nr_zones)
-                self.update_progress(self.stage, progress, None)
+                self.report_progress(progress, None)
 
                 # get from which net we are cloning
                 from_net_name = zone.GetNetname()
@@ -1087,8 +1912,8 @@ class Replicator:
                         # With proper layout I don't see why this should happen
                         # TODO find a case when this happens in order to log it with proper message
                         if len(tup) == 0:
-                            logger.info("When replicating zone from source net " + repr(from_net_name) +
-                                        " we did not find matching destination net")
+                            logger.info("When replicating zone from source net %r"
+                                        " we did not find matching destination net", from_net_name)
                             tup = [('', '')]
                     # if source zone does not have a netname defined then destination zone also does not need it
                     else:                        
@@ -1102,6 +1927,9 @@ class Replicator:
 
                 # start the clone
                 to_net_name = tup[0][1]
+                # skip zones which did not change since last replication
+                if self.skip_unchanged(st_index, 'zones', zone, to_net_name):
+                    continue
                 if to_net_name == u'':
                     to_net_code = 0
                     to_net_item = self.board.FindNet(0)
@@ -1109,8 +1937,8 @@ class Replicator:
                     to_net_code = self.netdict.GetNetItem(to_net_name).GetNetCode()
                     #to_net_item = self.netdict.GetNetItem(to_net_name)
 
-                # make a duplicate, move it, rotate it, select proper net and add it to the board
-                new_zone = zone.Duplicate().Cast()
+                # make an unfilled copy, move it, rotate it, select proper net and add it to the board
+                new_zone = self.clone_zone(zone)
                 new_zone.Move(move_vector)
                 new_zone.SetNetCode(to_net_code)
                 #new_zone.SetNet(to_net_item)
@@ -1122,15 +1950,28 @@ class Replicator:
                 else:
                     new_zone.Rotate(dst_anchor_fp_position, pcbnew.EDA_ANGLE(delta_orientation, pcbnew.DEGREES_T))
 
-                # prevent zones from being added into source group
-                if source_group is not None:
-                        source_group.RemoveItem(new_zone)
-
-                # add zones to corresponding layout groups if selected
-                if settings.group_zones:
-                    self.dst_groups[st_index].AddItem(new_zone)
-
-                self.board.Add(new_zone)
+                self.place_item(st_index, zone, new_zone, settings.group_zones)
+
+    def clone_zone(self, zone):
+        """
+        copy only the outline, settings and net of the zone. The fill is not copied
+        as all the zones are refilled at the end anyhow
+        """
+        new_zone = pcbnew.ZONE(self.board)
+        zone_settings = pcbnew.ZONE_SETTINGS()
+        zone_settings << zone
+        zone_settings.ExportSetting(new_zone)
+        src_outline = zone.Outline()
+        new_outline = new_zone.Outline()
+        for outline_index in range(src_outline.OutlineCount()):
+            new_outline.AddOutline(src_outline.Outline(outline_index))
+            for hole_index in range(src_outline.HoleCount(outline_index)):
+                new_outline.AddHole(src_outline.Hole(outline_index, hole_index))
+        new_zone.SetNetCode(zone.GetNetCode())
+        new_zone.SetLocked(zone.IsLocked())
+        new_zone.SetIsFilled(False)
+        new_zone.SetNeedRefill(True)
+        return new_zone
 
     def replicate_text(self, settings):
         logger.info("Replicating text")
@@ -1139,8 +1980,9 @@ class Replicator:
         for st_index in range(nr_sheets):
             sheet = self.dst_sheets[st_index]
             progress = st_index / nr_sheets
-            self.update_progress(self.stage, progress, None)
-            logger.info("Replicating text on sheet " + repr(sheet))
+            self.report_progress(progress, None)
+            logger.info("Replicating text on sheet %r", sheet)
+            self.stats.start_sheet(sheet)
 
             # get anchor footprint
             dst_anchor_fp = self.get_sheet_anchor_footprint(sheet)
@@ -1161,7 +2003,11 @@ class Replicator:
                 text = self.src_text[text_index]
 
                 progress = progress + (1 / nr_sheets) * (1 / nr_text)
-                self.update_progress(self.stage, progress, None)
+                self.report_progress(progress, None)
+
+                # skip text which did not change since last replication
+                if self.skip_unchanged(st_index, 'text', text):
+                    continue
 
                 new_text = text.Duplicate().Cast()
                 new_text.Move(move_vector)
@@ -1177,11 +2023,7 @@ class Replicator:
                 if source_group is not None:
                         source_group.RemoveItem(new_text)
 
-                # add text to corresponding layout groups if selected
-                if settings.group_text:
-                    self.dst_groups[st_index].AddItem(new_text)
-
-                self.board.Add(new_text)
+                self.place_item(st_index, text, new_text, settings.group_text)
 
     def replicate_drawings(self, settings):
         logger.info("Replicating drawings")
@@ -1189,8 +2031,9 @@ class Replicator:
         for st_index in range(nr_sheets):
             sheet = self.dst_sheets[st_index]
             progress = st_index / nr_sheets
-            self.update_progress(self.stage, progress, None)
-            logger.info("Replicating drawings on sheet " + repr(sheet))
+            self.report_progress(progress, None)
+            logger.info("Replicating drawings on sheet %r", sheet)
+            self.stats.start_sheet(sheet)
 
             # get anchor footprint
             dst_anchor_fp = self.get_sheet_anchor_footprint(sheet)
@@ -1211,7 +2054,11 @@ class Replicator:
             for dw_index in range(nr_drawings):
                 drawing = self.src_drawings[dw_index]
                 progress = progress + (1 / nr_sheets) * (1 / nr_drawings)
-                self.update_progress(self.stage, progress, None)
+                self.report_progress(progress, None)
+
+                # skip drawings which did not change since last replication
+                if self.skip_unchanged(st_index, 'drawings', drawing):
+                    continue
 
                 new_drawing = drawing.Duplicate().Cast()
                 new_drawing.Move(move_vector)
@@ -1228,90 +2075,83 @@ class Replicator:
                 # prevent drawings from being added into source group
                 if source_group is not None:
                         source_group.RemoveItem(new_drawing)
-                # add drawings to corresponding layout groups if selected
-                if settings.group_drawings:
-                    self.dst_groups[st_index].AddItem(new_drawing)
-
-                self.board.Add(new_drawing)
+                self.place_item(st_index, drawing, new_drawing, settings.group_drawings)
 
     def remove_zones_tracks(self, intersecting):
         for index in range(len(self.dst_sheets)):
             sheet = self.dst_sheets[index]
-            self.update_progress(self.stage, index / len(self.dst_sheets), None)
-            # get footprints on a sheet
-            fp_sheet = self.get_footprints_on_sheet(sheet)
-            # get bounding box
-            bounding_box = self.get_footprints_bounding_box(fp_sheet)
-            logger.info(f"Remove bounding box top:{bounding_box.GetTop()}, bottom:{bounding_box.GetBottom()}, "
-                        f"Left:{bounding_box.GetLeft()}, Right:{bounding_box.GetRight()}")
-            # remove only tracks which are within the bounding box
-            # or they are connected to a net that is completely local to the sheet
-            nets_on_sheet = self.get_nets_from_footprints(fp_sheet)
-            fp_not_on_sheet = self.get_footprints_not_on_sheet(sheet)
-            other_nets = self.get_nets_from_footprints(fp_not_on_sheet)
-            nets_exclusively_on_sheet = [net for net in nets_on_sheet if net not in other_nets]
-
-            # remove items
-            # TODO refactor out the old selection code
-            tracks_for_removal = self.get_tracks(bounding_box, not intersecting, nets_exclusively_on_sheet)
-            for track in tracks_for_removal:
-                # minus the tracks in source bounding box
-                if track not in self.src_tracks:
-                    self.board.RemoveNative(track)
-            zones_for_removal = self.get_zones(bounding_box, not intersecting, nets_exclusively_on_sheet)
-            for zone in zones_for_removal:
-                # minus the zones in source bounding box
-                if zone not in self.src_zones:
-                    self.board.RemoveNative(zone)
-            for text_item in self.get_text_items(bounding_box, not intersecting):
-                self.board.RemoveNative(text_item)
-            for drawing in self.get_drawings(bounding_box, not intersecting):
-                self.board.RemoveNative(drawing)
+            self.report_progress(index / len(self.dst_sheets), None)
+            self.stats.start_sheet(sheet)
+            # replicated items are tracked by the manifest, removing them would defeat incremental replication
+            if self.is_sheet_replicated(index):
+                logger.info("Sheet %r was already replicated, updating it incrementally", sheet)
+                continue
+            for item in self.get_items_for_removal(sheet, intersecting):
+                # in bounded memory mode, overlapping sheets which were already replicated are kept
+                if self.added_kiids is not None and item.m_Uuid.AsString() in self.added_kiids:
+                    continue
+                self.remove_item(item)
+
+    def get_items_for_removal(self, sheet, intersecting):
+        """ get tracks, zones, text and drawings which would be removed from destination sheet """
+        # get the room or the bounding box, destination items could have been changed in place
+        self.item_points_cache = {}
+        region = self.get_sheet_region(sheet)
+        if not isinstance(region, Room):
+            logger.debug("Remove bounding box top:%d, bottom:%d, Left:%d, Right:%d",
+                         region.GetTop(), region.GetBottom(), region.GetLeft(), region.GetRight())
+        # remove only tracks which are within the bounding box
+        # or they are connected to a net that is completely local to the sheet
+        nets_on_sheet, nets_exclusively_on_sheet = self.get_sheet_nets(sheet)
+
+        # TODO refactor out the old selection code
+        items_for_removal = []
+        tracks_for_removal = self.get_tracks(region, not intersecting, nets_exclusively_on_sheet)
+        for track in tracks_for_removal:
+            # minus the tracks in source bounding box
+            if track not in self.src_tracks:
+                items_for_removal.append(track)
+        zones_for_removal = self.get_zones(region, not intersecting, nets_exclusively_on_sheet)
+        for zone in zones_for_removal:
+            # minus the zones in source bounding box
+            if zone not in self.src_zones:
+                items_for_removal.append(zone)
+        items_for_removal.extend(self.get_text_items(region, not intersecting))
+        items_for_removal.extend(self.get_drawings(region, not intersecting))
+        return items_for_removal
 
     def removing_duplicates(self):
         remove_duplicates(self.board)
 
-    def get_footprints_for_replication(self, level, bounding_box, settings):
+    def get_footprints_for_replication(self, level, region, settings):
         src_fps = self.get_footprints_on_sheet(level)
         fps_for_replication = []
         for fp in src_fps:
             if not fp.fp.IsLocked() or settings.rep_locked_drawings:
                 if settings.group_only:
-                    if fp.fp.GetParentGroup():
-                        if fp.fp.GetParentGroup().GetName() == self.src_anchor_fp_group:
-                            fps_for_replication.append(fp)
+                    if self.is_in_anchor_group(fp.fp):
+                        fps_for_replication.append(fp)
                 else:
                     fps_for_replication.append(fp)
         return fps_for_replication
 
-    def get_tracks_for_replication(self, level, bounding_box, settings):
+    def get_tracks_for_replication(self, level, region, settings):
         tracks_for_replication = []
-        # get all tracks
-        all_tracks = self.board.GetTracks()
+        nets_on_sheet, nets_exclusively_on_sheet = self.get_sheet_nets(level)
 
-        src_fps = self.get_footprints_on_sheet(level)
-        nets_on_sheet = self.get_nets_from_footprints(src_fps)
-        fp_not_on_sheet = self.get_footprints_not_on_sheet(level)
-        other_nets = self.get_nets_from_footprints(fp_not_on_sheet)
-        nets_exclusively_on_sheet = [net for net in nets_on_sheet if net not in other_nets]
-        common_nets_on_sheet = [net for net in nets_on_sheet if net not in nets_exclusively_on_sheet]
-
-        logger.info(f"Filtering list of tracks")
+        logger.info("Filtering list of tracks")
         if settings.group_only:
             # get all tracks that are in the group and on sheet nets (including common)
-            for t in all_tracks:
+            for t in self.get_anchor_group_items(pcbnew.PCB_TRACK):
                 if not t.IsLocked() or settings.rep_locked_tracks:
-                    if t.GetParentGroup():
-                        logger.info(f"Track group: {t.GetParentGroup().GetName()}, src group:{self.src_anchor_fp_group}")
-                        if t.GetParentGroup().GetName() == self.src_anchor_fp_group:
-                            if t.GetNetname() in nets_on_sheet:
-                                tracks_for_replication.append(t)
+                    if t.GetNetname() in nets_on_sheet:
+                        tracks_for_replication.append(t)
         else:
-            for t in all_tracks:
+            all_tracks = list(self.board.GetTracks())
+            in_region = self.get_items_in_region(all_tracks, region, not settings.intersecting)
+            for t, inside in zip(all_tracks, in_region):
                 if not t.IsLocked() or settings.rep_locked_tracks:
-                    t_bb = t.GetBoundingBox()
-                    if (settings.intersecting and bounding_box.Intersects(t_bb)) or \
-                            (not settings.intersecting and bounding_box.Contains(t_bb)):
+                    if inside:
                         # append those tracks which are inside bounding box and on sheet nets (including common)
                         if t.GetNetname() in nets_on_sheet:
                             tracks_for_replication.append(t)
@@ -1323,39 +2163,29 @@ class Replicator:
                         # those which are on other nets, append only if they are in group and if the user wants to
                         else:
                             if settings.group_items and t.GetNetname() in nets_on_sheet:
-                                if t.GetParentGroup():
-                                    if self.src_anchor_fp_group == t.GetParentGroup().GetName():
-                                        tracks_for_replication.append(t)
+                                if self.is_in_anchor_group(t):
+                                    tracks_for_replication.append(t)
         return tracks_for_replication
 
-    def get_zones_for_replication(self, level, bounding_box, settings):
+    def get_zones_for_replication(self, level, region, settings):
         zones_for_replication = []
-        # get all zones
-        all_zones = []
-        for zone_id in range(self.board.GetAreaCount()):
-            all_zones.append(self.board.GetArea(zone_id))
-
-        src_fps = self.get_footprints_on_sheet(level)
-        nets_on_sheet = self.get_nets_from_footprints(src_fps)
-        fp_not_on_sheet = self.get_footprints_not_on_sheet(level)
-        other_nets = self.get_nets_from_footprints(fp_not_on_sheet)
-        nets_exclusively_on_sheet = [net for net in nets_on_sheet if net not in other_nets]
-        common_nets_on_sheet = [net for net in nets_on_sheet if net not in nets_exclusively_on_sheet]
+        nets_on_sheet, nets_exclusively_on_sheet = self.get_sheet_nets(level)
 
         if settings.group_only:
             # get all zones that are in the group and on sheet nets (including common)
-            for z in all_zones:
+            for z in self.get_anchor_group_items(pcbnew.ZONE):
                 if not z.IsLocked() or settings.rep_locked_zones:
-                    if z.GetParentGroup():
-                        if z.GetParentGroup().GetName() == self.src_anchor_fp_group:
-                            if z.GetNetname() in nets_on_sheet:
-                                zones_for_replication.append(z)
+                    if z.GetNetname() in nets_on_sheet:
+                        zones_for_replication.append(z)
         else:
-            for z in all_zones:
+            # get all zones
+            all_zones = []
+            for zone_id in range(self.board.GetAreaCount()):
+                all_zones.append(self.board.GetArea(zone_id))
+            in_region = self.get_items_in_region(all_zones, region, not settings.intersecting)
+            for z, inside in zip(all_zones, in_region):
                 if not z.IsLocked() or settings.rep_locked_zones:
-                    z_bb = z.GetBoundingBox()
-                    if (settings.intersecting and bounding_box.Intersects(z_bb)) or \
-                            (not settings.intersecting and bounding_box.Contains(z_bb)):
+                    if inside:
                         # append those zones which are inside bounding box and on sheet nets (including common)
                         if z.GetNetname() in nets_on_sheet or z.GetIsRuleArea():
                             zones_for_replication.append(z)
@@ -1367,137 +2197,151 @@ class Replicator:
                         # those which are on other nets, append only if they are in group and if the user wants to
                         else:
                             if settings.group_items and (z.GetNetname() in nets_on_sheet or z.GetIsRuleArea()):
-                                if z.GetParentGroup():
-                                    if self.src_anchor_fp_group == z.GetParentGroup().GetName():
-                                        zones_for_replication.append(z)
+                                if self.is_in_anchor_group(z):
+                                    zones_for_replication.append(z)
         return zones_for_replication
 
-    def get_text_for_replication(self, bounding_box, settings):
+    def get_text_for_replication(self, region, settings):
         text_items_for_replication = []
-        # get all drawings on PCB
-        text_items = []
-        for t_i in self.board.GetDrawings():
-            if isinstance(t_i, pcbnew.PCB_TEXT):
-                # text items are handled separately
-                text_items.append(t_i)
-
         # if group only
         if settings.group_only:
-            # get all drawings, and select only those belonging to group
-            for t_i in text_items:
-                if t_i.GetParentGroup():
-                    if self.src_anchor_fp_group == t_i.GetParentGroup().GetName():
-                        if not t_i.IsLocked() or settings.rep_locked_text:
-                            text_items_for_replication.append(t_i)
+            # select only the text items belonging to group
+            for t_i in self.get_anchor_group_items(pcbnew.PCB_TEXT):
+                if not t_i.IsLocked() or settings.rep_locked_text:
+                    text_items_for_replication.append(t_i)
         else:
-            for t_i in text_items:
-                t_i_bb = t_i.GetBoundingBox()
+            # get all drawings on PCB
+            text_items = []
+            for t_i in self.board.GetDrawings():
+                if isinstance(t_i, pcbnew.PCB_TEXT):
+                    # text items are handled separately
+                    text_items.append(t_i)
+            in_region = self.get_items_in_region(text_items, region, not settings.intersecting)
+            for t_i, inside in zip(text_items, in_region):
                 if settings.intersecting:
                     # append those drawings which are inside bounding box
-                    if bounding_box.Intersects(t_i_bb):
+                    if inside:
                         if not t_i.IsLocked() or settings.rep_locked_text:
                             text_items_for_replication.append(t_i)
                     # append outside drawings append only if required
                     else:
                         if settings.group_items:
-                            if t_i.GetParentGroup():
-                                if self.src_anchor_fp_group == t_i.GetParentGroup().GetName():
-                                    if not t_i.IsLocked() or settings.rep_locked_drawings:
-                                        text_items_for_replication.append(t_i)
+                            if self.is_in_anchor_group(t_i):
+                                if not t_i.IsLocked() or settings.rep_locked_drawings:
+                                    text_items_for_replication.append(t_i)
                 else:
-                    if bounding_box.Contains(t_i_bb):
+                    if inside:
                         if not t_i.IsLocked() or settings.rep_locked_drawings:
                             text_items_for_replication.append(t_i)
                     else:
                         if settings.group_items:
-                            if t_i.GetParentGroup():
-                                if self.src_anchor_fp_group == t_i.GetParentGroup().GetName():
-                                    if not t_i.IsLocked() or settings.rep_locked_drawings:
-                                        text_items_for_replication.append(t_i)
+                            if self.is_in_anchor_group(t_i):
+                                if not t_i.IsLocked() or settings.rep_locked_drawings:
+                                    text_items_for_replication.append(t_i)
         return text_items_for_replication
 
-    def get_drawings_for_replication(self, bounding_box, settings):
+    def get_drawings_for_replication(self, region, settings):
         drawings_for_replication = []
-        # get all drawings on PCB
-        drawings = []
-        for d in self.board.GetDrawings():
-            if not isinstance(d, pcbnew.PCB_TEXT):
-                # text items are handled separately
-                drawings.append(d)
-
         # if group only
         if settings.group_only:
-            # get all drawings, and select only those belonging to group
-            for d in drawings:
-                if d.GetParentGroup():
-                    if self.src_anchor_fp_group == d.GetParentGroup().GetName():
-                        if not d.IsLocked() or settings.rep_locked_drawings:
-                            drawings_for_replication.append(d)
+            # select only the drawings belonging to group, text items are handled separately
+            for d in self.get_anchor_group_items(pcbnew.BOARD_ITEM, NON_DRAWING_TYPES):
+                if not d.IsLocked() or settings.rep_locked_drawings:
+                    drawings_for_replication.append(d)
         else:
-            for d in drawings:
-                d_bb = d.GetBoundingBox()
+            # get all drawings on PCB
+            drawings = []
+            for d in self.board.GetDrawings():
+                if not isinstance(d, pcbnew.PCB_TEXT) and not self.is_room(d):
+                    # text items are handled separately, rooms are only used for selection
+                    drawings.append(d)
+            in_region = self.get_items_in_region(drawings, region, not settings.intersecting)
+            for d, inside in zip(drawings, in_region):
                 if settings.intersecting:
                     # append those drawings which are inside bounding box
-                    if bounding_box.Intersects(d_bb):
+                    if inside:
                         if not d.IsLocked() or settings.rep_locked_drawings:
                             drawings_for_replication.append(d)
                     # append outside drawings append only if required
                     else:
                         if settings.group_items:
-                            if d.GetParentGroup():
-                                if self.src_anchor_fp_group == d.GetParentGroup().GetName():
-                                    if not d.IsLocked() or settings.rep_locked_drawings:
-                                        drawings_for_replication.append(d)
+                            if self.is_in_anchor_group(d):
+                                if not d.IsLocked() or settings.rep_locked_drawings:
+                                    drawings_for_replication.append(d)
                 else:
-                    if bounding_box.Contains(d_bb):
+                    if inside:
                         if not d.IsLocked() or settings.rep_locked_drawings:
                             drawings_for_replication.append(d)
                     else:
                         if settings.group_items:
-                            if d.GetParentGroup():
-                                if self.src_anchor_fp_group == d.GetParentGroup().GetName():
-                                    if not d.IsLocked() or settings.rep_locked_drawings:
-                                        drawings_for_replication.append(d)
+                            if self.is_in_anchor_group(d):
+                                if not d.IsLocked() or settings.rep_locked_drawings:
+                                    drawings_for_replication.append(d)
         return drawings_for_replication
 
+    def get_highlight_selection(self, level, settings):
+        """ footprints and items which would be replicated, by KIID. Cached per level and selection settings """
+        key = (tuple(level), tuple(getattr(settings, x) for x in HIGHLIGHT_SETTINGS))
+        if key in self.highlight_cache:
+            return self.highlight_cache[key]
+        self.index_groups()
+        # find level room or bounding box
+        region = self.get_sheet_region(level)
+
+        fps = self.get_footprints_for_replication(level, region, settings)
+        items = []
+        if settings.rep_tracks:
+            items.extend(self.get_tracks_for_replication(level, region, settings))
+        if settings.rep_zones:
+            items.extend(self.get_zones_for_replication(level, region, settings))
+        if settings.rep_text:
+            items.extend(self.get_text_for_replication(region, settings))
+        if settings.rep_drawings:
+            items.extend(self.get_drawings_for_replication(region, settings))
+
+        selection = ({fp.fp.m_Uuid.AsString(): fp for fp in fps},
+                     {item.m_Uuid.AsString(): item for item in items})
+        self.highlight_cache[key] = selection
+        return selection
+
     def highlight_set_level(self, level, settings):
-        logger.info(f"Level selected: {repr(level)}")
-        # find level bounding box
-        src_fps = self.get_footprints_on_sheet(level)
-        fps_bb = self.get_footprints_bounding_box(src_fps)
+        logger.info("Level selected: %r", level)
+        (fps, items) = self.get_highlight_selection(level, settings)
 
         # set highlight on all the footprints
-        fps = self.get_footprints_for_replication(level, fps_bb, settings)
-        for fp in fps:
+        for fp in fps.values():
             self.fp_set_highlight(fp.fp)
 
         # set highlight on other items
-        highlighted_items = []
-        if settings.rep_tracks:
-            tracks = self.get_tracks_for_replication(level, fps_bb, settings)
-            for t in tracks:
-                t.SetBrightened()
-                highlighted_items.append(t)
-
-        if settings.rep_zones:
-            zones = self.get_zones_for_replication(level, fps_bb, settings)
-            for z in zones:
-                z.SetBrightened()
-                highlighted_items.append(z)
-
-        if settings.rep_text:
-            text_items = self.get_text_for_replication(fps_bb, settings)
-            for t in text_items:
-                t.SetBrightened()
-                highlighted_items.append(t)
-
-        if settings.rep_drawings:
-            drawings = self.get_drawings_for_replication(fps_bb, settings)
-            for d in drawings:
-                d.SetBrightened()
-                highlighted_items.append(d)
+        for item in items.values():
+            item.SetBrightened()
 
-        return fps, highlighted_items
+        self.highlighted = (fps, items)
+        return list(fps.values()), list(items.values())
+
+    def highlight_change_level(self, level, settings):
+        """
+        move the highlight from the currently highlighted items to the ones on the level,
+        only the items which are not in both selections are touched. Returns also if anything changed
+        """
+        logger.info("Level selected: %r", level)
+        (old_fps, old_items) = self.highlighted
+        (fps, items) = self.get_highlight_selection(level, settings)
+
+        for kiid in old_fps.keys() - fps.keys():
+            self.fp_clear_highlight(old_fps[kiid].fp)
+        for kiid in old_items.keys() - items.keys():
+            old_items[kiid].ClearBrightened()
+        added_fps = fps.keys() - old_fps.keys()
+        for kiid in added_fps:
+            self.fp_set_highlight(fps[kiid].fp)
+        added_items = items.keys() - old_items.keys()
+        for kiid in added_items:
+            items[kiid].SetBrightened()
+
+        changed = bool(added_fps or added_items or old_fps.keys() - fps.keys() or old_items.keys() - items.keys())
+        self.highlighted = (fps, items)
+        return list(fps.values()), list(items.values()), changed
 
     def highlight_clear_level(self, fps, items):
         # set highlight on all the footprints
@@ -1507,6 +2351,7 @@ class Replicator:
         # set highlight on other items
         for item in items:
             item.ClearBrightened()
+        self.highlighted = ({}, {})
 
     @staticmethod
     def fp_set_highlight(fp):
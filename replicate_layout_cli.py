@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#  replicate_layout_cli.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+"""
+Replicate layout without the GUI, e.g.:
+python replicate_layout_cli.py board.kicad_pcb --anchor Q301 --level 1 --sheets 0 2 --remove
+or with several anchors and levels described in a job file (see replication_jobs.py):
+python replicate_layout_cli.py --jobs jobs.json
+and several boards in parallel, one job file per board:
+python replicate_layout_cli.py --jobs variant_a.json variant_b.json --workers 4
+or save the layout of a sheet as a template and apply it to the same sheet on another board:
+python replicate_layout_cli.py board.kicad_pcb --anchor Q301 --level 1 --export-template leg_template.json.gz
+python replicate_layout_cli.py other_board.kicad_pcb --apply-template leg_template.json.gz
+Run it as a script, importing it through the plugin package would import wx.
+"""
+import pcbnew
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+try:
+    from .replicate_layout import Replicator, Settings, report_to_string
+    from .replication_logging import start_logging, stop_logging
+    from .replication_jobs import load_job_file
+    from .replication_batch import run_batch, batch_report_to_string
+    from .replication_profiling import enable_profiling, PROFILE_FILENAME, PROFILE_SUMMARY_FILENAME
+    from .replication_stats import MEMORY_VARIABLE
+    from .replication_templates import export_template, save_template, load_template, apply_template, \
+        template_to_string
+except:
+    from replicate_layout import Replicator, Settings, report_to_string
+    from replication_logging import start_logging, stop_logging
+    from replication_jobs import load_job_file
+    from replication_batch import run_batch, batch_report_to_string
+    from replication_profiling import enable_profiling, PROFILE_FILENAME, PROFILE_SUMMARY_FILENAME
+    from replication_stats import MEMORY_VARIABLE
+    from replication_templates import export_template, save_template, load_template, apply_template, \
+        template_to_string
+
+logger = logging.getLogger(__name__)
+
+
+def no_progress(stage, percentage, message=None):
+    pass
+
+
+def print_progress(stage, percentage, message=None):
+    if message is not None:
+        print(f"{percentage * 100:5.1f} % {message}", file=sys.stderr)
+
+
+def replicate_board(board, anchor, level, sheets, settings, rm_duplicates, dry_run=False, update_func=no_progress):
+    """ replicate layout of loaded board, returns the replicator and replication report """
+    replicator = Replicator(board, anchor, update_func)
+    src_anchor_fp = replicator.src_anchor_fp
+    sheet_list = replicator.get_sheets_on_level(src_anchor_fp, level)
+    dst_sheets = replicator.select_sheets(sheet_list, sheets)
+    report = replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:level + 1], dst_sheets,
+                                         settings, rm_duplicates, dry_run)
+    return replicator, report
+
+
+def export_board_template(board, anchor, level, settings, update_func=no_progress):
+    """ template of the layout of the anchor footprint sheet on the level """
+    replicator = Replicator(board, anchor, update_func)
+    src_anchor_fp = replicator.src_anchor_fp
+    # also checks that the level exists
+    replicator.get_sheets_on_level(src_anchor_fp, level)
+    return export_template(replicator, src_anchor_fp.sheet_id[0:level + 1], settings)
+
+
+def replicate_board_jobs(board, jobs, update_func=no_progress):
+    """ run all the jobs on loaded board, returns the replicator and the list of reports """
+    replicator = Replicator(board, jobs[0].anchor, update_func)
+    reports = replicator.replicate_jobs(jobs)
+    return replicator, reports
+
+
+def run_batch_files(job_filenames, max_workers=None, verbose=False):
+    """ replicate the boards of the job files in parallel, returns 0 only if all of them succeeded """
+    tasks = []
+    try:
+        for job_filename in job_filenames:
+            board_filename, output_filename, jobs = load_job_file(job_filename)
+            if board_filename is None:
+                raise LookupError(f"Board is not given in the job file {job_filename}")
+            tasks.append((board_filename, output_filename or board_filename, jobs))
+    except LookupError as exception:
+        print(f"Error: {exception}", file=sys.stderr)
+        return 1
+
+    def print_done(result):
+        if verbose:
+            print(f"{'done' if result['ok'] else 'failed'}: {result['board']}", file=sys.stderr)
+
+    start_time = time.perf_counter()
+    results = run_batch(tasks, max_workers, print_done)
+    print(batch_report_to_string(results, time.perf_counter() - start_time))
+    return 0 if all(result['ok'] for result in results) else 1
+
+
+def add_settings_arguments(parser):
+    """ every Settings flag can be set with --flag or --no-flag """
+    group = parser.add_argument_group("replication settings")
+    for field in Settings._fields:
+        default = Settings._field_defaults[field]
+        group.add_argument("--" + field.replace("_", "-"), dest=field, default=default,
+                           action=argparse.BooleanOptionalAction,
+                           help=f"(default: {default})")
+
+
+def get_settings(args):
+    return Settings(**{field: getattr(args, field) for field in Settings._fields})
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Replicate layout of a hierarchical sheet without the GUI")
+    parser.add_argument("board", nargs="?", help="board file (.kicad_pcb), can be given in the job file")
+    parser.add_argument("-a", "--anchor", help="reference of the source anchor footprint")
+    parser.add_argument("-j", "--jobs", nargs="+",
+                        help="JSON job file with several anchors and levels to replicate, "
+                             "several job files (boards) are replicated in parallel")
+    parser.add_argument("--workers", type=int,
+                        help="maximum number of boards replicated at the same time (default: number of CPUs)")
+    parser.add_argument("-l", "--level", type=int, default=0,
+                        help="hierarchical level to replicate, 0 is the topmost sheet (default: 0)")
+    parser.add_argument("-s", "--sheets", nargs="*",
+                        help="destination sheets, by index or by path (e.g. \"Full Bridge1/Leg+\"), default is all")
+    parser.add_argument("-o", "--output", help="where to save the board (default: overwrite the input)")
+    parser.add_argument("--list-sheets", action="store_true", help="only list the sheets which can be replicated")
+    parser.add_argument("--export-template", metavar="FILE",
+                        help="save the layout of the anchor footprint sheet as a template, the board is not modified")
+    parser.add_argument("--apply-template", metavar="FILE",
+                        help="apply the template to the instances of its sheet on the board (--sheets selects them)")
+    parser.add_argument("--remove-duplicates", action="store_true", help="remove duplicated tracks and zones")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be replicated")
+    parser.add_argument("--stats", help="save replication statistics (JSON) to this file")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"profile the replication, writes {PROFILE_FILENAME} and {PROFILE_SUMMARY_FILENAME}")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="report peak memory of each stage (slows the replication down)")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="show progress, -vv also logs to stderr")
+    add_settings_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.jobs is None and (args.board is None or (args.anchor is None and args.apply_template is None)):
+        parser.error("the board and --anchor are required, unless a job file or a template to apply is given")
+    if args.jobs is not None and (args.export_template or args.apply_template):
+        parser.error("templates can not be used with job files")
+    if args.dry_run and args.apply_template:
+        parser.error("--dry-run can not be used with --apply-template")
+    if args.list_sheets and args.jobs is None and args.anchor is None:
+        parser.error("--list-sheets requires --anchor")
+    if args.verbose > 1:
+        start_logging([logging.StreamHandler(sys.stderr)], logging.INFO)
+    else:
+        start_logging([logging.StreamHandler(sys.stderr)], logging.WARNING)
+    update_func = print_progress if args.verbose else no_progress
+    if args.profile:
+        enable_profiling()
+    if args.trace_memory:
+        # also for the batch worker processes
+        os.environ[MEMORY_VARIABLE] = "1"
+
+    if args.jobs is not None and len(args.jobs) > 1:
+        try:
+            return run_batch_files(args.jobs, args.workers, args.verbose)
+        finally:
+            stop_logging()
+
+    try:
+        if args.jobs is not None:
+            board_filename, output_filename, jobs = load_job_file(args.jobs[0])
+            # command line takes precedence over the job file
+            board_filename = args.board or board_filename
+            output_filename = args.output or output_filename or board_filename
+            if board_filename is None:
+                raise LookupError("Board is neither given on the command line nor in the job file")
+            dry_run = all(job.dry_run for job in jobs)
+        else:
+            board_filename = args.board
+            output_filename = args.output or args.board
+            dry_run = args.dry_run
+        board = pcbnew.LoadBoard(board_filename)
+        if args.list_sheets:
+            replicator = Replicator(board, args.anchor or jobs[0].anchor, update_func)
+            src_anchor_fp = replicator.src_anchor_fp
+            for level in range(len(src_anchor_fp.filename)):
+                print(f"level {level}: {src_anchor_fp.filename[level]}")
+                for index, sheet in enumerate(replicator.get_sheets_on_level(src_anchor_fp, level)):
+                    print(f"    {index}: {'/'.join(sheet)}")
+            return 0
+        if args.export_template:
+            template = export_board_template(board, args.anchor, args.level, get_settings(args), update_func)
+            save_template(template, args.export_template)
+            print(template_to_string(template))
+            return 0
+        if args.jobs is not None:
+            replicator, reports = replicate_board_jobs(board, jobs, update_func)
+        elif args.apply_template:
+            replicator, report = apply_template(board, load_template(args.apply_template), args.sheets,
+                                                get_settings(args), update_func)
+            reports = [report]
+        else:
+            replicator, report = replicate_board(board, args.anchor, args.level, args.sheets, get_settings(args),
+                                                 args.remove_duplicates, args.dry_run, update_func)
+            reports = [report]
+        if not dry_run:
+            pcbnew.SaveBoard(output_filename, board)
+        if args.stats:
+            if args.jobs is not None:
+                with open(args.stats, 'w', encoding='utf-8') as f:
+                    json.dump([stats.as_dict() for stats in replicator.job_stats], f, indent=4)
+            else:
+                replicator.stats.save(args.stats)
+    except LookupError as exception:
+        print(f"Error: {exception}", file=sys.stderr)
+        return 1
+    finally:
+        stop_logging()
+
+    for report in reports:
+        print(report_to_string(report))
+    if replicator.connectivity_issues:
+        print("Make sure that you check the connectivity around:")
+        for item in sorted(replicator.connectivity_issues):
+            print(f"    Footprint {item[0]}, pad {item[1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#  replication_batch.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+import pcbnew
+import os
+import time
+import logging
+import traceback
+import multiprocessing
+import concurrent.futures
+try:
+    from .replicate_layout import Replicator
+except:
+    from replicate_layout import Replicator
+
+logger = logging.getLogger(__name__)
+
+# each worker holds a whole board in memory
+MAX_WORKERS = 8
+
+
+def no_progress(stage, percentage, message=None):
+    pass
+
+
+def replicate_file(board_filename, output_filename, jobs, update_func=no_progress):
+    """
+    load the board, run the jobs on it and save it (unless all the jobs are dry runs).
+    Returns a picklable result, errors are reported in it instead of being raised
+    """
+    result = {'board': board_filename,
+              'output': output_filename,
+              'ok': False,
+              'error': None,
+              'time': 0.0,
+              'reports': [],
+              'connectivity_issues': []}
+    start_time = time.perf_counter()
+    try:
+        board = pcbnew.LoadBoard(board_filename)
+        replicator = Replicator(board, jobs[0].anchor, update_func)
+        result['reports'] = replicator.replicate_jobs(jobs)
+        result['connectivity_issues'] = sorted(replicator.connectivity_issues)
+        if not all(job.dry_run for job in jobs):
+            pcbnew.SaveBoard(output_filename, board)
+        result['ok'] = not any(report['cancelled'] for report in result['reports'])
+    except LookupError as exception:
+        result['error'] = str(exception)
+    except Exception:
+        result['error'] = traceback.format_exc()
+    result['time'] = time.perf_counter() - start_time
+    return result
+
+
+def get_nr_workers(nr_boards, max_workers=None):
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, MAX_WORKERS)
+    return max(1, min(max_workers, nr_boards))
+
+
+def run_batch(tasks, max_workers=None, done_func=None):
+    """
+    replicate several boards in parallel, one board per worker process.
+    tasks is a list of (board_filename, output_filename, jobs), results are returned in the same order
+    """
+    if not tasks:
+        return []
+    nr_workers = get_nr_workers(len(tasks), max_workers)
+    logger.info("Replicating %d boards with %d workers", len(tasks), nr_workers)
+    results = [None] * len(tasks)
+    # pcbnew does not survive a fork, every worker starts with a fresh interpreter
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=nr_workers, mp_context=context) as executor:
+        futures = {executor.submit(replicate_file, *task): index for index, task in enumerate(tasks)}
+        for future in concurrent.futures.as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception:
+                # worker process died
+                results[index] = {'board': tasks[index][0], 'output': tasks[index][1], 'ok': False,
+                                  'error': traceback.format_exc(), 'time': 0.0, 'reports': [],
+                                  'connectivity_issues': []}
+            logger.info("Board %s finished in %.2f s", results[index]['board'], results[index]['time'])
+            if done_func is not None:
+                done_func(results[index])
+    return results
+
+
+def batch_report_to_string(results, wall_time=None):
+    """ aggregated timing and failures of the batch """
+    lines = ["Batch report"]
+    stage_times = {}
+    for result in results:
+        status = "ok" if result['ok'] else "FAILED"
+        lines.append(f"{result['board']}: {status} in {result['time']:.2f} s")
+        if result['error']:
+            lines.extend("    " + line for line in result['error'].strip().splitlines())
+        if result['connectivity_issues']:
+            lines.append(f"    {len(result['connectivity_issues'])} connectivity issues")
+        for job_report in result['reports']:
+            for stage, duration in job_report['stages'].items():
+                stage_times[stage] = stage_times.get(stage, 0.0) + duration
+    nr_failed = len([result for result in results if not result['ok']])
+    lines.append(f"{len(results) - nr_failed} of {len(results)} boards replicated, {nr_failed} failed")
+    lines.append(f"Total board time: {sum(result['time'] for result in results):.2f} s")
+    if wall_time is not None:
+        lines.append(f"Wall time: {wall_time:.2f} s")
+    if stage_times:
+        lines.append("Total stage timings:")
+        for stage, duration in stage_times.items():
+            lines.append(f"    {stage}: {duration:.3f} s")
+    return "\n".join(lines)
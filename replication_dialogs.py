@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+#  replication_dialogs.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+import wx
+import pcbnew
+import os
+from .replicate_layout_GUI import ReplicateLayoutGUI
+from .error_dialog_GUI import ErrorDialogGUI
+from .conn_issue_GUI import ConnIssueGUI
+from .replicate_layout import Settings
+from .replicate_layout import report_to_string
+from .replication_stats import STATS_FILENAME
+from .replication_logging import stop_logging
+from .replication_lists import ListModel
+
+
+class VirtualListCtrl(wx.ListCtrl):
+    """ report list control showing the rows of a ListModel, the control itself does not hold any data """
+    def __init__(self, parent, model, columns, style=wx.LC_REPORT):
+        super(VirtualListCtrl, self).__init__(parent, style=style | wx.LC_REPORT | wx.LC_VIRTUAL)
+        self.model = model
+        for index, (name, width) in enumerate(columns):
+            self.InsertColumn(index, name, width=width)
+        self.Bind(wx.EVT_LIST_COL_CLICK, self.on_column_click)
+        self.refresh_items()
+
+    @classmethod
+    def replace(cls, placeholder, model, columns):
+        """ wxFormBuilder can not generate virtual list controls, so the generated one is swapped for it """
+        virtual_list = cls(placeholder.GetParent(), model, columns, placeholder.GetWindowStyleFlag())
+        virtual_list.SetMinSize(placeholder.GetMinSize())
+        placeholder.GetContainingSizer().Replace(placeholder, virtual_list)
+        placeholder.Destroy()
+        virtual_list.GetParent().Layout()
+        return virtual_list
+
+    def OnGetItemText(self, item, column):
+        return self.model.get_text(item, column)
+
+    def refresh_items(self):
+        self.SetItemCount(len(self.model))
+        self.Refresh()
+
+    def on_column_click(self, event):
+        selected = self.get_selected_rows()
+        self.model.sort(event.GetColumn())
+        self.refresh_items()
+        self.select_rows(selected)
+
+    def get_selected_rows(self):
+        rows = []
+        item = self.GetFirstSelected()
+        while item != -1:
+            rows.append(self.model.get_row_index(item))
+            item = self.GetNextSelected(item)
+        return rows
+
+    def select_rows(self, rows):
+        # item -1 stands for all the items
+        self.SetItemState(-1, 0, wx.LIST_STATE_SELECTED)
+        for item in self.model.get_view_indices(rows):
+            self.SetItemState(item, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
+
+    def select_all(self):
+        self.SetItemState(-1, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
+
+
+class ConnIssueDialog(ConnIssueGUI):
+    def SetSizeHints(self, sz1, sz2):
+        # DO NOTHING
+        pass
+
+    def __init__(self, parent, replicator):
+        super(ConnIssueDialog, self).__init__(parent)
+
+        self.model = ListModel(sorted(replicator.connectivity_issues))
+        self.list = VirtualListCtrl.replace(self.list, self.model, [('Footprint', 100), ('Pad', 100)])
+
+    def filter_changed(self, event):
+        self.model.set_filter(self.text_filter.GetValue())
+        self.list.refresh_items()
+        event.Skip()
+
+
+class ErrorDialog(ErrorDialogGUI):
+    def SetSizeHints(self, sz1, sz2):
+        # DO NOTHING
+        pass
+
+    def __init__(self, parent):
+        super(ErrorDialog, self).__init__(parent)
+
+
+class ReplicateLayoutDialog(ReplicateLayoutGUI):
+    def SetSizeHints(self, sz1, sz2):
+        # DO NOTHING
+        pass
+
+    def __init__(self, parent, replicator, fp_ref, logger):
+        super(ReplicateLayoutDialog, self).__init__(parent)
+
+        self.logger = logger
+
+        self.replicator = replicator
+        self.src_anchor_fp = self.replicator.get_fp_by_ref(fp_ref)
+        self.levels = self.src_anchor_fp.filename
+
+        # clear levels
+        self.list_levels.Clear()
+        self.list_levels.AppendItems(self.levels)
+
+        self.sheet_selection = None
+        self.sheet_model = ListModel()
+        self.list_sheets = VirtualListCtrl.replace(self.list_sheets, self.sheet_model, [('Sheet (anchor)', 220)])
+
+        self.src_footprints = []
+        self.hl_fps = []
+        self.hl_items = []
+
+        # sheets of the selected level, reused when replicating
+        self.level_data = None
+
+        # select the bottom most level
+        nr_levels = self.list_levels.GetCount()
+        self.list_levels.SetSelection(nr_levels - 1)
+        self.level_changed(None)
+
+    def __del__(self):
+        self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
+
+    def group_layout_changed( self, event ):
+        # when enabled, they should be checked by default
+        if self.chkbox_group_layouts.GetValue():
+            self.chkbox_group_footprints.Enable(True)
+            self.chkbox_group_footprints.SetValue(True)
+            self.chkbox_group_tracks.Enable(True)
+            self.chkbox_group_tracks.SetValue(True)
+            self.chkbox_group_zones.Enable(True)
+            self.chkbox_group_zones.SetValue(True)
+            self.chkbox_group_text.Enable(True)
+            self.chkbox_group_text.SetValue(True)
+            self.chkbox_group_drawings.Enable(True)
+            self.chkbox_group_drawings.SetValue(True)
+        else:
+            self.chkbox_group_footprints.Disable()
+            self.chkbox_group_footprints.SetValue(False)
+            self.chkbox_group_tracks.Disable()
+            self.chkbox_group_tracks.SetValue(False)
+            self.chkbox_group_zones.Disable()
+            self.chkbox_group_zones.SetValue(False)
+            self.chkbox_group_text.Disable()
+            self.chkbox_group_text.SetValue(False)
+            self.chkbox_group_drawings.Disable()
+            self.chkbox_group_drawings.SetValue(False)
+        if event is not None:
+            event.Skip()
+
+    def get_settings(self):
+        return Settings(rep_tracks=self.chkbox_tracks.GetValue(), rep_zones=self.chkbox_zones.GetValue(),
+                        rep_text=self.chkbox_text.GetValue(), rep_drawings=self.chkbox_drawings.GetValue(),
+                        group_layouts=self.chkbox_group_layouts.GetValue(), group_footprints=self.chkbox_group_footprints.GetValue(),
+                        group_tracks=self.chkbox_group_tracks.GetValue(), group_zones=self.chkbox_group_zones.GetValue(),
+                        group_text=self.chkbox_group_text.GetValue(), group_drawings=self.chkbox_group_drawings.GetValue(),
+                        rep_locked_tracks=self.chkbox_locked_tracks.GetValue(), rep_locked_zones=self.chkbox_locked_zones.GetValue(),
+                        rep_locked_text=self.chkbox_locked_text.GetValue(), rep_locked_drawings=self.chkbox_locked_drawings.GetValue(),
+                        intersecting=self.chkbox_intersecting.GetValue(), group_items=self.chkbox_include_group_items.GetValue(),
+                        group_only=self.chkbox_group.GetValue(), locked_fps=self.chkbox_locked.GetValue(),
+                        remove=self.chkbox_remove.GetValue(), incremental=self.chkbox_incremental.GetValue(),
+                        update=self.chkbox_update.GetValue(), bounded_memory=self.chkbox_bounded_memory.GetValue())
+
+    def level_changed(self, event):
+        index = self.list_levels.GetSelection()
+
+        # show/hide checkbox
+        if self.chkbox_group.GetValue():
+            self.chkbox_include_group_items.Disable()
+            self.chkbox_include_group_items.SetValue(False)
+            self.chkbox_intersecting.Disable()
+        else:
+            self.chkbox_include_group_items.Enable(True)
+            self.chkbox_intersecting.Enable(True)
+            if self.chkbox_intersecting.GetValue():
+                self.chkbox_include_group_items.Enable(True)
+            else:
+                self.chkbox_include_group_items.Disable()
+                self.chkbox_include_group_items.SetValue(False)
+
+        # pcbnew API is not thread safe, so the selection can not be computed in the background.
+        # Levels which were already shown are quick, as the selection is cached
+        sheets, names = self.replicator.get_sheet_choices(self.src_anchor_fp, self.src_anchor_fp.sheet_id[index])
+        self.level_data = {'index': index, 'sheets': sheets}
+        # clear levels
+        self.sheet_selection = self.list_sheets.get_selected_rows()
+
+        self.sheet_model.set_rows([(name,) for name in names])
+        self.list_sheets.refresh_items()
+
+        # if none is selected, select all
+        if len(self.sheet_selection) == 0:
+            self.list_sheets.select_all()
+        else:
+            self.list_sheets.select_rows(self.sheet_selection)
+
+        # move the highlight to the footprints on selected level, only the changed items are touched
+        (self.hl_fps, self.hl_items, changed) = self.replicator.highlight_change_level(
+            self.src_anchor_fp.sheet_id[0:index + 1], self.get_settings())
+        if changed:
+            pcbnew.Refresh()
+
+        if event is not None:
+            event.Skip()
+
+    def on_ok(self, event):
+        # clear highlight on all footprints on selected level
+        # so that duplicated tracks don't remain selected
+        self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
+        self.hl_fps = []
+        self.hl_items = []
+
+        selection_indices = self.list_sheets.get_selected_rows()
+
+        # grab checkboxes
+        remove_existing_nets_zones = self.chkbox_remove.GetValue()
+        remove_duplicates = self.chkbox_remove_duplicates.GetValue()
+        dry_run = self.chkbox_dry_run.GetValue()
+        rep_locked = self.chkbox_locked.GetValue()
+        group_only = self.chkbox_group.GetValue()
+
+        # parse the settings
+        settings = self.get_settings()
+
+        level = self.list_levels.GetSelection()
+        # failsafe sometimes on my machine wx does not generate a listbox event
+        if self.level_data is not None and self.level_data['index'] == level:
+            sheets_on_a_level = self.level_data['sheets']
+        else:
+            sheets_on_a_level = self.replicator.get_sheets_to_replicate(self.src_anchor_fp,
+                                                                        self.src_anchor_fp.sheet_id[level])
+        dst_sheets = [sheets_on_a_level[i] for i in selection_indices]
+
+        # check if all the destination anchor footprints are on the same layer as source anchor footprint
+        # first get all the anchor footprints
+        all_dst_footprints = []
+        for sheet in dst_sheets:
+            all_dst_footprints.extend(self.replicator.get_footprints_on_sheet(sheet))
+        dst_anchor_footprints = [x for x in all_dst_footprints if x.fp_id == self.src_anchor_fp.fp_id]
+
+        # replicate now
+        self.logger.info("Replicating layout")
+
+        self.progress_dlg = wx.ProgressDialog("Preparing for replication", "Starting plugin", maximum=100,
+                                              style=wx.PD_APP_MODAL | wx.PD_AUTO_HIDE | wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME)
+        self.progress_dlg.Show()
+        self.progress_dlg.ToggleWindowStyle(wx.STAY_ON_TOP)
+        self.Hide()
+
+        try:
+            # update progress dialog
+            self.replicator.update_progress = self.update_progress
+            report = self.replicator.replicate_layout(self.src_anchor_fp, self.src_anchor_fp.sheet_id[0:level + 1],
+                                                      dst_sheets,
+                                                      settings, remove_duplicates, dry_run)
+
+            if dry_run:
+                self.logger.info("Dry run complete")
+                self.progress_dlg.Destroy()
+                caption = 'Replicate Layout - dry run'
+                dlg = wx.MessageDialog(self, report_to_string(report), caption, wx.OK | wx.ICON_INFORMATION)
+                dlg.ShowModal()
+                dlg.Destroy()
+                # return to the dialog so that the user can replicate for real
+                self.Show()
+                self.level_changed(None)
+                return
+
+            self.logger.info("Replication complete")
+            # keep the statistics next to the log, to track performance across plugin versions
+            self.replicator.stats.save(os.path.join(self.replicator.project_folder, STATS_FILENAME))
+
+            if self.replicator.connectivity_issues:
+                self.logger.info("Letting the user know there are some issues with replicated design")
+                report_string = ""
+                for item in self.replicator.connectivity_issues:
+                    report_string = report_string + f"Footprint {item[0]}, pad {item[1]}\n"
+                self.logger.info(f"Looks like the design has an exotic connectivity that the plugin might not"
+                                 f" handle properly\n "
+                                 f"Make sure that you check the connectivity around:\n" + report_string)
+                # show dialog
+                issue_dlg = ConnIssueDialog(self, self.replicator)
+                issue_dlg.ShowModal()
+                issue_dlg.Destroy()
+
+            # clear highlight on all footprints on selected level
+            self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
+            self.hl_fps = []
+            self.hl_items = []
+            pcbnew.Refresh()
+
+            stop_logging()
+            self.progress_dlg.Destroy()
+            if report['cancelled']:
+                caption = 'Replicate Layout'
+                message = "Replication was canceled. Already replicated items were kept, use Undo to revert them."
+                dlg = wx.MessageDialog(self, message, caption, wx.OK | wx.ICON_INFORMATION)
+                dlg.ShowModal()
+                dlg.Destroy()
+            event.Skip()
+            self.EndModal(True)
+        except LookupError as exception:
+            # clear highlight on all footprints on selected level
+            self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
+            self.hl_fps = []
+            self.hl_items = []
+            pcbnew.Refresh()
+
+            caption = 'Replicate Layout'
+            message = str(exception)
+            dlg = wx.MessageDialog(self, message, caption, wx.OK | wx.ICON_ERROR)
+            dlg.ShowModal()
+            dlg.Destroy()
+            stop_logging()
+            self.progress_dlg.Destroy()
+            event.Skip()
+            self.EndModal(False)
+            return
+        except Exception:
+            # clear highlight on all footprints on selected level
+            self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
+            self.hl_fps = []
+            self.hl_items = []
+            pcbnew.Refresh()
+
+            self.logger.exception("Fatal error when running Replicate layout plugin")
+            e_dlg = ErrorDialog(self)
+            e_dlg.ShowModal()
+            e_dlg.Destroy()
+            stop_logging()
+            self.progress_dlg.Destroy()
+            event.Skip()
+            self.Destroy()
+
+    def on_cancel(self, event):
+        # clear highlight on all footprints on selected level
+        self.replicator.highlight_clear_level(self.hl_fps, self.hl_items)
+        self.hl_fps = []
+        self.hl_items = []
+        pcbnew.Refresh()
+
+        self.logger.info("User canceled the dialog")
+        stop_logging()
+        event.Skip()
+
+        self.Destroy()
+
+    def update_progress(self, stage, percentage, message=None):
+        """ the replicator already throttles the calls. Returning False cancels the replication """
+        # at 100 % the dialog would close before zones are refilled
+        i = min(int(percentage * 100), 99)
+        keep_going, _ = self.progress_dlg.Update(i, message if message is not None else "")
+        return keep_going
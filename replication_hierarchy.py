@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#  replication_hierarchy.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+import logging
+from collections import Counter
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class SheetNode:
+    """ sheet instance in the schematics hierarchy, with the data of all the footprints in its subtree """
+    def __init__(self, name, filename, parent=None):
+        self.name = name
+        self.filename = filename
+        self.parent = parent
+        self.path = parent.path + [name] if parent is not None else []
+        self.children = {}
+        # (board index, footprint) of footprints placed directly on this sheet
+        self.footprints = []
+        # subtree data is computed on demand and cached
+        self.subtree_footprints = None
+        self.net_counts = None
+        self.fp_ids = None
+        self.bounding_box = None
+
+    def get_child(self, name, filename):
+        if name not in self.children:
+            self.children[name] = SheetNode(name, filename, self)
+        return self.children[name]
+
+    def get_indexed_footprints(self):
+        if self.subtree_footprints is None:
+            footprints = list(self.footprints)
+            for child in self.children.values():
+                footprints.extend(child.get_indexed_footprints())
+            # keep the board order, as with a flat list
+            footprints.sort(key=lambda x: x[0])
+            self.subtree_footprints = footprints
+        return self.subtree_footprints
+
+    def get_footprints(self):
+        return [fp for _, fp in self.get_indexed_footprints()]
+
+    def get_net_counts(self):
+        """ number of pads on each net in the subtree """
+        if self.net_counts is None:
+            net_counts = Counter()
+            for _, fp in self.footprints:
+                net_counts.update(pad.GetNetname() for pad in fp.fp.Pads())
+            for child in self.children.values():
+                net_counts.update(child.get_net_counts())
+            self.net_counts = net_counts
+        return self.net_counts
+
+    def get_fp_ids(self):
+        if self.fp_ids is None:
+            fp_ids = set(fp.fp_id for _, fp in self.footprints)
+            for child in self.children.values():
+                fp_ids.update(child.get_fp_ids())
+            self.fp_ids = fp_ids
+        return self.fp_ids
+
+    def get_bounding_box(self):
+        """ (left, top, right, bottom) of the footprints in the subtree, None if there are none """
+        if self.bounding_box is None:
+            boxes = [fp.fp.GetBoundingBox(False, False) for _, fp in self.footprints]
+            boxes = [(box.GetLeft(), box.GetTop(), box.GetRight(), box.GetBottom()) for box in boxes]
+            boxes.extend(child.get_bounding_box() for child in self.children.values())
+            boxes = [box for box in boxes if box is not None]
+            if not boxes:
+                return None
+            self.bounding_box = (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                                 max(box[2] for box in boxes), max(box[3] for box in boxes))
+        return self.bounding_box
+
+    def invalidate_bounding_box(self):
+        """ footprints in the subtree were moved, this changes the bounding boxes up to the root """
+        node = self
+        while node is not None:
+            node.bounding_box = None
+            node = node.parent
+        for child in self.children.values():
+            child.invalidate_subtree_bounding_box()
+
+    def invalidate_subtree_bounding_box(self):
+        self.bounding_box = None
+        for child in self.children.values():
+            child.invalidate_subtree_bounding_box()
+
+    def release(self):
+        """ drop the cached subtree data, it is recomputed when needed again """
+        self.subtree_footprints = None
+        self.net_counts = None
+        self.fp_ids = None
+        self.bounding_box = None
+
+
+class SheetHierarchy:
+    """
+    tree of sheet instances built from the footprint sheet paths. Questions about a sheet instance
+    are answered from its subtree, instead of scanning all the footprints on the board
+    """
+    def __init__(self, footprints):
+        self.root = SheetNode("", "")
+        self.nodes_by_file = defaultdict(list)
+        self.footprints_by_id = defaultdict(list)
+        for index, fp in enumerate(footprints):
+            self.footprints_by_id[fp.fp_id].append(fp)
+            node = self.root
+            # root level footprints have empty sheet path
+            for name, filename in zip(fp.sheet_id, fp.filename):
+                if name not in node.children:
+                    self.nodes_by_file[filename].append(node.get_child(name, filename))
+                node = node.children[name]
+            node.footprints.append((index, fp))
+        logger.info("Sheet hierarchy has %d sheet instances", sum(len(x) for x in self.nodes_by_file.values()))
+
+    def get_node(self, path):
+        node = self.root
+        for name in path:
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+    def get_instances(self, filename, fp_id):
+        """ instances of the sheet file which contain the footprint with fp_id """
+        return [node for node in self.nodes_by_file.get(filename, []) if fp_id in node.get_fp_ids()]
+
+    def get_exclusive_nets(self, node):
+        """ nets which are connected only to the pads in the subtree """
+        board_counts = self.root.get_net_counts()
+        return set(net for net, count in node.get_net_counts().items() if count == board_counts[net])
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#  replication_jobs.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+"""
+A job file describes several replications of one board, e.g.:
+{
+    "board": "board.kicad_pcb",
+    "output": "replicated.kicad_pcb",
+    "settings": {"rep_tracks": true, "remove": true},
+    "remove_duplicates": false,
+    "jobs": [
+        {"anchor": "Q301", "level": 1},
+        {"anchor": "R101", "level": 0, "sheets": ["Full Bridge2"], "settings": {"rep_zones": false}}
+    ]
+}
+Global settings are overridden per job, paths are relative to the job file.
+"""
+import os
+import json
+import logging
+from collections import namedtuple
+try:
+    from .replicate_layout import Settings
+except:
+    from replicate_layout import Settings
+
+logger = logging.getLogger(__name__)
+
+ReplicationJob = namedtuple('ReplicationJob', ['anchor', 'level', 'sheets', 'settings', 'rm_duplicates', 'dry_run'])
+
+JOB_FILE_KEYS = ('board', 'output', 'settings', 'remove_duplicates', 'dry_run', 'jobs')
+JOB_KEYS = ('anchor', 'level', 'sheets', 'settings', 'remove_duplicates', 'dry_run')
+
+
+def check_keys(data, allowed_keys, what):
+    if not isinstance(data, dict):
+        raise LookupError(f"{what} has to be an object")
+    unknown_keys = set(data) - set(allowed_keys)
+    if unknown_keys:
+        raise LookupError(f"Unknown keys in {what}: {sorted(unknown_keys)}, allowed are: {list(allowed_keys)}")
+
+
+def merge_settings(settings, overrides, what):
+    check_keys(overrides, Settings._fields, what)
+    return settings._replace(**overrides)
+
+
+def parse_jobs(data, base_dir=""):
+    """ returns board and output filename and the list of jobs """
+    check_keys(data, JOB_FILE_KEYS, "job file")
+    if not data.get('jobs'):
+        raise LookupError("Job file does not contain any jobs")
+    settings = merge_settings(Settings(), data.get('settings', {}), "settings")
+    rm_duplicates = data.get('remove_duplicates', False)
+    dry_run = data.get('dry_run', False)
+
+    jobs = []
+    for index, job_data in enumerate(data['jobs']):
+        what = f"job {index}"
+        check_keys(job_data, JOB_KEYS, what)
+        if 'anchor' not in job_data:
+            raise LookupError(f"Anchor footprint is missing in {what}")
+        jobs.append(ReplicationJob(anchor=job_data['anchor'],
+                                   level=job_data.get('level', 0),
+                                   sheets=job_data.get('sheets'),
+                                   settings=merge_settings(settings, job_data.get('settings', {}), what + " settings"),
+                                   rm_duplicates=job_data.get('remove_duplicates', rm_duplicates),
+                                   dry_run=job_data.get('dry_run', dry_run)))
+
+    board = data.get('board')
+    output = data.get('output')
+    if board is not None:
+        board = os.path.join(base_dir, board)
+    if output is not None:
+        output = os.path.join(base_dir, output)
+    return board, output, jobs
+
+
+def load_job_file(filename):
+    """ returns board and output filename (None if not given) and the list of jobs """
+    with open(filename) as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as error:
+            raise LookupError(f"Job file {filename} is not valid JSON: {error}")
+    logger.info("Loaded job file %s", filename)
+    return parse_jobs(data, os.path.dirname(os.path.abspath(filename)))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#  replication_lists.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+import re
+
+
+def natural_key(text):
+    """ so that R9 comes before R10 """
+    return [(0, int(x), "") if x.isdigit() else (1, 0, x.lower()) for x in re.split(r'(\d+)', text) if x]
+
+
+class ListModel:
+    """
+    rows shown by a virtual list control. The control only asks for the text of the visible cells,
+    sorting and filtering reorder the row indices and never touch the control
+    """
+    def __init__(self, rows=()):
+        self.rows = []
+        self.view = []
+        self.filter_text = ""
+        self.sort_column = None
+        self.sort_ascending = True
+        self.set_rows(rows)
+
+    def set_rows(self, rows):
+        self.rows = [tuple(str(x) for x in row) for row in rows]
+        self.update_view()
+
+    def set_filter(self, text):
+        self.filter_text = text.strip().lower()
+        self.update_view()
+
+    def sort(self, column, ascending=None):
+        """ sort by column, by default sorting by the same column again reverses the order """
+        if ascending is None:
+            ascending = not self.sort_ascending if column == self.sort_column else True
+        self.sort_column = column
+        self.sort_ascending = ascending
+        self.update_view()
+
+    def update_view(self):
+        view = range(len(self.rows))
+        if self.filter_text:
+            view = [i for i in view if any(self.filter_text in x.lower() for x in self.rows[i])]
+        if self.sort_column is not None:
+            view = sorted(view, key=lambda i: natural_key(self.rows[i][self.sort_column]),
+                          reverse=not self.sort_ascending)
+        self.view = list(view)
+
+    def __len__(self):
+        return len(self.view)
+
+    def get_text(self, index, column):
+        return self.rows[self.view[index]][column]
+
+    def get_row_index(self, index):
+        """ index of the row in the data for the position in the list control """
+        return self.view[index]
+
+    def get_view_indices(self, row_indices):
+        """ positions in the list control of the rows, rows which are filtered out are skipped """
+        positions = {row: index for index, row in enumerate(self.view)}
+        return [positions[row] for row in row_indices if row in positions]
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#  replication_logging.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+import os
+import queue
+import atexit
+import logging
+import logging.handlers
+
+LOG_FILENAME = 'replicate_layout.log'
+LOG_FORMAT = '%(asctime)s %(name)s %(lineno)d:%(message)s'
+DATE_FORMAT = '%m-%d %H:%M:%S'
+# verbosity knob, e.g. DEBUG for per item details or WARNING for problems only
+LOG_LEVEL_VARIABLE = 'REPLICATE_LAYOUT_LOG_LEVEL'
+
+listener = None
+
+
+class MessageQueueHandler(logging.handlers.QueueHandler):
+    """ merges the message arguments in the calling thread, but leaves the formatting to the listener thread """
+    def prepare(self, record):
+        # exception text has to be rendered while the traceback is still available
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def get_log_level(default=logging.INFO):
+    """ log level from the environment variable, either a name or a number """
+    level = os.environ.get(LOG_LEVEL_VARIABLE, '').strip().upper()
+    if level.isdigit():
+        return int(level)
+    if isinstance(logging.getLevelName(level), int):
+        return logging.getLevelName(level)
+    return default
+
+
+def start_logging(handlers, level=None, background=True):
+    """
+    set up the root logger with given handlers. In background mode the records are only queued
+    and the handlers (formatting and file I/O) run in a separate thread
+    """
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+    # Remove all handlers associated with the root logger object.
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    if background:
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        handlers = [MessageQueueHandler(log_queue)]
+    for handler in handlers:
+        logging.root.addHandler(handler)
+    if level is None:
+        level = get_log_level()
+    logging.root.setLevel(level)
+
+
+def stop_logging():
+    """ write out all the queued records and close the log """
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+        # without the listener the queue would only grow
+        for handler in logging.root.handlers[:]:
+            if isinstance(handler, MessageQueueHandler):
+                logging.root.removeHandler(handler)
+    logging.shutdown()
+
+
+# queued records have to be written out before the interpreter exits, registered once per process
+atexit.register(stop_logging)
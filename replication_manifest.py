@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#  replication_manifest.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+import pcbnew
+import os
+import json
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 3
+
+# zone settings which are read and written through their Get and Set methods, the same ones as ZONE_SETTINGS copies
+ZONE_PROPERTIES = ('ZoneName', 'AssignedPriority', 'MinThickness', 'LocalClearance', 'PadConnection',
+                   'ThermalReliefGap', 'ThermalReliefSpokeWidth', 'FillMode', 'HatchThickness', 'HatchGap',
+                   'HatchSmoothingLevel', 'HatchSmoothingValue', 'HatchHoleMinArea', 'HatchBorderAlgorithm',
+                   'IslandRemovalMode', 'MinIslandArea', 'CornerSmoothingType', 'CornerRadius', 'HatchStyle',
+                   'BorderHatchPitch', 'IsRuleArea', 'DoNotAllowTracks', 'DoNotAllowVias', 'DoNotAllowPads',
+                   'DoNotAllowCopperPour', 'DoNotAllowFootprints')
+
+
+def point(position):
+    return position.x, position.y
+
+
+def get_item_properties(item):
+    """ get geometry and other properties of a board item which are relevant for replication, except the net """
+    properties = [item.GetClass(), [layer for layer in item.GetLayerSet().Seq()]]
+    if isinstance(item, pcbnew.PCB_VIA):
+        properties.extend([point(item.GetPosition()), item.GetWidth(), item.GetDrillValue(),
+                           item.TopLayer(), item.BottomLayer()])
+    elif isinstance(item, pcbnew.PCB_ARC):
+        properties.extend([point(item.GetStart()), point(item.GetMid()), point(item.GetEnd()), item.GetWidth()])
+    elif isinstance(item, pcbnew.PCB_TRACK):
+        properties.extend([point(item.GetStart()), point(item.GetEnd()), item.GetWidth()])
+    elif isinstance(item, pcbnew.ZONE):
+        properties.extend([point(item.GetCornerPosition(index)) for index in range(item.GetNumCorners())])
+        properties.extend(getattr(item, 'Get' + name)() for name in ZONE_PROPERTIES)
+        properties.append(item.GetHatchOrientation().AsDegrees())
+    elif isinstance(item, pcbnew.PCB_TEXT):
+        properties.extend([item.GetText(), point(item.GetTextPos()), item.GetTextAngleDegrees(),
+                           item.GetTextWidth(), item.GetTextHeight(), item.GetTextThickness(),
+                           item.IsItalic(), item.IsBold(), item.IsMirrored(), item.IsVisible(),
+                           item.GetHorizJustify(), item.GetVertJustify()])
+    else:
+        properties.extend([item.GetShape(), point(item.GetStart()), point(item.GetEnd()), item.GetWidth(),
+                           item.IsFilled()])
+        if item.GetShape() == pcbnew.SHAPE_T_ARC:
+            properties.append(point(item.GetArcMid()))
+        if item.GetShape() == pcbnew.SHAPE_T_POLY:
+            properties.extend([point(p) for p in item.GetPolyPoints()])
+    return properties
+
+
+def get_item_geometry_key(item):
+    """ key for matching existing destination items to the planned ones, net is not a part of it """
+    return repr(get_item_properties(item))
+
+
+def get_item_content(item):
+    """ everything the fingerprint of a board item depends on, read once per run """
+    properties = get_item_properties(item)
+    properties.append(item.IsLocked())
+    if isinstance(item, pcbnew.BOARD_CONNECTED_ITEM):
+        properties.append(item.GetNetname())
+    return repr(properties)
+
+
+def get_item_fingerprint(content, *extra):
+    """ content fingerprint of a board item, extra data (e.g. destination net) is hashed in as well """
+    return hashlib.sha1((content + repr(extra)).encode('utf-8')).hexdigest()
+
+
+class ReplicationManifest:
+    """
+    Persisted record of what was replicated, per (level, destination sheet).
+    For each replicated source item it keeps its content fingerprint
+    and the KIIDs of the destination items generated from it.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.sheets = {}
+        self.replicated_kiids = None
+        if os.path.exists(filename):
+            try:
+                with open(filename, encoding='utf-8') as f:
+                    contents = json.load(f)
+                if contents.get('version') == MANIFEST_VERSION:
+                    self.sheets = contents['sheets']
+                else:
+                    logger.info("Replication manifest " + filename + " has unsupported version, ignoring it")
+            except (ValueError, KeyError):
+                logger.info("Replication manifest " + filename + " could not be parsed, ignoring it")
+
+    @staticmethod
+    def get_key(level, sheet):
+        return "/".join(level) + "|" + "/".join(sheet)
+
+    def get_sheet_entry(self, level, sheet, transform):
+        """ get manifest entry for destination sheet. If the placement of anchors changed, all items are stale """
+        key = self.get_key(level, sheet)
+        entry = self.sheets.setdefault(key, {'transform': transform, 'items': {}})
+        if entry['transform'] != transform:
+            logger.info("Anchor placement changed for " + key + ", all items will be replicated again")
+            entry['transform'] = transform
+            for item in entry['items'].values():
+                item['fingerprint'] = None
+        return entry
+
+    def get_replicated_kiids(self):
+        """ KIIDs of all the destination items generated by replication """
+        if self.replicated_kiids is None:
+            self.replicated_kiids = set()
+            for entry in self.sheets.values():
+                for item in entry['items'].values():
+                    self.replicated_kiids.update(item['dst'])
+        return self.replicated_kiids
+
+    def save(self):
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'sheets': self.sheets}, f, separators=(',', ':'))
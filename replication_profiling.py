@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#  replication_profiling.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+import os
+import io
+import pstats
+import cProfile
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+
+# opt-in, e.g. REPLICATE_LAYOUT_PROFILE=1
+PROFILE_VARIABLE = 'REPLICATE_LAYOUT_PROFILE'
+# written next to the log, .prof can be opened with snakeviz or pstats
+PROFILE_FILENAME = 'replicate_layout.prof'
+PROFILE_SUMMARY_FILENAME = 'replicate_layout_profile.txt'
+# number of functions listed in the summary
+TOP_N = 40
+
+profiler = None
+depth = 0
+
+
+def is_profiling_requested():
+    return os.environ.get(PROFILE_VARIABLE, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def enable_profiling():
+    """ profile all the following replicator runs, regardless of the environment variable """
+    global profiler
+    if profiler is None:
+        profiler = cProfile.Profile()
+    return profiler
+
+
+def disable_profiling():
+    global profiler
+    profiler = None
+
+
+def get_summary(profile, top=TOP_N):
+    """ hot functions by cumulative and by own time """
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.strip_dirs()
+    stream.write("Sorted by cumulative time\n")
+    stats.sort_stats('cumulative').print_stats(top)
+    stream.write("Sorted by own time\n")
+    stats.sort_stats('tottime').print_stats(top)
+    return stream.getvalue()
+
+
+def save_profile(filename=PROFILE_FILENAME, summary_filename=PROFILE_SUMMARY_FILENAME):
+    """ data is accumulated over all the profiled calls so far """
+    if profiler is None:
+        return
+    profiler.dump_stats(filename)
+    with open(summary_filename, 'w', encoding='utf-8') as f:
+        f.write(get_summary(profiler))
+    logger.info("Saved profile to %s and %s", filename, summary_filename)
+
+
+def profiled(method):
+    """ run the method under the profiler, if profiling is enabled. Nested calls are profiled only once """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        global depth
+        if profiler is None and is_profiling_requested():
+            enable_profiling()
+        if profiler is None or depth:
+            return method(*args, **kwargs)
+        depth = depth + 1
+        try:
+            return profiler.runcall(method, *args, **kwargs)
+        finally:
+            depth = depth - 1
+            # save also if the replication failed, as such runs are the most interesting
+            save_profile()
+    return wrapper
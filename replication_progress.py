@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#  replication_progress.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+import time
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# the callback is called at most this often
+MIN_INTERVAL = 0.1
+# and the time is checked only every so many updates
+UPDATE_STEP = 16
+
+
+class ReplicationCancelled(Exception):
+    """ raised when the progress callback returns False """
+    pass
+
+
+class ProgressReporter:
+    """
+    Maps the progress within a stage to the overall progress, with stages weighted by their planned work.
+    Calls to the callback are throttled and carry an estimate of the remaining time.
+    The callback is called with (stage_number, overall_progress, message) and can return False to cancel.
+    """
+    def __init__(self, callback):
+        self.callback = callback
+        self.weights = {}
+        self.total_weight = 0
+        self.done_weight = 0
+        self.stage = None
+        self.message = ""
+        self.start_time = time.perf_counter()
+        self.last_time = None
+        self.nr_updates = 0
+        self.cancelled = False
+
+    def plan(self, weights, repeats=None):
+        """ set the planned work for each of the stages and how many times each stage is run (default once) """
+        if repeats is None:
+            repeats = {}
+        self.weights = weights
+        self.total_weight = sum(weight * repeats.get(stage, 1) for stage, weight in weights.items())
+        self.done_weight = 0
+        self.start_time = time.perf_counter()
+
+    def start_stage(self, name):
+        self.stage = name
+
+    def end_stage(self):
+        self.done_weight = self.done_weight + self.weights.get(self.stage, 0)
+        self.stage = None
+
+    def get_progress(self, fraction):
+        if not self.total_weight:
+            return 0.0
+        progress = (self.done_weight + min(fraction, 1.0) * self.weights.get(self.stage, 0)) / self.total_weight
+        return min(progress, 1.0)
+
+    def get_remaining_time(self, progress):
+        if progress < 0.01:
+            return None
+        elapsed = time.perf_counter() - self.start_time
+        return elapsed * (1 - progress) / progress
+
+    def update(self, stage_number, fraction, message=None):
+        """ report progress within current stage, a new message is always passed on """
+        if self.cancelled:
+            return
+        self.nr_updates = self.nr_updates + 1
+        if message is None:
+            if self.nr_updates % UPDATE_STEP:
+                return
+            if self.last_time is not None and time.perf_counter() - self.last_time < MIN_INTERVAL:
+                return
+        else:
+            self.message = message
+        self.last_time = time.perf_counter()
+
+        progress = self.get_progress(fraction)
+        remaining_time = self.get_remaining_time(progress)
+        if remaining_time is None:
+            text = self.message
+        else:
+            text = self.message + " (about %d s remaining)" % math.ceil(remaining_time)
+        if self.callback(stage_number, progress, text) is False:
+            logger.info("Replication canceled by the user at stage %s", self.stage)
+            self.cancelled = True
+            raise ReplicationCancelled()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#  replication_rooms.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+import bisect
+import logging
+
+logger = logging.getLogger(__name__)
+
+# closed polygons and rectangles on the user layer with this name define the replication rooms
+ROOM_LAYER_NAME = 'Replicate.Layout'
+
+
+def points_in_polygon(points, polygon):
+    """
+    even-odd rule for all the points at once. The points are sorted by y, so each polygon edge
+    is tested only against the points within its vertical span
+    """
+    inside = [False] * len(points)
+    order = sorted(range(len(points)), key=lambda i: points[i][1])
+    ys = [points[i][1] for i in order]
+    for index in range(len(polygon)):
+        x1, y1 = polygon[index - 1]
+        x2, y2 = polygon[index]
+        if y1 == y2:
+            continue
+        if y1 > y2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        slope = (x2 - x1) / (y2 - y1)
+        for i in order[bisect.bisect_left(ys, y1):bisect.bisect_left(ys, y2)]:
+            x, y = points[i]
+            if x < x1 + (y - y1) * slope:
+                inside[i] = not inside[i]
+    return inside
+
+
+class Room:
+    """ polygon selection region, items are represented by their points (see Replicator.get_item_points) """
+    def __init__(self, outline, name=""):
+        self.outline = [(int(x), int(y)) for x, y in outline]
+        self.name = name
+        xs = [p[0] for p in self.outline]
+        ys = [p[1] for p in self.outline]
+        self.bounding_box = (min(xs), min(ys), max(xs), max(ys))
+        self.area = abs(sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2)
+                            in zip(self.outline, self.outline[1:] + self.outline[:1]))) / 2
+
+    def contains_points(self, points):
+        left, top, right, bottom = self.bounding_box
+        candidates = [i for i, (x, y) in enumerate(points) if left <= x <= right and top <= y <= bottom]
+        inside = [False] * len(points)
+        candidate_inside = points_in_polygon([points[i] for i in candidates], self.outline)
+        for i, is_inside in zip(candidates, candidate_inside):
+            inside[i] = is_inside
+        return inside
+
+    def select(self, items_points, containing):
+        """ for each item, all of its points have to be inside if containing, otherwise any of them """
+        points = [p for item_points in items_points for p in item_points]
+        inside = self.contains_points(points)
+        selected = []
+        start = 0
+        for item_points in items_points:
+            item_inside = inside[start:start + len(item_points)]
+            start = start + len(item_points)
+            selected.append(bool(item_inside) and (all(item_inside) if containing else any(item_inside)))
+        return selected
+
+
+def get_smallest_room(rooms, points):
+    """ the smallest of the rooms containing all the points, None if there is no such room """
+    rooms = [room for room in rooms if all(room.contains_points(points))]
+    if not rooms:
+        return None
+    return min(rooms, key=lambda room: room.area)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+#  replication_stats.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+import pcbnew
+import os
+import sys
+import json
+import time
+import logging
+import functools
+import tracemalloc
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+STATS_FILENAME = 'replicate_layout_stats.json'
+# per stage memory accounting, e.g. REPLICATE_LAYOUT_TRACE_MEMORY=1. Tracing slows the replication down
+MEMORY_VARIABLE = 'REPLICATE_LAYOUT_TRACE_MEMORY'
+
+
+def is_memory_tracing_requested():
+    return os.environ.get(MEMORY_VARIABLE, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def memory_traced(method):
+    """ trace memory during the method if requested, unless it is already traced (e.g. by the benchmark) """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not is_memory_tracing_requested() or tracemalloc.is_tracing():
+            return method(*args, **kwargs)
+        tracemalloc.start()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            tracemalloc.stop()
+    return wrapper
+
+
+def get_plugin_version():
+    version_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'version.txt')
+    try:
+        with open(version_file_path) as fp:
+            return fp.readline().strip()
+    except OSError:
+        return None
+
+
+class Timer:
+    """ wall and cpu time, accumulated if started again """
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.start()
+
+    def start(self):
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def stop(self):
+        self.wall = self.wall + time.perf_counter() - self.wall_start
+        self.cpu = self.cpu + time.process_time() - self.cpu_start
+
+    def as_dict(self):
+        return {'wall': self.wall, 'cpu': self.cpu}
+
+
+class ReplicationStats:
+    """
+    Instrumentation of one replication run. Records wall and cpu time per stage
+    and per destination sheet within the stage, item counters (totals and per sheet),
+    counts of the expensive pcbnew calls and cache hit rates. When tracemalloc is tracing,
+    also the memory allocated and the peak memory of each stage.
+    """
+    def __init__(self):
+        self.start_time = time.time()
+        self.total = Timer()
+        self.stages = {}
+        self.sheet_times = defaultdict(dict)
+        self.counters = defaultdict(int)
+        self.sheet_counters = defaultdict(lambda: defaultdict(int))
+        self.swig_calls = defaultdict(int)
+        self.cache_hits = defaultdict(int)
+        self.cache_misses = defaultdict(int)
+        self.memory = {}
+        self.memory_start = None
+        self.current_stage = None
+        self.current_sheet = None
+        self.sheet_timer = None
+
+    def start_stage(self, name):
+        """ stage which is run again (e.g. for each destination sheet) is accumulated """
+        self.end_stage()
+        self.current_stage = name
+        if name in self.stages:
+            self.stages[name].start()
+        else:
+            self.stages[name] = Timer()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self.memory_start = tracemalloc.get_traced_memory()[0]
+
+    def end_stage(self):
+        if self.current_stage is None:
+            return
+        self.end_sheet()
+        self.stages[self.current_stage].stop()
+        if tracemalloc.is_tracing() and self.memory_start is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            memory = self.memory.setdefault(self.current_stage, {'allocated': 0, 'peak': 0})
+            # memory which was not released by the end of the stage and the most used during the stage
+            memory['allocated'] = memory['allocated'] + current - self.memory_start
+            memory['peak'] = max(memory['peak'], peak - self.memory_start)
+            self.memory_start = None
+        self.current_stage = None
+
+    def start_sheet(self, sheet):
+        """ mark the start of work on destination sheet within current stage """
+        self.end_sheet()
+        self.current_sheet = "/".join(sheet)
+        self.sheet_timer = Timer()
+
+    def end_sheet(self):
+        if self.current_sheet is None:
+            return
+        self.sheet_timer.stop()
+        self.sheet_times[self.current_stage][self.current_sheet] = self.sheet_timer.as_dict()
+        self.current_sheet = None
+        self.sheet_timer = None
+
+    def count(self, name, number=1):
+        """ count items, also for the destination sheet currently being worked on """
+        self.counters[name] += number
+        if self.current_sheet is not None:
+            self.sheet_counters[self.current_sheet][name] += number
+
+    def swig_call(self, name, number=1):
+        self.swig_calls[name] += number
+
+    def cache_hit(self, name):
+        self.cache_hits[name] += 1
+
+    def cache_miss(self, name):
+        self.cache_misses[name] += 1
+
+    def finish(self):
+        self.end_stage()
+        self.total.stop()
+
+    def get_stage_time(self, name):
+        return self.stages[name].wall
+
+    def get_stage_memory(self, name):
+        """ peak traced memory above the memory at the start of the stage in bytes, None if not traced """
+        if name not in self.memory:
+            return None
+        return self.memory[name]['peak']
+
+    def as_dict(self):
+        caches = {}
+        for name in set(self.cache_hits) | set(self.cache_misses):
+            lookups = self.cache_hits[name] + self.cache_misses[name]
+            caches[name] = {'hits': self.cache_hits[name], 'misses': self.cache_misses[name],
+                            'hit_rate': self.cache_hits[name] / lookups}
+        stages = {}
+        for name, timer in self.stages.items():
+            stages[name] = dict(timer.as_dict(), sheets=self.sheet_times.get(name, {}))
+            if name in self.memory:
+                stages[name]['memory'] = self.memory[name]
+        return {'plugin_version': get_plugin_version(),
+                'kicad_version': str(pcbnew.GetBuildVersion()),
+                'python_version': sys.version,
+                'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.start_time)),
+                'total': self.total.as_dict(),
+                'stages': stages,
+                'counters': dict(self.counters),
+                'sheet_counters': {sheet: dict(counters) for sheet, counters in self.sheet_counters.items()},
+                'swig_calls': dict(self.swig_calls),
+                'caches': caches}
+
+    def save(self, filename):
+        logger.info("Saving replication statistics to " + filename)
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=4)
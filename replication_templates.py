@@ -0,0 +1,531 @@
+# -*- coding: utf-8 -*-
+#  replication_templates.py
+#
+# Copyright (C) 2019-2022 Mitja Nemec
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#
+#
+"""
+Replication templates: the layout of a source sheet saved relative to its anchor footprint, which can be
+applied to the instances of the same sheet file on other boards. Footprints are matched by their
+symbol UUID (fp_id) and sheet path within the sheet, nets by the footprint pads they connect to.
+"""
+import pcbnew
+import os
+import gzip
+import json
+import logging
+try:
+    from .replicate_layout import Replicator, REPORT_COUNTERS, rotate_around_point, rotate_around_center, flipped_angle
+    from .replication_stats import ReplicationStats
+    from .replication_manifest import ZONE_PROPERTIES
+except:
+    from replicate_layout import Replicator, REPORT_COUNTERS, rotate_around_point, rotate_around_center, flipped_angle
+    from replication_stats import ReplicationStats
+    from replication_manifest import ZONE_PROPERTIES
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_VERSION = 2
+
+# loaded templates by (filename, modification time), so that batch runs parse each template only once
+template_cache = {}
+
+
+def no_progress(stage, percentage, message=None):
+    pass
+
+
+def get_point(point):
+    return [point.x, point.y]
+
+
+def get_sheet_fp_key(fp, depth):
+    """ footprint key within the sheet instance, the same for all the instances of the sheet file """
+    return "/".join(fp.sheet_id[depth:]), fp.fp_id
+
+
+class TemplateExporter:
+    """ serializes the source items of a replicator (as selected by a dry run) """
+    def __init__(self, replicator, level):
+        self.replicator = replicator
+        self.board = replicator.board
+        self.depth = len(level)
+        # net roles are identified by the first pad connected to the net
+        self.net_roles = []
+        self.net_role_index = {}
+        self.pad_roles = {}
+        for fp in replicator.get_footprints_on_sheet(level):
+            path, fp_id = get_sheet_fp_key(fp, self.depth)
+            for pad in fp.fp.Pads():
+                if pad.GetNetname() and pad.GetNetname() not in self.pad_roles:
+                    self.pad_roles[pad.GetNetname()] = [path, fp_id, pad.GetName()]
+
+    def get_net(self, item):
+        """ index of the net role, None if the item is not connected to any of the sheet pads """
+        net_name = item.GetNetname()
+        if net_name not in self.pad_roles:
+            return None
+        if net_name not in self.net_role_index:
+            self.net_role_index[net_name] = len(self.net_roles)
+            self.net_roles.append(self.pad_roles[net_name])
+        return self.net_role_index[net_name]
+
+    def get_layer(self, layer):
+        return self.board.GetLayerName(layer)
+
+    def export_footprint(self, fp):
+        path, fp_id = get_sheet_fp_key(fp, self.depth)
+        texts = []
+        for text in Replicator.get_footprint_text_items(fp):
+            texts.append({'pos': get_point(text.GetPosition()), 'angle': text.GetTextAngleDegrees(),
+                          'layer': self.get_layer(text.GetLayer()), 'mirrored': text.IsMirrored(),
+                          'visible': text.IsVisible(), 'thickness': text.GetTextThickness(),
+                          'size': [text.GetTextWidth(), text.GetTextHeight()],
+                          'italic': text.IsItalic(), 'bold': text.IsBold(), 'multiline': text.IsMultilineAllowed(),
+                          'justify': [int(text.GetHorizJustify()), int(text.GetVertJustify())],
+                          'keep_upright': text.IsKeepUpright()})
+        local = [fp.fp.GetLocalClearance(), fp.fp.GetLocalSolderMaskMargin(), fp.fp.GetLocalSolderPasteMargin(),
+                 fp.fp.GetLocalSolderPasteMarginRatio(), int(fp.fp.GetZoneConnection())]
+        return {'path': path, 'id': fp_id, 'ref': fp.ref, 'pos': get_point(fp.fp.GetPosition()),
+                'angle': fp.fp.GetOrientationDegrees(), 'flipped': fp.fp.IsFlipped(), 'local': local,
+                'texts': texts}
+
+    def export_track(self, track):
+        data = {'start': get_point(track.GetStart()), 'end': get_point(track.GetEnd()),
+                'width': track.GetWidth(), 'net': self.get_net(track), 'locked': track.IsLocked()}
+        if isinstance(track, pcbnew.PCB_VIA):
+            data['type'] = 'via'
+            data['drill'] = track.GetDrillValue()
+            data['layers'] = [self.get_layer(track.TopLayer()), self.get_layer(track.BottomLayer())]
+        else:
+            data['type'] = 'arc' if isinstance(track, pcbnew.PCB_ARC) else 'track'
+            data['layer'] = self.get_layer(track.GetLayer())
+            if isinstance(track, pcbnew.PCB_ARC):
+                data['mid'] = get_point(track.GetMid())
+        return data
+
+    def export_zone(self, zone):
+        outline = zone.Outline()
+        outlines = []
+        for index in range(outline.OutlineCount()):
+            holes = [self.get_chain_points(outline.Hole(index, hole)) for hole in range(outline.HoleCount(index))]
+            outlines.append({'points': self.get_chain_points(outline.Outline(index)), 'holes': holes})
+        return {'outlines': outlines, 'layers': [self.get_layer(x) for x in zone.GetLayerSet().Seq()],
+                'net': self.get_net(zone) if zone.IsOnCopperLayer() else None,
+                'settings': {name: getattr(zone, 'Get' + name)() for name in ZONE_PROPERTIES},
+                'hatch_orientation': zone.GetHatchOrientation().AsDegrees(), 'locked': zone.IsLocked()}
+
+    @staticmethod
+    def get_chain_points(chain):
+        return [get_point(chain.CPoint(i)) for i in range(chain.PointCount())]
+
+    def export_text(self, text):
+        return {'text': text.GetText(), 'pos': get_point(text.GetTextPos()), 'angle': text.GetTextAngleDegrees(),
+                'layer': self.get_layer(text.GetLayer()), 'size': [text.GetTextWidth(), text.GetTextHeight()],
+                'thickness': text.GetTextThickness(), 'italic': text.IsItalic(), 'bold': text.IsBold(),
+                'mirrored': text.IsMirrored(), 'justify': [int(text.GetHorizJustify()), int(text.GetVertJustify())],
+                'locked': text.IsLocked()}
+
+    def export_drawing(self, drawing):
+        # Bezier curves would also need their control points
+        if not isinstance(drawing, pcbnew.PCB_SHAPE) or drawing.GetShape() == pcbnew.SHAPE_T_BEZIER:
+            return None
+        data = {'shape': int(drawing.GetShape()), 'start': get_point(drawing.GetStart()),
+                'end': get_point(drawing.GetEnd()), 'width': drawing.GetWidth(),
+                'layer': self.get_layer(drawing.GetLayer()), 'filled': drawing.IsFilled(), 'locked': drawing.IsLocked()}
+        if drawing.GetShape() == pcbnew.SHAPE_T_ARC:
+            data['mid'] = get_point(drawing.GetArcMid())
+        elif drawing.GetShape() == pcbnew.SHAPE_T_POLY:
+            data['points'] = [get_point(p) for p in drawing.GetPolyPoints()]
+        return data
+
+
+def export_template(replicator, level, settings):
+    """ template of the source layout on the level (list of sheet names) of the replicator anchor footprint """
+    src_anchor_fp = replicator.src_anchor_fp
+    # the dry run selects the source items exactly as the replication would, the update modes do not change that
+    replicator.replicate_layout(src_anchor_fp, level, [], settings._replace(incremental=False, update=False), False,
+                                dry_run=True)
+    exporter = TemplateExporter(replicator, level)
+    drawings = [exporter.export_drawing(x) for x in replicator.src_drawings]
+    if None in drawings:
+        logger.info("%d drawings which are not shapes or are Bezier curves are not part of the template",
+                    drawings.count(None))
+    template = {'version': TEMPLATE_VERSION,
+                'sheet_file': os.path.basename(src_anchor_fp.filename[len(level) - 1]),
+                'anchor': exporter.export_footprint(src_anchor_fp),
+                'footprints': [exporter.export_footprint(x) for x in replicator.src_footprints],
+                'tracks': [exporter.export_track(x) for x in replicator.src_tracks],
+                'zones': [exporter.export_zone(x) for x in replicator.src_zones],
+                'text': [exporter.export_text(x) for x in replicator.src_text],
+                'drawings': [x for x in drawings if x is not None]}
+    template['nets'] = exporter.net_roles
+    return template
+
+
+def template_to_string(template):
+    """ summary of the template contents """
+    lines = [f"Template of sheet {template['sheet_file']}, anchor {template['anchor']['ref']}:"]
+    lines.append("    " + ", ".join(f"{key}={len(template[key])}"
+                                    for key in ('footprints', 'tracks', 'zones', 'text', 'drawings', 'nets')))
+    return "\n".join(lines)
+
+
+def save_template(template, filename):
+    with gzip.open(filename, 'wt', encoding='utf-8') as f:
+        json.dump(template, f, separators=(',', ':'))
+
+
+def load_template(filename):
+    filename = os.path.abspath(filename)
+    if not os.path.exists(filename):
+        raise LookupError(f"Template file {filename} does not exist")
+    key = (filename, os.path.getmtime(filename))
+    if key not in template_cache:
+        with gzip.open(filename, 'rt', encoding='utf-8') as f:
+            template = json.load(f)
+        if template.get('version') != TEMPLATE_VERSION:
+            raise LookupError(f"Template file {filename} has version {template.get('version')}, "
+                              f"only version {TEMPLATE_VERSION} is supported")
+        template_cache[key] = template
+    return template_cache[key]
+
+
+class TemplatePlacement:
+    """ transformation from the template anchor to the destination anchor, the same as used by the replicator """
+    def __init__(self, anchor, dst_anchor_fp):
+        self.dst_anchor_fp = dst_anchor_fp
+        self.src_anchor_position = pcbnew.VECTOR2I(*anchor['pos'])
+        self.src_anchor_angle = anchor['angle']
+        self.dst_anchor_position = dst_anchor_fp.fp.GetPosition()
+        self.dst_anchor_angle = dst_anchor_fp.fp.GetOrientationDegrees()
+        self.move_vector = self.dst_anchor_position - self.src_anchor_position
+        self.flipped = anchor['flipped'] != dst_anchor_fp.fp.IsFlipped()
+
+    def transform_item(self, item):
+        """ item is created at template coordinates """
+        item.Move(self.move_vector)
+        if self.flipped:
+            item.Flip(self.dst_anchor_position, False)
+            rot_angle = flipped_angle(self.src_anchor_angle) - self.dst_anchor_angle - 180
+            item.Rotate(self.dst_anchor_position, pcbnew.EDA_ANGLE(-rot_angle, pcbnew.DEGREES_T))
+        else:
+            item.Rotate(self.dst_anchor_position,
+                        pcbnew.EDA_ANGLE(self.dst_anchor_angle - self.src_anchor_angle, pcbnew.DEGREES_T))
+
+    def place_footprint(self, dst_fp, data):
+        # anchor footprint stays where the user placed it
+        if dst_fp.ref == self.dst_anchor_fp.ref:
+            return
+        fp = dst_fp.fp
+        src_fp_position = pcbnew.VECTOR2I(*data['pos'])
+        if self.flipped:
+            src_fp_rel_pos = self.src_anchor_position - src_fp_position
+            dst_fp_rel_pos_rot = rotate_around_center([-src_fp_rel_pos[0], src_fp_rel_pos[1]],
+                                                      -(self.dst_anchor_angle + self.src_anchor_angle))
+            fp.SetPosition(self.dst_anchor_position + pcbnew.VECTOR2I(*dst_fp_rel_pos_rot))
+            if fp.IsFlipped() == data['flipped']:
+                fp.Flip(fp.GetPosition(), False)
+            flipped_delta = flipped_angle(self.src_anchor_angle) - self.dst_anchor_angle
+            fp.SetOrientationDegrees(flipped_angle(data['angle']) - flipped_delta)
+        else:
+            anchor_delta_angle = self.src_anchor_angle - self.dst_anchor_angle
+            new_pos = rotate_around_point(src_fp_position - self.src_anchor_position + self.dst_anchor_position,
+                                          self.dst_anchor_position, anchor_delta_angle)
+            fp.SetPosition(pcbnew.VECTOR2I(*[int(x) for x in new_pos]))
+            if fp.IsFlipped() != data['flipped']:
+                fp.Flip(fp.GetPosition(), False)
+            fp.SetOrientationDegrees(data['angle'] - anchor_delta_angle)
+
+    def place_footprint_text(self, dst_fp, data, text, text_data):
+        """ text position, angle and mirroring relative to its (already placed) footprint """
+        dst_fp_position = dst_fp.fp.GetPosition()
+        src_txt_rel_pos = pcbnew.VECTOR2I(*text_data['pos']) - pcbnew.VECTOR2I(*data['pos'])
+        if data['flipped'] != dst_fp.fp.IsFlipped():
+            text.Flip(self.dst_anchor_position, False)
+            delta_angle = flipped_angle(self.src_anchor_angle) - self.dst_anchor_angle
+            dst_txt_rel_pos = rotate_around_center([-src_txt_rel_pos[0], src_txt_rel_pos[1]], delta_angle)
+            text.SetPosition(dst_fp_position + pcbnew.VECTOR2I(*dst_txt_rel_pos))
+            text.SetTextAngleDegrees(-text_data['angle'])
+            text.SetMirrored(not text_data['mirrored'])
+        else:
+            delta_angle = dst_fp.fp.GetOrientationDegrees() - data['angle']
+            dst_txt_rel_pos = rotate_around_center(src_txt_rel_pos, -delta_angle)
+            text.SetPosition(dst_fp_position + pcbnew.VECTOR2I(*dst_txt_rel_pos))
+            text.SetTextAngleDegrees(text_data['angle'])
+            text.SetMirrored(text_data['mirrored'])
+
+
+class TemplateApplier:
+    """ places the template items on the sheet instances of a board """
+    def __init__(self, replicator, template):
+        self.replicator = replicator
+        self.board = replicator.board
+        self.template = template
+        self.anchor_key = (template['anchor']['path'], template['anchor']['id'])
+        self.stats = ReplicationStats()
+        replicator.stats = self.stats
+
+    def get_sheets(self):
+        """ all the instances of the template sheet file on the board """
+        sheets = []
+        for filename, nodes in self.replicator.hierarchy.nodes_by_file.items():
+            if os.path.basename(filename) == self.template['sheet_file']:
+                sheets.extend(node.path for node in nodes if self.anchor_key[1] in node.get_fp_ids())
+        if not sheets:
+            raise LookupError(f"There is no instance of sheet {self.template['sheet_file']} with the template "
+                              f"anchor footprint {self.template['anchor']['ref']} on the board")
+        return sorted(sheets)
+
+    def get_layer(self, name):
+        layer = self.board.GetLayerID(name)
+        if layer < 0:
+            raise LookupError(f"Layer {name} of the template is not on the board")
+        return layer
+
+    def apply(self, dst_sheets, settings):
+        report = {'dry_run': False, 'cancelled': False, 'stages': {}, 'memory': {},
+                  'sheets': {"/".join(sheet): dict.fromkeys(REPORT_COUNTERS, 0) for sheet in dst_sheets}}
+        # everything is checked before the first sheet is modified, so that the board is not left half applied
+        self.check_layers(settings)
+        sheet_footprints = [self.get_sheet_footprints(sheet, settings) for sheet in dst_sheets]
+        # items of the sheets which the template is already applied to must not be removed by the next ones
+        self.replicator.added_kiids = set()
+        try:
+            for sheet, footprints in zip(dst_sheets, sheet_footprints):
+                self.apply_sheet(sheet, footprints, settings)
+        finally:
+            self.replicator.added_kiids = None
+        self.stats.start_stage('refill')
+        self.replicator.refill_zones()
+        self.stats.finish()
+        for stage in self.stats.stages:
+            report['stages'][stage] = self.stats.get_stage_time(stage)
+        for sheet, counters in report['sheets'].items():
+            for counter in REPORT_COUNTERS:
+                counters[counter] = self.stats.sheet_counters[sheet][counter]
+        return report
+
+    def check_layers(self, settings):
+        """ the layers of all the items which will be applied have to be on the board """
+        names = set(text['layer'] for data in self.template['footprints'] for text in data['texts'])
+        if settings.rep_tracks:
+            for data in self.template['tracks']:
+                names.update(data['layers'] if data['type'] == 'via' else [data['layer']])
+        if settings.rep_zones:
+            names.update(name for data in self.template['zones'] for name in data['layers'])
+        for kind, enabled in [('text', settings.rep_text), ('drawings', settings.rep_drawings)]:
+            if enabled:
+                names.update(data['layer'] for data in self.template[kind])
+        for name in sorted(names):
+            self.get_layer(name)
+
+    def get_sheet_footprints(self, sheet, settings):
+        """ footprints of the sheet by their key within the sheet, checked against the template footprints """
+        depth = len(sheet)
+        sheet_footprints = {get_sheet_fp_key(fp, depth): fp for fp in self.replicator.get_footprints_on_sheet(sheet)}
+        if self.anchor_key not in sheet_footprints:
+            raise LookupError(f"Anchor footprint of the template is not on sheet {'/'.join(sheet)}")
+        for data in self.template['footprints']:
+            dst_fp = sheet_footprints.get((data['path'], data['id']))
+            if dst_fp is None:
+                raise LookupError(f"Footprint {data['ref']} of the template has no matching footprint "
+                                  f"on sheet {'/'.join(sheet)}")
+            if dst_fp.fp.IsLocked() and not settings.locked_fps:
+                continue
+            nr_texts = len(Replicator.get_footprint_text_items(dst_fp))
+            if nr_texts != len(data['texts']):
+                raise LookupError(f"Footprint {dst_fp.ref} has different number of text items ({nr_texts}) "
+                                  f"than the template footprint {data['ref']} ({len(data['texts'])})")
+        return sheet_footprints
+
+    def apply_sheet(self, sheet, sheet_footprints, settings):
+        logger.info("Applying template to sheet %r", sheet)
+        placement = TemplatePlacement(self.template['anchor'], sheet_footprints[self.anchor_key])
+
+        if settings.remove:
+            self.remove_items('remove_before', sheet, settings)
+        self.stats.start_stage('footprints')
+        self.stats.start_sheet(sheet)
+        for data in self.template['footprints']:
+            dst_fp = sheet_footprints[(data['path'], data['id'])]
+            if dst_fp.fp.IsLocked() and not settings.locked_fps:
+                continue
+            self.stats.count('footprints')
+            placement.place_footprint(dst_fp, data)
+            dst_fp.fp.SetLocalClearance(data['local'][0])
+            dst_fp.fp.SetLocalSolderMaskMargin(data['local'][1])
+            dst_fp.fp.SetLocalSolderPasteMargin(data['local'][2])
+            dst_fp.fp.SetLocalSolderPasteMarginRatio(data['local'][3])
+            dst_fp.fp.SetZoneConnection(data['local'][4])
+            self.place_footprint_text(dst_fp, data, placement)
+        # footprints were moved
+        self.replicator.hierarchy.get_node(sheet).invalidate_bounding_box()
+
+        if settings.remove:
+            self.remove_items('remove_after', sheet, settings)
+
+        self.stats.start_stage('items')
+        self.stats.start_sheet(sheet)
+        net_codes = [self.get_net_code(sheet_footprints, role) for role in self.template['nets']]
+        new_items = []
+        if settings.rep_tracks:
+            new_items.extend(self.make_track(data, net_codes) for data in self.template['tracks'])
+        if settings.rep_zones:
+            new_items.extend(self.make_zone(data, net_codes) for data in self.template['zones'])
+        if settings.rep_text:
+            new_items.extend(self.make_text(data) for data in self.template['text'])
+        if settings.rep_drawings:
+            new_items.extend(self.make_drawing(data) for data in self.template['drawings'])
+        for item in new_items:
+            placement.transform_item(item)
+            self.stats.count(self.replicator.get_item_kind(item))
+            self.replicator.add_item(item)
+
+    def remove_items(self, stage, sheet, settings):
+        """ remove the items of the sheet, before and after the footprints are placed """
+        self.stats.start_stage(stage)
+        self.stats.start_sheet(sheet)
+        for item in self.replicator.get_items_for_removal(sheet, settings.intersecting):
+            if item.m_Uuid.AsString() not in self.replicator.added_kiids:
+                self.replicator.remove_item(item)
+
+    def place_footprint_text(self, dst_fp, data, placement):
+        texts = Replicator.get_footprint_text_items(dst_fp)
+        for text, text_data in zip(texts, data['texts']):
+            text.SetLayer(self.get_layer(text_data['layer']))
+            placement.place_footprint_text(dst_fp, data, text, text_data)
+            text.SetVisible(text_data['visible'])
+            text.SetTextThickness(text_data['thickness'])
+            text.SetTextWidth(text_data['size'][0])
+            text.SetTextHeight(text_data['size'][1])
+            text.SetItalic(text_data['italic'])
+            text.SetBold(text_data['bold'])
+            text.SetMultilineAllowed(text_data['multiline'])
+            text.SetHorizJustify(text_data['justify'][0])
+            text.SetVertJustify(text_data['justify'][1])
+            text.SetKeepUpright(text_data['keep_upright'])
+
+    @staticmethod
+    def get_net_code(sheet_footprints, role):
+        path, fp_id, pad_name = role
+        fp = sheet_footprints.get((path, fp_id))
+        if fp is not None:
+            for pad in fp.fp.Pads():
+                if pad.GetName() == pad_name:
+                    return pad.GetNetCode()
+        logger.info("Pad %s of footprint %s was not found, the items on its net are left unconnected",
+                    pad_name, fp_id)
+        return 0
+
+    def make_track(self, data, net_codes):
+        if data['type'] == 'via':
+            track = pcbnew.PCB_VIA(self.board)
+            track.SetDrill(data['drill'])
+            track.SetLayerPair(self.get_layer(data['layers'][0]), self.get_layer(data['layers'][1]))
+        elif data['type'] == 'arc':
+            track = pcbnew.PCB_ARC(self.board)
+            track.SetMid(pcbnew.VECTOR2I(*data['mid']))
+        else:
+            track = pcbnew.PCB_TRACK(self.board)
+        if data['type'] != 'via':
+            track.SetLayer(self.get_layer(data['layer']))
+        track.SetStart(pcbnew.VECTOR2I(*data['start']))
+        track.SetEnd(pcbnew.VECTOR2I(*data['end']))
+        track.SetWidth(data['width'])
+        track.SetNetCode(net_codes[data['net']] if data['net'] is not None else 0)
+        track.SetLocked(data['locked'])
+        return track
+
+    def make_zone(self, data, net_codes):
+        zone = pcbnew.ZONE(self.board)
+        layers = pcbnew.LSET()
+        for name in data['layers']:
+            layers.AddLayer(self.get_layer(name))
+        zone.SetLayerSet(layers)
+        outline = zone.Outline()
+        for outline_data in data['outlines']:
+            outline.NewOutline()
+            for point in outline_data['points']:
+                outline.Append(point[0], point[1])
+            for hole_data in outline_data['holes']:
+                hole = outline.NewHole()
+                for point in hole_data:
+                    outline.Append(point[0], point[1], -1, hole)
+        for name, value in data['settings'].items():
+            getattr(zone, 'Set' + name)(value)
+        zone.SetHatchOrientation(pcbnew.EDA_ANGLE(data['hatch_orientation'], pcbnew.DEGREES_T))
+        zone.SetNetCode(net_codes[data['net']] if data['net'] is not None else 0)
+        zone.SetLocked(data['locked'])
+        # zones are refilled at the end
+        zone.SetIsFilled(False)
+        zone.SetNeedRefill(True)
+        return zone
+
+    def make_text(self, data):
+        text = pcbnew.PCB_TEXT(self.board)
+        text.SetText(data['text'])
+        text.SetLayer(self.get_layer(data['layer']))
+        text.SetTextPos(pcbnew.VECTOR2I(*data['pos']))
+        text.SetTextAngleDegrees(data['angle'])
+        text.SetTextWidth(data['size'][0])
+        text.SetTextHeight(data['size'][1])
+        text.SetTextThickness(data['thickness'])
+        text.SetItalic(data['italic'])
+        text.SetBold(data['bold'])
+        text.SetMirrored(data['mirrored'])
+        text.SetHorizJustify(data['justify'][0])
+        text.SetVertJustify(data['justify'][1])
+        text.SetLocked(data['locked'])
+        return text
+
+    def make_drawing(self, data):
+        drawing = pcbnew.PCB_SHAPE(self.board)
+        drawing.SetShape(data['shape'])
+        drawing.SetLayer(self.get_layer(data['layer']))
+        drawing.SetWidth(data['width'])
+        drawing.SetFilled(data['filled'])
+        if data['shape'] == pcbnew.SHAPE_T_ARC:
+            drawing.SetArcGeometry(pcbnew.VECTOR2I(*data['start']), pcbnew.VECTOR2I(*data['mid']),
+                                   pcbnew.VECTOR2I(*data['end']))
+        elif data['shape'] == pcbnew.SHAPE_T_POLY:
+            drawing.SetPolyPoints([pcbnew.VECTOR2I(*p) for p in data['points']])
+        else:
+            drawing.SetStart(pcbnew.VECTOR2I(*data['start']))
+            drawing.SetEnd(pcbnew.VECTOR2I(*data['end']))
+        drawing.SetLocked(data['locked'])
+        return drawing
+
+
+def get_template_anchor(board, template):
+    """ reference of a footprint which matches the template anchor, needed to set up the replicator """
+    for fp in board.GetFootprints():
+        if Replicator.get_footprint_id(fp) == template['anchor']['id']:
+            return fp.GetReference()
+    raise LookupError(f"Template anchor footprint {template['anchor']['ref']} is not on the board")
+
+
+def apply_template(board, template, sheets, settings, update_func=no_progress):
+    """
+    apply the template to the instances of its sheet file on the board, selected by index or path
+    (all if none given). Returns the replicator and the report
+    """
+    replicator = Replicator(board, get_template_anchor(board, template), update_func)
+    applier = TemplateApplier(replicator, template)
+    dst_sheets = replicator.select_sheets(applier.get_sheets(), sheets)
+    return replicator, applier.apply(dst_sheets, settings)
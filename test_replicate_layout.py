@@ -1,13 +1,46 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import unittest
-import pcbnew
+import re
+import json
+import queue
 import logging
 import sys
 import os
-from compare_boards import compare_boards
+import itertools
+import tempfile
+import subprocess
+from unittest import mock
+try:
+    import pcbnew
+except ImportError:
+    # without KiCad the tests run on the pure Python stand-in
+    import fake_pcbnew
+    pcbnew = fake_pcbnew.install()
+from compare_boards import compare_boards, diff_boards, diff_report_to_string
 from replicate_layout import Replicator
-from replicate_layout import Settings
+from replicate_layout import Settings, report_to_string
+from replication_stats import MEMORY_VARIABLE
+from replication_manifest import get_item_geometry_key, get_item_content
+from replication_lists import ListModel
+from replication_rooms import Room, points_in_polygon
+from replication_templates import export_template, save_template, load_template, apply_template
+from replication_jobs import load_job_file, ReplicationJob
+from replication_batch import replicate_file, run_batch
+import replication_profiling
+from regression_replicate_layout import find_scenarios, load_scenario, run_regression
+from benchmark_replicate_layout import generate_board, run_case, get_scaling, measure_import_time
+from replication_logging import start_logging, get_log_level, MessageQueueHandler, LOG_FILENAME, LOG_LEVEL_VARIABLE
+
+
+def get_cli_command(cli):
+    """ the command line runner has to use the same pcbnew as the tests """
+    if pcbnew.GetBuildVersion() == "fake_pcbnew":
+        return [sys.executable, "-c", "import os, sys, runpy; sys.argv.pop(0); "
+                                      "sys.path.insert(0, os.path.dirname(sys.argv[0])); "
+                                      "import fake_pcbnew; fake_pcbnew.install(); "
+                                      "runpy.run_path(sys.argv[0], run_name='__main__')", cli]
+    return [sys.executable, cli]
 
 
 def update_progress(stage, percentage, message=None):
@@ -17,69 +50,36 @@ def update_progress(stage, percentage, message=None):
         print(message)
 
 
-def test_file(in_filename, test_filename, src_anchor_fp_reference, level, sheets, containing, remove, by_group):
-    board = pcbnew.LoadBoard(in_filename)
-    # get board information
-    replicator = Replicator(board, src_anchor_fp_reference, update_progress)
-    # get source footprint info
-    src_anchor_fp = replicator.get_fp_by_ref(src_anchor_fp_reference)
-    # check if there are at least two sheets pointing to same hierarchical file that the source anchor footprint belongs to
-    count = 0
-    for filename in replicator.dict_of_sheets.values():
-        if filename[1] in src_anchor_fp.filename:
-            count = count + 1
-    if count < 2:
-        raise Exception
-    # check if source anchor footprint is on root leve
-    if len(src_anchor_fp.filename) == 0:
-        raise Exception
-
-    # have the user select replication level
-    levels = src_anchor_fp.filename
-    # get the level index from user
-    index = levels.index(levels[level])
-    # get list of sheets
-    sheet_list = replicator.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[index])
-
-    # get anchor footprints
-    anchor_footprints = replicator.get_list_of_footprints_with_same_id(src_anchor_fp.fp_id)
-    # find matching anchors to matching sheets
-    ref_list = []
-    for sheet in sheet_list:
-        for fp in anchor_footprints:
-            a = sheet
-            b = fp.sheet_id
-            if sheet == fp.sheet_id:
-                ref_list.append(fp.ref)
-                break
-
-    # get the list selection from user
-    dst_sheets = [sheet_list[i] for i in sheets]
-
+def get_test_job(src_anchor_fp_reference, level, sheets, containing):
     settings = Settings(rep_tracks=True, rep_zones=True, rep_text=True, rep_drawings=True,
                         rep_locked_tracks=True, rep_locked_zones=True, rep_locked_text=True, rep_locked_drawings=True,
                         intersecting=not containing,
                         group_items=True,
                         group_only=False, locked_fps=False,
                         remove=False)
+    return ReplicationJob(anchor=src_anchor_fp_reference, level=level, sheets=list(sheets), settings=settings,
+                          rm_duplicates=True, dry_run=False)
+
 
-    (fps, items) = replicator.highlight_set_level(src_anchor_fp.sheet_id[0:index + 1],
-                                                  settings)
-    replicator.highlight_clear_level(fps, items)
+def test_file(in_filename, test_filename, src_anchor_fp_reference, level, sheets, containing, remove, by_group):
+    job = get_test_job(src_anchor_fp_reference, level, sheets, containing)
 
-    # now we are ready for replication
-    replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:index + 1], dst_sheets,
-                                settings, rm_duplicates=True)
+    # replicate the same way as the batch does it
     out_filename = test_filename.replace("ref", "temp")
-    pcbnew.SaveBoard(out_filename, board)
+    result = replicate_file(in_filename, out_filename, [job], update_progress)
+    if result['error']:
+        raise Exception(result['error'])
     # test for connectivity isuues
-    if replicator.connectivity_issues:
+    if result['connectivity_issues']:
         report_string = ""
-        for item in replicator.connectivity_issues:
+        for item in result['connectivity_issues']:
             report_string = report_string + f"Footprint {item[0]}, pad {item[1]}\n"
         print(f"Make sure that you check the connectivity around:\n" + report_string)
 
-    return compare_boards(out_filename, test_filename)
+    err = compare_boards(out_filename, test_filename)
+    if err:
+        print(diff_report_to_string(diff_boards(test_filename, out_filename)))
+    return err
 
 
 @unittest.SkipTest
@@ -151,19 +151,937 @@ class TestOfficial(unittest.TestCase):
         self.assertEqual(err, 0, "outer levels failed")
 
 
+class TestDryRun(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+
+    def test_dry_run(self):
+        logger.info("Testing dry run")
+        input_filename = 'replicate_layout_test_project.kicad_pcb'
+        board = pcbnew.LoadBoard(input_filename)
+        replicator = Replicator(board, 'Q301', update_progress)
+        src_anchor_fp = replicator.get_fp_by_ref('Q301')
+        sheet_list = replicator.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[1])
+        nr_tracks = len(board.GetTracks())
+        nr_drawings = len(board.GetDrawings())
+        positions = [fp.fp.GetPosition() for fp in replicator.footprints]
+        settings = Settings(intersecting=True, group_items=True, remove=True)
+        report = replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                             settings, rm_duplicates=True, dry_run=True)
+        # board should not be touched
+        self.assertEqual(len(board.GetTracks()), nr_tracks, "dry run added or removed tracks")
+        self.assertEqual(len(board.GetDrawings()), nr_drawings, "dry run added or removed drawings")
+        self.assertEqual([fp.fp.GetPosition() for fp in replicator.footprints], positions, "dry run moved footprints")
+        # but it should report what would change
+        self.assertEqual(len(report['sheets']), len(sheet_list))
+        self.assertIn('footprints', report['stages'])
+        self.assertTrue(all(x['footprints'] > 0 for x in report['sheets'].values()))
+        self.assertIn("estimate", report_to_string(report))
+        # without moving the footprints it can not be told which existing items would be kept
+        for settings in [Settings(incremental=True), Settings(update=True)]:
+            with self.assertRaises(LookupError):
+                replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                            settings, rm_duplicates=True, dry_run=True)
+        self.assertEqual(len(board.GetTracks()), nr_tracks)
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+        self.manifest_filename = os.path.abspath('replicate_layout_test_project_replicate_layout_manifest.json')
+
+    def tearDown(self):
+        if os.path.exists(self.manifest_filename):
+            os.remove(self.manifest_filename)
+
+    def test_incremental(self):
+        logger.info("Testing incremental replication")
+        input_filename = 'replicate_layout_test_project.kicad_pcb'
+        board = pcbnew.LoadBoard(input_filename)
+        settings = Settings(incremental=True)
+
+        def replicate():
+            replicator = Replicator(board, 'Q301', update_progress)
+            src_anchor_fp = replicator.get_fp_by_ref('Q301')
+            sheet_list = replicator.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[1])
+            replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                        settings, rm_duplicates=False)
+            return replicator
+
+        replicator = replicate()
+        self.assertTrue(os.path.exists(self.manifest_filename), "manifest was not written")
+        first_run = set(x.m_Uuid.AsString() for x in board.GetTracks())
+
+        # nothing changed, nothing should be replicated again
+        replicate()
+        second_run = set(x.m_Uuid.AsString() for x in board.GetTracks())
+        self.assertEqual(first_run, second_run, "unchanged tracks were replicated again")
+
+        # change one source track, only its copies should be replaced
+        src_track = [x for x in replicator.src_tracks if not isinstance(x, pcbnew.PCB_VIA)][0]
+        src_track.SetWidth(src_track.GetWidth() + 100000)
+        replicate()
+        third_run = set(x.m_Uuid.AsString() for x in board.GetTracks())
+        self.assertEqual(len(third_run), len(second_run), "changed track was not replaced")
+        self.assertLessEqual(len(third_run - second_run), len(replicator.dst_sheets))
+        self.assertGreater(len(third_run - second_run), 0, "changed track was not replicated")
+
+    def test_zone_and_drawing_settings(self):
+        logger.info("Testing incremental replication of changed zone settings and drawing fill")
+        board = pcbnew.LoadBoard('replicate_layout_test_project.kicad_pcb')
+        settings = Settings(incremental=True)
+
+        def replicate():
+            replicator = Replicator(board, 'Q301', update_progress)
+            src_anchor_fp = replicator.get_fp_by_ref('Q301')
+            sheet_list = replicator.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[1])
+            replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                        settings, rm_duplicates=False)
+            return replicator
+
+        def replicated_items(replicator, src_item):
+            items = {x.m_Uuid.AsString(): x for x in itertools.chain(board.Zones(), board.GetDrawings())}
+            kiids = [kiid for entry in replicator.manifest.sheets.values()
+                     for kiid in entry['items'][src_item.m_Uuid.AsString()]['dst']]
+            return [items[kiid] for kiid in kiids]
+
+        replicator = replicate()
+        src_zone = replicator.src_zones[0]
+        src_drawing = [x for x in replicator.src_drawings if x.GetShape() == pcbnew.SHAPE_T_RECT][0]
+        src_zone.SetThermalReliefGap(src_zone.GetThermalReliefGap() + 100000)
+        src_drawing.SetFilled(not src_drawing.IsFilled())
+        # source items are read once per run, not once for every destination sheet
+        with mock.patch('replicate_layout.get_item_content', side_effect=get_item_content) as read_content:
+            replicator = replicate()
+        self.assertGreater(len(replicator.dst_sheets), 1)
+        self.assertEqual(read_content.call_count, len(set(x.args[0].m_Uuid.AsString()
+                                                         for x in read_content.call_args_list)))
+        dst_zones = replicated_items(replicator, src_zone)
+        dst_drawings = replicated_items(replicator, src_drawing)
+        self.assertEqual(len(dst_zones), len(replicator.dst_sheets))
+        self.assertEqual(len(dst_drawings), len(replicator.dst_sheets))
+        for zone in dst_zones:
+            self.assertEqual(zone.GetThermalReliefGap(), src_zone.GetThermalReliefGap())
+        for drawing in dst_drawings:
+            self.assertEqual(drawing.IsFilled(), src_drawing.IsFilled())
+
+
+class TestUpdate(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+
+    def test_update(self):
+        logger.info("Testing in-place update of existing items")
+        input_filename = 'replicate_layout_test_project.kicad_pcb'
+
+        def replicate(board, settings):
+            replicator = Replicator(board, 'Q301', update_progress)
+            src_anchor_fp = replicator.get_fp_by_ref('Q301')
+            sheet_list = replicator.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[1])
+            replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                        settings, rm_duplicates=False)
+            return replicator
+
+        def tracks_geometry(board):
+            return sorted(get_item_geometry_key(x) + x.GetNetname() for x in board.GetTracks())
+
+        board = pcbnew.LoadBoard(input_filename)
+        replicator = replicate(board, Settings(update=True))
+        first_run = set(x.m_Uuid.AsString() for x in board.GetTracks())
+
+        # nothing changed, all the items should be kept
+        replicate(board, Settings(update=True))
+        second_run = set(x.m_Uuid.AsString() for x in board.GetTracks())
+        self.assertEqual(first_run, second_run, "unchanged tracks were replaced")
+
+        # change one source track, its copies should be updated in place
+        src_track = [x for x in replicator.src_tracks if not isinstance(x, pcbnew.PCB_VIA)][0]
+        src_track_kiid = src_track.m_Uuid.AsString()
+        src_track.SetWidth(src_track.GetWidth() + 100000)
+        replicate(board, Settings(update=True))
+        third_run = set(x.m_Uuid.AsString() for x in board.GetTracks())
+        self.assertEqual(first_run, third_run, "changed tracks were replaced instead of updated")
+
+        # the result has to be the same as when removing and replicating again
+        reference_board = pcbnew.LoadBoard(input_filename)
+        for track in reference_board.GetTracks():
+            if track.m_Uuid.AsString() == src_track_kiid:
+                track.SetWidth(track.GetWidth() + 100000)
+        replicate(reference_board, Settings(remove=True))
+        self.assertEqual(tracks_geometry(reference_board), tracks_geometry(board))
+
+    def test_zone_settings(self):
+        logger.info("Testing in-place update of changed zone settings")
+        input_filename = 'replicate_layout_test_project.kicad_pcb'
+
+        def replicate(board, settings):
+            replicator = Replicator(board, 'Q301', update_progress)
+            src_anchor_fp = replicator.get_fp_by_ref('Q301')
+            sheet_list = replicator.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[1])
+            replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                        settings, rm_duplicates=False)
+            return replicator
+
+        def zones(board):
+            return sorted(get_item_geometry_key(x) + x.GetNetname() for x in board.Zones())
+
+        board = pcbnew.LoadBoard(input_filename)
+        replicator = replicate(board, Settings(update=True, intersecting=True))
+        first_run = set(x.m_Uuid.AsString() for x in board.Zones())
+
+        # the thermal gap is not a part of the outline, the zones are updated and not replaced
+        src_zone = replicator.src_zones[0]
+        src_zone_kiid = src_zone.m_Uuid.AsString()
+        src_zone.SetThermalReliefGap(src_zone.GetThermalReliefGap() + 100000)
+        replicate(board, Settings(update=True, intersecting=True))
+        self.assertEqual(first_run, set(x.m_Uuid.AsString() for x in board.Zones()))
+
+        reference_board = pcbnew.LoadBoard(input_filename)
+        for zone in reference_board.Zones():
+            if zone.m_Uuid.AsString() == src_zone_kiid:
+                zone.SetThermalReliefGap(zone.GetThermalReliefGap() + 100000)
+        replicate(reference_board, Settings(remove=True, intersecting=True))
+        self.assertEqual(zones(reference_board), zones(board))
+
+    def test_match_outside_sheet(self):
+        logger.info("Testing that items outside of destination sheet are matched only on the same net")
+        board = pcbnew.LoadBoard('replicate_layout_test_project.kicad_pcb')
+        replicator = Replicator(board, 'Q301', update_progress)
+        src_anchor_fp = replicator.get_fp_by_ref('Q301')
+        replicator.dst_sheets = replicator.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[1])[0:1]
+        replicator.init_update_data()
+        replicator.matched_kiids = set()
+        track = [x for x in board.GetTracks() if x.GetNetCode() > 0][0]
+        replicator.existing_items[get_item_geometry_key(track)].append(track)
+        new_track = track.Duplicate().Cast()
+        new_track.SetNetCode(track.GetNetCode() + 1)
+        self.assertIsNone(replicator.find_matching_item(0, track, new_track))
+        # items of the destination sheet get the new net
+        replicator.candidate_kiids[0].add(track.m_Uuid.AsString())
+        self.assertIs(replicator.find_matching_item(0, track, new_track), track)
+        replicator.candidate_kiids[0].clear()
+        new_track.SetNetCode(track.GetNetCode())
+        self.assertIs(replicator.find_matching_item(0, track, new_track), track)
+
+
+class TestBoundedMemory(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+
+    def tearDown(self):
+        os.environ.pop(MEMORY_VARIABLE, None)
+
+    def test_bounded_memory(self):
+        logger.info("Testing replication of one sheet at a time")
+        input_filename = 'replicate_layout_test_project.kicad_pcb'
+
+        def replicate(settings):
+            board = pcbnew.LoadBoard(input_filename)
+            replicator = Replicator(board, 'Q301', update_progress)
+            src_anchor_fp = replicator.get_fp_by_ref('Q301')
+            sheet_list = replicator.get_sheets_on_level(src_anchor_fp, 1)
+            report = replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                                 settings, rm_duplicates=True)
+            items = sorted(get_item_geometry_key(x) + x.GetNetname()
+                           for x in itertools.chain(board.GetTracks(), board.Zones()))
+            return replicator, report, items
+
+        for settings in [Settings(remove=True), Settings(update=True)]:
+            _, report, items = replicate(settings)
+            os.environ[MEMORY_VARIABLE] = "1"
+            replicator, bounded_report, bounded_items = replicate(settings._replace(bounded_memory=True))
+            os.environ.pop(MEMORY_VARIABLE)
+            self.assertEqual(items, bounded_items)
+            self.assertEqual(report['sheets'], bounded_report['sheets'])
+            # only the cached data of the source sheet is kept
+            self.assertEqual(len(replicator.net_pairs_cache), 0)
+            self.assertGreater(bounded_report['memory']['tracks'], 0)
+            self.assertIn('memory', replicator.stats.as_dict()['stages']['tracks'])
+
+
+class TestZones(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+
+    def test_zone_clone(self):
+        logger.info("Testing that replicated zones are not filled until the refill")
+        board = pcbnew.LoadBoard('replicate_layout_test_project.kicad_pcb')
+        pcbnew.ZONE_FILLER(board).Fill(board.Zones())
+        replicator = Replicator(board, 'Q301', update_progress)
+        src_anchor_fp = replicator.get_fp_by_ref('Q301')
+        sheet_list = replicator.get_sheets_on_level(src_anchor_fp, 1)
+        src_zones = set(x.m_Uuid.AsString() for x in board.Zones())
+        replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                    Settings(), rm_duplicates=False, refill=False)
+        new_zones = [x for x in board.Zones() if x.m_Uuid.AsString() not in src_zones]
+        self.assertEqual(len(new_zones), len(sheet_list) * len(replicator.src_zones))
+        for new_zone in new_zones:
+            self.assertFalse(new_zone.IsFilled())
+            self.assertTrue(new_zone.NeedRefill())
+        for src_zone in replicator.src_zones:
+            clone = replicator.clone_zone(src_zone)
+            self.assertEqual(get_item_geometry_key(clone), get_item_geometry_key(src_zone))
+            self.assertEqual(clone.GetNetCode(), src_zone.GetNetCode())
+
+    def test_zone_with_hole(self):
+        logger.info("Testing that the holes of the zones are replicated")
+        board = pcbnew.LoadBoard('replicate_layout_test_project.kicad_pcb')
+        replicator = Replicator(board, 'Q301', update_progress)
+        src_anchor_fp = replicator.get_fp_by_ref('Q301')
+        replicator.prepare_for_replication(src_anchor_fp.sheet_id[0:2], Settings(), dry_run=True)
+        src_zone = replicator.src_zones[0]
+        center = src_zone.GetBoundingBox().GetCenter()
+        outline = src_zone.Outline()
+        hole = outline.NewHole()
+        for dx, dy in [(-1, -1), (1, -1), (1, 1), (-1, 1)]:
+            outline.Append(center.x + dx * pcbnew.FromMM(0.5), center.y + dy * pcbnew.FromMM(0.5), -1, hole)
+        clone = replicator.clone_zone(src_zone)
+        self.assertEqual(clone.Outline().HoleCount(0), 1)
+        self.assertEqual(get_item_geometry_key(clone), get_item_geometry_key(src_zone))
+
+        src_zones = set(x.m_Uuid.AsString() for x in board.Zones())
+        sheet_list = replicator.get_sheets_on_level(src_anchor_fp, 1)
+        replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                    Settings(), rm_duplicates=False, refill=False)
+        new_zones = [x for x in board.Zones() if x.m_Uuid.AsString() not in src_zones]
+        self.assertEqual(sum(x.Outline().HoleCount(0) for x in new_zones), len(sheet_list))
+        for new_zone in new_zones:
+            # the hole is replicated inside the zone
+            for index in range(new_zone.Outline().HoleCount(0)):
+                for corner in new_zone.Outline().Hole(0, index):
+                    self.assertTrue(new_zone.GetBoundingBox().Contains(corner))
+
+
+class TestGroups(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+
+    def select_group_only(self, group_name=None):
+        board = pcbnew.LoadBoard('replicate_layout_test_project.kicad_pcb')
+        if group_name is not None:
+            for group in board.Groups():
+                group.SetName(group_name)
+        replicator = Replicator(board, 'Q301', update_progress)
+        src_anchor_fp = replicator.get_fp_by_ref('Q301')
+        settings = Settings(group_only=True)
+        replicator.prepare_for_replication(src_anchor_fp.sheet_id[0:2], settings, dry_run=True)
+        return board, replicator
+
+    def test_group_only(self):
+        logger.info("Testing group only selection from the group index")
+        board, replicator = self.select_group_only()
+        # the same tracks as when checking the group of every track on the board
+        in_group = [x for x in board.GetTracks()
+                    if x.GetParentGroup() and x.GetParentGroup().m_Uuid.AsString() == replicator.src_anchor_fp_group]
+        self.assertGreater(len(replicator.src_tracks), 0)
+        self.assertEqual(set(x.m_Uuid.AsString() for x in replicator.src_tracks),
+                         set(x.m_Uuid.AsString() for x in in_group
+                             if x.GetNetname() in replicator.get_nets_from_footprints(replicator.src_footprints)))
+        self.assertTrue(all(replicator.is_in_anchor_group(x.fp) for x in replicator.src_footprints))
+
+    def test_unnamed_group(self):
+        logger.info("Testing group only selection with an unnamed group")
+        _, named = self.select_group_only()
+        _, unnamed = self.select_group_only("")
+        self.assertIn(unnamed.src_anchor_fp, unnamed.src_footprints)
+        self.assertEqual([x.ref for x in unnamed.src_footprints], [x.ref for x in named.src_footprints])
+        self.assertEqual(set(x.m_Uuid.AsString() for x in unnamed.src_tracks),
+                         set(x.m_Uuid.AsString() for x in named.src_tracks))
+
+
+class TestHierarchy(unittest.TestCase):
+    def test_sheet_tree(self):
+        logger.info("Testing sheet hierarchy tree")
+        board = pcbnew.LoadBoard(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project",
+                                              'replicate_layout_test_project.kicad_pcb'))
+        replicator = Replicator(board, 'Q301', update_progress)
+        src_anchor_fp = replicator.get_fp_by_ref('Q301')
+        level = src_anchor_fp.sheet_id[0:2]
+        node = replicator.hierarchy.get_node(level)
+        self.assertEqual(node.path, level)
+        self.assertEqual(node.filename, src_anchor_fp.filename[1])
+        self.assertIn(src_anchor_fp, node.get_footprints())
+        # subtree queries match the scan of all the footprints
+        on_sheet = [fp for fp in replicator.footprints if fp.sheet_id[0:2] == level]
+        self.assertEqual(replicator.get_footprints_on_sheet(level), on_sheet)
+        other_nets = replicator.get_nets_from_footprints(replicator.get_footprints_not_on_sheet(level))
+        nets_on_sheet, exclusive_nets = replicator.get_sheet_nets(level)
+        self.assertEqual(nets_on_sheet, set(replicator.get_nets_from_footprints(on_sheet)))
+        self.assertEqual(exclusive_nets, set(net for net in nets_on_sheet if net not in other_nets))
+        bounding_box = replicator.get_sheet_bounding_box(level)
+        self.assertEqual(bounding_box.GetLeft(), replicator.get_footprints_bounding_box(on_sheet).GetLeft())
+        # sibling instances of the same sheet file
+        sheets = replicator.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[1])
+        self.assertNotIn(level, sheets)
+        self.assertEqual(len(sheets) + 1, len(replicator.hierarchy.get_instances(node.filename, src_anchor_fp.fp_id)))
+        # the dialog lists them with their anchor footprints
+        choices, names = replicator.get_sheet_choices(src_anchor_fp, src_anchor_fp.sheet_id[1])
+        self.assertEqual(choices, sheets)
+        self.assertEqual(len(names), len(sheets))
+        # moved footprints change the bounding box
+        node.invalidate_bounding_box()
+        self.assertIsNone(node.bounding_box)
+        self.assertIsNone(replicator.hierarchy.root.bounding_box)
+
+
+class TestRooms(unittest.TestCase):
+    def test_points_in_polygon(self):
+        logger.info("Testing point in polygon")
+        # concave polygon with a notch at the top
+        polygon = [(0, 0), (10, 0), (10, 10), (5, 5), (0, 10)]
+        points = [(1, 1), (5, 8), (5, 4), (11, 1), (2, 9), (9, 9)]
+        self.assertEqual(points_in_polygon(points, polygon), [True, False, True, False, False, True])
+        room = Room(polygon)
+        self.assertEqual(room.select([[(1, 1), (5, 8)], [(1, 1), (2, 2)]], True), [False, True])
+        self.assertEqual(room.select([[(1, 1), (5, 8)], [(5, 8)]], False), [True, False])
+
+    def test_room_selection(self):
+        logger.info("Testing selection by replication room")
+        board = pcbnew.LoadBoard(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project",
+                                              'replicate_layout_test_project.kicad_pcb'))
+        replicator = Replicator(board, 'Q301', update_progress)
+        src_anchor_fp = replicator.get_fp_by_ref('Q301')
+        level = src_anchor_fp.sheet_id[0:2]
+        bounding_box = replicator.get_sheet_bounding_box(level)
+        margin = pcbnew.FromMM(1)
+        left, top = bounding_box.GetLeft() - margin, bounding_box.GetTop() - margin
+        right, bottom = bounding_box.GetRight() + margin, bounding_box.GetBottom() + margin
+        room_shape = pcbnew.PCB_SHAPE(board)
+        room_shape.SetShape(pcbnew.SHAPE_T_POLY)
+        room_shape.SetPolyPoints([pcbnew.VECTOR2I(left, top), pcbnew.VECTOR2I(right, top),
+                                  pcbnew.VECTOR2I(right, bottom), pcbnew.VECTOR2I(left, bottom)])
+        room_shape.SetLayer(board.GetLayerID('Replicate.Layout'))
+        board.Add(room_shape)
+
+        region = replicator.get_sheet_region(level)
+        self.assertIsInstance(region, Room)
+        # sheets without a room use the bounding box
+        other_sheet = replicator.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[1])[0]
+        self.assertNotIsInstance(replicator.get_sheet_region(other_sheet), Room)
+        # the room is larger than the bounding box
+        in_room = set(x.m_Uuid.AsString() for x in replicator.get_tracks(region, True))
+        in_bounding_box = set(x.m_Uuid.AsString() for x in replicator.get_tracks(bounding_box, True))
+        self.assertTrue(in_bounding_box)
+        self.assertTrue(in_bounding_box <= in_room)
+        # the room is not replicated
+        settings = Settings(rep_drawings=True, intersecting=True)
+        drawings = replicator.get_drawings_for_replication(region, settings)
+        self.assertNotIn(room_shape.m_Uuid.AsString(), [x.m_Uuid.AsString() for x in drawings])
+
+
+class TestTemplates(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+        self.template_filename = os.path.abspath('replicate_layout_test_project_template.json.gz')
+        self.output_filenames = [os.path.abspath('replicate_layout_test_project_temp_template_' + x + '.kicad_pcb')
+                                 for x in ('replicated', 'applied')]
+
+    def tearDown(self):
+        for filename in [self.template_filename] + self.output_filenames:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_template(self):
+        logger.info("Testing replication templates")
+        input_filename = 'replicate_layout_test_project.kicad_pcb'
+        settings = get_test_job('Q301', 1, (), containing=True).settings._replace(remove=True)
+        board = pcbnew.LoadBoard(input_filename)
+        replicator = Replicator(board, 'Q301', update_progress)
+        src_anchor_fp = replicator.src_anchor_fp
+        level = src_anchor_fp.sheet_id[0:2]
+        # source zone with a hole and settings which are not the default ones
+        replicator.prepare_for_replication(level, settings, dry_run=True)
+        src_zone = replicator.src_zones[0]
+        center = src_zone.GetBoundingBox().GetCenter()
+        hole = src_zone.Outline().NewHole()
+        for dx, dy in [(-1, -1), (1, -1), (1, 1), (-1, 1)]:
+            src_zone.Outline().Append(center.x + dx * pcbnew.FromMM(0.5), center.y + dy * pcbnew.FromMM(0.5), -1, hole)
+        src_zone.SetCornerRadius(pcbnew.FromMM(0.5))
+        src_zone.SetIslandRemovalMode(2)
+        src_zone.SetHatchOrientation(pcbnew.EDA_ANGLE(45, pcbnew.DEGREES_T))
+        pcbnew.SaveBoard(self.output_filenames[1], board)
+        template = export_template(replicator, level, settings)
+        self.assertEqual(template['sheet_file'], 'Leg.kicad_sch')
+        self.assertEqual(len(template['footprints']), len(replicator.get_footprints_on_sheet(level)))
+        save_template(template, self.template_filename)
+        # loaded once
+        self.assertIs(load_template(self.template_filename), load_template(self.template_filename))
+
+        # applying the template to a board gives the same result as the replication
+        sheets = replicator.get_sheets_on_level(src_anchor_fp, 1)
+        report = replicator.replicate_layout(src_anchor_fp, level, sheets, settings, False)
+        pcbnew.SaveBoard(self.output_filenames[0], board)
+        replicated_zones = board.Zones()
+        board = pcbnew.LoadBoard(self.output_filenames[1])
+        _, template_report = apply_template(board, load_template(self.template_filename),
+                                            ["/".join(sheet) for sheet in sheets], settings)
+        pcbnew.SaveBoard(self.output_filenames[1], board)
+        for sheet, counters in report['sheets'].items():
+            for counter in ('footprints', 'tracks', 'vias', 'zones', 'text', 'drawings'):
+                self.assertEqual(template_report['sheets'][sheet][counter], counters[counter])
+        # footprints on the flipped sheets are rounded differently
+        summary = diff_boards(*self.output_filenames)['summary']
+        self.assertEqual(list(summary), ['footprint'])
+        self.assertEqual(summary['footprint']['added'] + summary['footprint']['removed'], 0)
+
+        def zone_settings(zones):
+            # the settings of the source zone are not saved by the stand-in
+            return sorted((x.Outline().HoleCount(0), x.GetCornerRadius(), x.GetIslandRemovalMode(),
+                           x.GetHatchOrientation().AsDegrees()) for x in zones
+                          if x.m_Uuid.AsString() != src_zone.m_Uuid.AsString())
+        self.assertEqual(zone_settings(board.Zones()), zone_settings(replicated_zones))
+        self.assertIn((1, pcbnew.FromMM(0.5), 2, 45), zone_settings(board.Zones()))
+
+
+    def test_apply_checks(self):
+        logger.info("Testing template replication settings and checks")
+        input_filename = 'replicate_layout_test_project.kicad_pcb'
+        settings = get_test_job('Q301', 1, (), containing=True).settings
+        board = pcbnew.LoadBoard(input_filename)
+        replicator = Replicator(board, 'Q301', update_progress)
+        level = replicator.src_anchor_fp.sheet_id[0:2]
+        # update modes do not change which items are exported
+        template = export_template(replicator, level, settings._replace(update=True))
+        self.assertGreater(len(template['zones']), 0)
+        sheets = ["/".join(sheet) for sheet in replicator.get_sheets_on_level(replicator.src_anchor_fp, 1)]
+
+        board = pcbnew.LoadBoard(input_filename)
+        nr_zones = len(board.Zones())
+        _, report = apply_template(board, template, sheets, settings._replace(rep_zones=False))
+        self.assertEqual(len(board.Zones()), nr_zones)
+        self.assertTrue(all(x['zones'] == 0 and x['tracks'] > 0 for x in report['sheets'].values()))
+
+        # a footprint missing on the last sheet is found before any of the sheets is modified
+        board = pcbnew.LoadBoard(input_filename)
+        replicator = Replicator(board, 'Q301', update_progress)
+        last_sheet = replicator.get_sheets_on_level(replicator.src_anchor_fp, 1)[-1]
+        missing_fp = [x for x in replicator.get_footprints_on_sheet(last_sheet) if x.ref != 'Q301'][0]
+        board.RemoveNative(missing_fp.fp)
+        positions = sorted((fp.GetReference(), fp.GetPosition().x, fp.GetPosition().y)
+                           for fp in board.GetFootprints())
+        nr_tracks = len(board.GetTracks())
+        with self.assertRaises(LookupError):
+            apply_template(board, template, sheets, settings)
+        self.assertEqual(sorted((fp.GetReference(), fp.GetPosition().x, fp.GetPosition().y)
+                                for fp in board.GetFootprints()), positions)
+        self.assertEqual(len(board.GetTracks()), nr_tracks)
+
+
+class TestHighlight(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+
+    def test_highlight_change_level(self):
+        logger.info("Testing incremental highlight")
+        board = pcbnew.LoadBoard('replicate_layout_test_project.kicad_pcb')
+        replicator = Replicator(board, 'Q301', update_progress)
+        src_anchor_fp = replicator.get_fp_by_ref('Q301')
+
+        def brightened():
+            return set(x.m_Uuid.AsString() for x in itertools.chain(board.GetTracks(), board.Zones(),
+                                                                     board.GetDrawings()) if x.IsBrightened())
+
+        settings = Settings(intersecting=True, group_items=True)
+        fps, items, changed = replicator.highlight_change_level(src_anchor_fp.sheet_id[0:2], settings)
+        self.assertTrue(changed)
+        inner = brightened()
+        fps, items, changed = replicator.highlight_change_level(src_anchor_fp.sheet_id[0:1], settings)
+        self.assertTrue(changed)
+        # the same as clearing everything and highlighting again
+        replicator.highlight_clear_level(fps, items)
+        self.assertEqual(brightened(), set())
+        fps, items = replicator.highlight_set_level(src_anchor_fp.sheet_id[0:1], settings)
+        outer = brightened()
+        self.assertNotEqual(inner, outer)
+        fps, items, changed = replicator.highlight_change_level(src_anchor_fp.sheet_id[0:2], settings)
+        self.assertEqual(brightened(), inner)
+        # the selection is cached, nothing has to be done when the level does not change
+        fps, items, changed = replicator.highlight_change_level(src_anchor_fp.sheet_id[0:2], settings)
+        self.assertFalse(changed)
+        self.assertEqual(len(replicator.highlight_cache), 2)
+
+
+class TestLists(unittest.TestCase):
+    def test_list_model(self):
+        logger.info("Testing the virtual list model")
+        model = ListModel([('R10', '2'), ('R9', '1'), ('C1', '1'), ('R100', '3')])
+        self.assertEqual(len(model), 4)
+        model.sort(0)
+        self.assertEqual([model.get_text(i, 0) for i in range(len(model))], ['C1', 'R9', 'R10', 'R100'])
+        # sorting by the same column again reverses the order
+        model.sort(0)
+        self.assertEqual([model.get_text(i, 0) for i in range(len(model))], ['R100', 'R10', 'R9', 'C1'])
+        model.set_filter(' r1')
+        self.assertEqual([model.get_text(i, 0) for i in range(len(model))], ['R100', 'R10'])
+        self.assertEqual([model.get_row_index(i) for i in range(len(model))], [3, 0])
+        # filtered out rows have no position in the list control
+        self.assertEqual(model.get_view_indices([0, 1, 3]), [1, 0])
+        model.set_filter('')
+        self.assertEqual(len(model), 4)
+
+
+class TestCompareBoards(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+        self.temp_filename = 'replicate_layout_test_project_temp_compare.kicad_pcb'
+
+    def tearDown(self):
+        if os.path.exists(self.temp_filename):
+            os.remove(self.temp_filename)
+
+    def test_compare_boards(self):
+        logger.info("Testing structural board comparison")
+        ref_filename = 'replicate_layout_test_project_ref_inner.kicad_pcb'
+        with open(ref_filename, encoding='utf-8') as f:
+            contents = f.read()
+        # new timestamps are not a difference
+        renamed = re.sub(r'\(tstamp [0-9a-f-]+\)', '(tstamp 00000000-0000-0000-0000-000000000000)', contents)
+        with open(self.temp_filename, 'w', encoding='utf-8') as f:
+            f.write(renamed)
+        self.assertEqual(compare_boards(ref_filename, self.temp_filename), 0)
+        # a changed item is reported once on each side
+        changed = renamed.replace('(width 0.6)', '(width 0.7)', 1)
+        self.assertNotEqual(changed, renamed)
+        with open(self.temp_filename, 'w', encoding='utf-8') as f:
+            f.write(changed)
+        self.assertEqual(compare_boards(ref_filename, self.temp_filename), 2)
+        report = diff_boards(ref_filename, self.temp_filename)
+        self.assertEqual(report['summary'], {'track': {'added': 1, 'removed': 1, 'modified': 0}})
+        self.assertEqual(report['differences'][0]['sheet'], report['differences'][1]['sheet'])
+
+    def test_diff_boards(self):
+        logger.info("Testing semantic board diff")
+        ref_filename = 'replicate_layout_test_project_ref_inner.kicad_pcb'
+        report = diff_boards(ref_filename, 'replicate_layout_test_project_ref_inner_alt.kicad_pcb')
+        self.assertFalse(report['equal'])
+        footprints = [x for x in report['differences'] if x['kind'] == 'footprint']
+        # footprints are matched by reference and attributed to the sheet they are on
+        self.assertTrue(all(x['change'] == 'modified' for x in footprints))
+        self.assertIn({'change': 'modified', 'kind': 'footprint', 'id': 'Q702',
+                       'sheet': '/Full Bridge1/Leg+', 'sheetfile': 'Leg.kicad_sch'}, footprints)
+        self.assertTrue(diff_boards(ref_filename, ref_filename)['equal'])
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+
+    def test_stats(self):
+        logger.info("Testing replication statistics")
+        board = pcbnew.LoadBoard('replicate_layout_test_project.kicad_pcb')
+        replicator = Replicator(board, 'Q301', update_progress)
+        src_anchor_fp = replicator.get_fp_by_ref('Q301')
+        sheet_list = replicator.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[1])
+        replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                    Settings(remove=True), rm_duplicates=False)
+        stats = json.loads(json.dumps(replicator.stats.as_dict()))
+        for stage in ['prepare', 'remove_before', 'footprints', 'remove_after', 'tracks', 'zones', 'refill']:
+            self.assertIn(stage, stats['stages'])
+        self.assertEqual(len(stats['stages']['tracks']['sheets']), len(sheet_list))
+        self.assertGreater(stats['counters']['tracks'], 0)
+        self.assertEqual(stats['counters']['added'], stats['swig_calls']['BOARD.Add'])
+        self.assertEqual(sum(x['tracks'] for x in stats['sheet_counters'].values()), stats['counters']['tracks'])
+        # net pairs are computed once per sheet and reused by the zones stage
+        self.assertEqual(stats['caches']['net_pairs']['misses'], len(sheet_list))
+        self.assertGreater(stats['caches']['net_pairs']['hit_rate'], 0)
+
+
+class TestProgress(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+
+    def replicate(self, board, progress):
+        replicator = Replicator(board, 'Q301', progress)
+        src_anchor_fp = replicator.get_fp_by_ref('Q301')
+        sheet_list = replicator.get_sheets_to_replicate(src_anchor_fp, src_anchor_fp.sheet_id[1])
+        report = replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                             Settings(remove=True), rm_duplicates=True)
+        return replicator, report
+
+    def test_progress(self):
+        logger.info("Testing weighted progress")
+        calls = []
+
+        def progress(stage, percentage, message=None):
+            calls.append(percentage)
+
+        board = pcbnew.LoadBoard('replicate_layout_test_project.kicad_pcb')
+        replicator, report = self.replicate(board, progress)
+        self.assertFalse(report['cancelled'])
+        self.assertEqual(calls, sorted(calls), "overall progress should never go back")
+        self.assertLessEqual(calls[-1], 1.0)
+        # callbacks are throttled
+        self.assertLess(len(calls), replicator.stats.counters['tracks'])
+
+    def test_cancel(self):
+        logger.info("Testing cancellation")
+
+        def progress(stage, percentage, message=None):
+            # cancel when replication of tracks starts
+            return stage < 5
+
+        board = pcbnew.LoadBoard('replicate_layout_test_project.kicad_pcb')
+        replicator, report = self.replicate(board, progress)
+        self.assertTrue(report['cancelled'])
+        self.assertIn('footprints', report['stages'])
+        self.assertNotIn('tracks', report['stages'])
+        self.assertNotIn('duplicates', report['stages'])
+        # only source tracks and tracks outside of destination sheets are left
+        self.assertEqual(replicator.stats.counters['tracks'], 0)
+        self.assertGreater(replicator.stats.counters['removed'], 0)
+
+
+class TestLogging(unittest.TestCase):
+    def tearDown(self):
+        os.environ.pop(LOG_LEVEL_VARIABLE, None)
+
+    def test_log_level(self):
+        os.environ[LOG_LEVEL_VARIABLE] = 'debug'
+        self.assertEqual(get_log_level(), logging.DEBUG)
+        os.environ[LOG_LEVEL_VARIABLE] = '30'
+        self.assertEqual(get_log_level(), logging.WARNING)
+        os.environ[LOG_LEVEL_VARIABLE] = 'verbose'
+        self.assertEqual(get_log_level(), logging.INFO)
+
+    def test_queue_handler(self):
+        formatted = []
+
+        class Expensive:
+            def __repr__(self):
+                formatted.append(True)
+                return "expensive"
+
+        log_queue = queue.SimpleQueue()
+        test_logger = logging.getLogger('test_queue_handler')
+        test_logger.propagate = False
+        test_logger.setLevel(logging.INFO)
+        test_logger.addHandler(MessageQueueHandler(log_queue))
+        items = [1, 2]
+        test_logger.info("items %r", items)
+        # arguments are merged when logging, later changes do not matter
+        items.append(3)
+        # and are not formatted at all when the level is not enabled
+        test_logger.debug("details %r", Expensive())
+        record = log_queue.get_nowait()
+        self.assertEqual(record.getMessage(), "items [1, 2]")
+        self.assertTrue(log_queue.empty())
+        self.assertFalse(formatted)
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+        self.cli = os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_cli.py")
+        self.output_filename = os.path.abspath('replicate_layout_test_project_cli.kicad_pcb')
+
+    def tearDown(self):
+        if os.path.exists(self.output_filename):
+            os.remove(self.output_filename)
+
+    def test_cli(self):
+        logger.info("Testing command line runner")
+        result = subprocess.run(get_cli_command(self.cli) + ['replicate_layout_test_project.kicad_pcb',
+                                 '--anchor', 'Q301', '--level', '1', '--sheets', '0', 'Full Bridge2/Leg+',
+                                 '--remove', '--no-rep-text', '--output', self.output_filename],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("Stage timings:", result.stdout)
+        self.assertIn("Sheet Full Bridge2/Leg+:", result.stdout)
+        self.assertNotIn("text:", result.stdout)
+        self.assertTrue(os.path.exists(self.output_filename))
+
+        result = subprocess.run(get_cli_command(self.cli) + ['replicate_layout_test_project.kicad_pcb',
+                                 '--anchor', 'Q301', '--level', '1', '--sheets', 'Nonexistent'],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Nonexistent", result.stderr)
+
+        # applying a template can not be previewed
+        result = subprocess.run(get_cli_command(self.cli) + ['replicate_layout_test_project.kicad_pcb',
+                                 '--apply-template', 'template.json.gz', '--dry-run'],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("--dry-run", result.stderr)
+
+
+class TestRegression(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+
+    def test_regression(self):
+        logger.info("Testing parallel golden board regression run")
+        input_filename = os.path.abspath('replicate_layout_test_project.kicad_pcb')
+        data = {'board': input_filename, 'settings': {'intersecting': True, 'group_items': True},
+                'remove_duplicates': True, 'jobs': [{'anchor': 'Q301', 'level': 1, 'sheets': [1, 3]}]}
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # golden board made by this pcbnew, so that the comparison does not depend on the file format
+            reference = os.path.join(temp_dir, "reference.kicad_pcb")
+            for name, reference_filename in [("passing", reference), ("failing", input_filename)]:
+                with open(os.path.join(temp_dir, name + "_scenario.json"), 'w') as f:
+                    json.dump(dict(data, reference=reference_filename), f)
+            scenarios = find_scenarios([temp_dir])
+            board, scenario_reference, jobs = load_scenario(scenarios[1])
+            self.assertEqual(board, input_filename)
+            self.assertEqual(scenario_reference, reference)
+            self.assertEqual(jobs[0].anchor, 'Q301')
+
+            results = run_regression(scenarios[1:], update=True)
+            self.assertTrue(results[0]['ok'])
+            self.assertTrue(os.path.exists(reference))
+
+            results = run_regression(scenarios, max_workers=2)
+            self.assertEqual([x['scenario'] for x in results], ["failing", "passing"])
+            self.assertEqual([x['ok'] for x in results], [False, True])
+            self.assertGreater(results[0]['differences']['track']['removed'], 0)
+            self.assertTrue(all(x['time'] > 0 for x in results))
+            # nothing is written next to the scenarios
+            self.assertEqual(len(os.listdir(temp_dir)), 3)
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+
+    def test_batch(self):
+        logger.info("Testing parallel replication of several boards")
+        input_filename = 'replicate_layout_test_project.kicad_pcb'
+        cases = [("_ref_inner", get_test_job('Q301', 1, (1, 3), containing=False)),
+                 ("_ref_inner_alt", get_test_job('Q1401', 0, (2, 3), containing=False)),
+                 ("_ref_outer", get_test_job('Q301', 0, (0, 1), containing=False))]
+        tasks = []
+        for suffix, job in cases:
+            test_filename = input_filename.split('.')[0] + suffix + ".kicad_pcb"
+            tasks.append((input_filename, test_filename.replace("ref", "batch"), [job]))
+        tasks.append((input_filename, "replicate_layout_test_project_batch_failed.kicad_pcb",
+                      [get_test_job('Q9999', 0, (0,), containing=False)]))
+
+        results = run_batch(tasks, max_workers=2)
+        self.assertEqual([result['ok'] for result in results], [True, True, True, False])
+        self.assertIn("Q9999", results[3]['error'])
+        # worker processes have to give the same result as replication in this process
+        for (suffix, job), result in zip(cases, results):
+            out_filename = result['output'].replace("batch", "temp")
+            replicate_file(input_filename, out_filename, [job])
+            err = compare_boards(result['output'], out_filename)
+            self.assertEqual(err, 0, suffix + " differs in batch")
+            os.remove(result['output'])
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+        self.job_filename = os.path.abspath('replicate_layout_test_project_jobs.json')
+
+    def tearDown(self):
+        if os.path.exists(self.job_filename):
+            os.remove(self.job_filename)
+
+    def test_jobs(self):
+        logger.info("Testing batch job file")
+        job_data = {"board": "replicate_layout_test_project.kicad_pcb",
+                    "settings": {"remove": True},
+                    "jobs": [{"anchor": "Q301", "level": 1, "sheets": [0]},
+                             {"anchor": "Q1401", "level": 0, "sheets": [2], "settings": {"rep_text": False}},
+                             {"anchor": "Q301", "level": 0, "dry_run": True}]}
+        with open(self.job_filename, 'w') as f:
+            json.dump(job_data, f)
+        board_filename, output_filename, jobs = load_job_file(self.job_filename)
+        self.assertEqual(board_filename, os.path.abspath('replicate_layout_test_project.kicad_pcb'))
+        self.assertIsNone(output_filename)
+        self.assertTrue(jobs[1].settings.remove)
+        self.assertFalse(jobs[1].settings.rep_text)
+
+        board = pcbnew.LoadBoard(board_filename)
+        replicator = Replicator(board, jobs[0].anchor, update_progress)
+        reports = replicator.replicate_jobs(jobs)
+        self.assertEqual(len(reports), 3)
+        # zones are refilled only once, by the last job which modifies the board
+        self.assertNotIn('refill', reports[0]['stages'])
+        self.assertIn('refill', reports[1]['stages'])
+        self.assertTrue(reports[2]['dry_run'])
+        # footprints on the sheets are found only once for all the jobs
+        self.assertGreater(replicator.job_stats[1].as_dict()['caches']['sheet_footprints']['hits'], 0)
+
+        job_data['jobs'][0]['anchors'] = "Q301"
+        with open(self.job_filename, 'w') as f:
+            json.dump(job_data, f)
+        with self.assertRaises(LookupError):
+            load_job_file(self.job_filename)
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+        self.filename = os.path.abspath('replicate_layout_benchmark.kicad_pcb')
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def test_generated_board(self):
+        logger.info("Testing benchmark board generator")
+        generate_board(self.filename, 3, 5, 10)
+        board = pcbnew.LoadBoard(self.filename)
+        self.assertEqual(len(board.GetFootprints()), 15)
+        replicator = Replicator(board, 'R10', update_progress)
+        src_anchor_fp = replicator.get_fp_by_ref('R10')
+        self.assertEqual(len(replicator.get_sheets_on_level(src_anchor_fp, 0)), 2)
+
+        result = run_case(self.filename, 5, Settings(remove=True, intersecting=True), memory=True)
+        for stage in ['init', 'prepare', 'footprints', 'tracks', 'zones', 'refill']:
+            self.assertIn(stage, result['times'])
+        self.assertGreater(result['memory']['peak'], 0)
+        # every kind of item is inside the sheet regions
+        for counters in result['sheets'].values():
+            for counter in ['footprints', 'tracks', 'zones', 'text', 'drawings']:
+                self.assertGreater(counters[counter], 0, counter)
+        scaling = get_scaling([1, 2], [{'times': {'tracks': 0.01}}, {'times': {'tracks': 0.04}}])
+        self.assertAlmostEqual(scaling['tracks'], 2.0)
+
+    def test_import_time(self):
+        logger.info("Testing that plugin registration does not import the GUI and the engine")
+        result = measure_import_time(repeat=1)
+        self.assertIn(result['package'] + '.action_replicate_layout', result['modules'])
+        self.assertEqual(result['deferred'], [])
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        os.chdir(os.path.join(os.path.dirname(os.path.realpath(__file__)), "replicate_layout_test_project"))
+
+    def tearDown(self):
+        os.environ.pop(replication_profiling.PROFILE_VARIABLE, None)
+        replication_profiling.disable_profiling()
+        for filename in [replication_profiling.PROFILE_FILENAME, replication_profiling.PROFILE_SUMMARY_FILENAME]:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_profiling(self):
+        logger.info("Testing profiling hook")
+        board = pcbnew.LoadBoard('replicate_layout_test_project.kicad_pcb')
+        Replicator(board, 'Q301', update_progress)
+        self.assertFalse(os.path.exists(replication_profiling.PROFILE_FILENAME))
+
+        os.environ[replication_profiling.PROFILE_VARIABLE] = "1"
+        replicator = Replicator(board, 'Q301', update_progress)
+        src_anchor_fp = replicator.get_fp_by_ref('Q301')
+        sheet_list = replicator.get_sheets_on_level(src_anchor_fp, 1)
+        replicator.replicate_layout(src_anchor_fp, src_anchor_fp.sheet_id[0:2], sheet_list,
+                                    Settings(), rm_duplicates=False, dry_run=True)
+        self.assertTrue(os.path.exists(replication_profiling.PROFILE_FILENAME))
+        with open(replication_profiling.PROFILE_SUMMARY_FILENAME) as f:
+            summary = f.read()
+        # both the initialization and the replication are in the profile
+        self.assertIn("__init__", summary)
+        self.assertIn("plan_replication", summary)
+
+
 # for testing purposes only
 if __name__ == "__main__":
-    file_handler = logging.FileHandler(filename='replicate_layout.log', mode='w')
+    file_handler = logging.FileHandler(filename=LOG_FILENAME, mode='w')
     stdout_handler = logging.StreamHandler(sys.stdout)
-    handlers = [file_handler, stdout_handler]
-
-    logging_level = logging.INFO
-
-    logging.basicConfig(level=logging_level,
-                        format='%(asctime)s %(name)s %(lineno)d:%(message)s',
-                        datefmt='%m-%d %H:%M:%S',
-                        handlers=handlers
-                        )
+    start_logging([file_handler, stdout_handler])
 
     logger = logging.getLogger(__name__)
     logger.info("Plugin executed on: " + repr(sys.platform))